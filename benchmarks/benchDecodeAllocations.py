@@ -0,0 +1,116 @@
+"""
+Benchmark per-frame allocations of the decode loops.
+
+Compares, on every frame of a video:
+- "read+cvtColor":  video.read() and cv2.cvtColor() returning new arrays (the old loops)
+- "reused dst":     video.read(buf) and cv2.cvtColor(..., dst=rgb) into preallocated buffers
+- "read_frames":    frameSampling.read_frames, the shared decode path of the frame tools
+
+NumPy and OpenCV report their buffer allocations to tracemalloc. For each
+frame the benchmark records how far traced memory peaked above its level
+before the frame, and counts the frames that needed at least one frame-sized
+allocation. The peak is a lower bound: a loop that replaces its previous
+buffers frees one before allocating the next, so two new arrays per frame
+show up as one.
+
+Usage: python benchmarks/benchDecodeAllocations.py [--video clip.mp4] [--frames 300] [--size 3840x2160]
+"""
+import argparse
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import cv2
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from frameSampling import read_frames, get_video_info
+
+
+def make_fixture(path, frames, size, fps=60):
+    cmd = [
+        'ffmpeg', '-v', 'error', '-y', '-f', 'lavfi', '-i', f"testsrc2=size={size}:rate={fps}",
+        '-frames:v', str(frames), '-c:v', 'libx264', '-preset', 'ultrafast', '-pix_fmt', 'yuv420p', str(path)
+    ]
+    subprocess.run(cmd, check=True)
+
+
+def naive_loop(video_path):
+    video = cv2.VideoCapture(video_path)
+    while True:
+        ret, frame = video.read()
+        if not ret:
+            break
+        yield cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    video.release()
+
+
+def reused_loop(video_path):
+    video = cv2.VideoCapture(video_path)
+    bgr = rgb = None
+    while True:
+        ret, bgr = video.read(bgr)
+        if not ret:
+            break
+        rgb = cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB, dst=rgb)
+        yield rgb
+    video.release()
+
+
+def read_frames_loop(video_path):
+    info = get_video_info(video_path)
+    for _, frame in read_frames(video_path, list(range(info.frame_count)), info, strategy="grab"):
+        yield frame
+
+
+def measure(loop, video_path, frame_bytes):
+    """Return (frames, seconds, mean bytes allocated per frame, frames with a frame-sized allocation)."""
+    frames = allocated = frame_sized = 0
+    iterator = loop(video_path)
+    tracemalloc.start()
+    start = time.perf_counter()
+    while True:
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        frame = next(iterator, None)
+        if frame is None:
+            break
+        _, peak = tracemalloc.get_traced_memory()
+        new_bytes = max(0, peak - before)
+        allocated += new_bytes
+        frame_sized += new_bytes >= frame_bytes
+        frames += 1
+    seconds = time.perf_counter() - start
+    tracemalloc.stop()
+    return frames, seconds, allocated / max(1, frames), frame_sized
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-frame allocations of the decode loops.")
+    parser.add_argument("--video", help="Benchmark an existing file instead of generating a fixture")
+    parser.add_argument("--frames", type=int, default=300, help="Fixture length in frames")
+    parser.add_argument("--size", default="3840x2160", help="Fixture frame size")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        video_path = args.video
+        if video_path is None:
+            video_path = str(Path(tmp) / "fixture.mp4")
+            print(f"Generating {args.frames}-frame {args.size} fixture...")
+            make_fixture(video_path, args.frames, args.size)
+
+        info = get_video_info(video_path)
+        frame_bytes = info.width * info.height * 3
+        print(f"{info.width}x{info.height}, {frame_bytes / 1e6:.1f} MB per frame")
+        print(f"{'loop':>14} {'frames':>7} {'fps':>7} {'MB alloc/frame':>15} {'frame-sized allocs':>19}")
+        for name, loop in (("read+cvtColor", naive_loop), ("reused dst", reused_loop),
+                           ("read_frames", read_frames_loop)):
+            frames, seconds, per_frame, frame_sized = measure(loop, video_path, frame_bytes)
+            print(f"{name:>14} {frames:7d} {frames / seconds:7.1f} {per_frame / 1e6:15.2f} "
+                  f"{frame_sized:12d} / {frames}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark MTCNN at reduced detection resolutions against full-resolution detection.
+
+For a set of evenly spaced frames, faces found at full resolution are the
+reference. Each detection short edge reports its per-frame time, speedup and
+how many reference faces (and how small) it loses.
+
+Usage: python benchmarks/benchDetectionResolution.py <video> [--frames 20] [--short-edges 1080 720 540]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+from mtcnn import MTCNN
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from faceDetectionTools.generateTrainingFaces import (
+    get_detection_scale, resize_for_detection, map_detection_to_source
+)
+
+
+def load_frames(video_path, count):
+    video = cv2.VideoCapture(video_path)
+    if not video.isOpened():
+        raise ValueError(f"Could not open video file {video_path}")
+    total_frames = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
+    frames = []
+    for frame_num in np.linspace(0, max(0, total_frames - 1), count).astype(int):
+        video.set(cv2.CAP_PROP_POS_FRAMES, int(frame_num))
+        ret, frame = video.read()
+        if ret:
+            frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    video.release()
+    return frames
+
+
+def iou(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = ix * iy
+    union = aw * ah + bw * bh - inter
+    return inter / union if union else 0.0
+
+
+def detect(frames, short_edge, min_face_size, min_confidence):
+    scale = get_detection_scale(frames[0].shape, short_edge)
+    detector = MTCNN(min_face_size=max(12, int(min_face_size * scale)))
+    boxes = []
+    start = time.perf_counter()
+    for frame in frames:
+        faces = detector.detect_faces(resize_for_detection(frame, scale))
+        boxes.append([map_detection_to_source(f, scale, frame.shape)['box']
+                      for f in faces if f['confidence'] >= min_confidence])
+    return boxes, (time.perf_counter() - start) / len(frames)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark downscaled MTCNN detection.")
+    parser.add_argument("video_path", help="Path to the video file")
+    parser.add_argument("--frames", type=int, default=20, help="Number of evenly spaced frames to test")
+    parser.add_argument("--short-edges", type=int, nargs="+", default=[1080, 720, 540, 360],
+                        help="Detection short edges to compare against full resolution")
+    parser.add_argument("--min-face-size", type=int, default=40, help="Minimum face size in source pixels")
+    parser.add_argument("--min-confidence", type=float, default=0.95, help="Minimum detection confidence")
+    args = parser.parse_args()
+
+    frames = load_frames(args.video_path, args.frames)
+    if not frames:
+        print("Error: no frames could be read")
+        sys.exit(1)
+    height, width = frames[0].shape[:2]
+    print(f"{len(frames)} frames at {width}x{height}")
+
+    reference, reference_time = detect(frames, 0, args.min_face_size, args.min_confidence)
+    total_reference = sum(len(b) for b in reference)
+    print(f"{'short edge':>10} {'ms/frame':>10} {'speedup':>8} {'faces':>6} {'lost':>5} {'lost median px':>15}")
+    print(f"{'full':>10} {reference_time * 1000:10.1f} {1.0:8.2f} {total_reference:6d} {0:5d} {'-':>15}")
+
+    for short_edge in args.short_edges:
+        if short_edge >= min(height, width):
+            continue
+        boxes, per_frame = detect(frames, short_edge, args.min_face_size, args.min_confidence)
+        lost_sizes = [
+            min(ref[2], ref[3])
+            for ref_boxes, found in zip(reference, boxes)
+            for ref in ref_boxes
+            if not any(iou(ref, box) >= 0.5 for box in found)
+        ]
+        lost_median = f"{np.median(lost_sizes):.0f}" if lost_sizes else "-"
+        print(f"{short_edge:10d} {per_frame * 1000:10.1f} {reference_time / per_frame:8.2f} "
+              f"{sum(len(b) for b in boxes):6d} {len(lost_sizes):5d} {lost_median:>15}")
+
+
+if __name__ == "__main__":
+    main()
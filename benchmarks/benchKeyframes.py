@@ -0,0 +1,80 @@
+"""
+Benchmark keyframe-only extraction against a full decode.
+
+Generates a long-GOP H.264 fixture with ffmpeg (one keyframe every
+--gop-seconds), then times decoding every frame with OpenCV against
+frameSampling.read_keyframes, which skips non-key frames in the decoder.
+Both runs produce BGR frames; nothing is written to disk.
+
+Usage: python benchmarks/benchKeyframes.py [--duration 120] [--gop-seconds 10] [--size 1920x1080]
+       python benchmarks/benchKeyframes.py --video existing.mp4
+"""
+import argparse
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from frameSampling import read_keyframes
+
+
+def make_fixture(path, duration, gop_seconds, size, fps=25):
+    gop = int(gop_seconds * fps)
+    cmd = [
+        'ffmpeg', '-v', 'error', '-y', '-f', 'lavfi',
+        '-i', f"testsrc2=size={size}:rate={fps}", '-t', str(duration),
+        '-c:v', 'libx264', '-preset', 'veryfast', '-pix_fmt', 'yuv420p',
+        '-g', str(gop), '-keyint_min', str(gop), '-sc_threshold', '0', str(path)
+    ]
+    subprocess.run(cmd, check=True)
+
+
+def full_decode(video_path):
+    cap = cv2.VideoCapture(video_path)
+    frames = 0
+    start = time.perf_counter()
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames += 1
+    cap.release()
+    return frames, time.perf_counter() - start
+
+
+def keyframe_decode(video_path):
+    start = time.perf_counter()
+    frames = sum(1 for _ in read_keyframes(video_path))
+    return frames, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark keyframe-only extraction.")
+    parser.add_argument("--video", help="Benchmark an existing file instead of generating a fixture")
+    parser.add_argument("--duration", type=float, default=120, help="Fixture length in seconds")
+    parser.add_argument("--gop-seconds", type=float, default=10, help="Fixture keyframe interval in seconds")
+    parser.add_argument("--size", default="1920x1080", help="Fixture frame size")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        video_path = args.video
+        if video_path is None:
+            video_path = str(Path(tmp) / "long_gop.mp4")
+            print(f"Generating {args.duration:.0f} s {args.size} fixture, keyframe every {args.gop_seconds} s...")
+            make_fixture(video_path, args.duration, args.gop_seconds, args.size)
+
+        full_frames, full_time = full_decode(video_path)
+        key_frames, key_time = keyframe_decode(video_path)
+
+    print(f"{'mode':>10} {'frames':>8} {'seconds':>9} {'frames/s':>9}")
+    print(f"{'full':>10} {full_frames:8d} {full_time:9.2f} {full_frames / full_time:9.1f}")
+    print(f"{'keyframes':>10} {key_frames:8d} {key_time:9.2f} {key_frames / key_time:9.1f}")
+    print(f"Speedup: {full_time / key_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
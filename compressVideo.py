@@ -1,59 +1,340 @@
+import argparse
+import math
+import os
+import statistics
 import subprocess
 import sys
-import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from mediaProbe import probe
+from seekIndex import load_seek_index
+
+# Audio bitrate to subtract from target total bitrate to get video bitrate
+AUDIO_BITRATE = 128000  # This is a good default for decent quality audio
+
+# CRFs encoded on the sample windows to fit the size model
+SAMPLE_CRFS = (18, 24, 30, 36)
+# Preset for the CRF probes; one pass at the real preset corrects the fit afterwards
+PROBE_PRESET = 'veryfast'
+# Skip prediction when the probes (all CRFs together) would encode more than this share of the file
+MAX_SAMPLE_SHARE = 0.25
+# Peak video bitrate allowed above the average budget
+MAXRATE_FACTOR = 1.5
+
+
+def target_video_bitrate(target_size_MB, duration_seconds, audio_bitrate=AUDIO_BITRATE):
+    """Video bitrate (bits/s) that fills target_size_MB over the duration, after the audio share."""
+    target_total_bitrate = (target_size_MB * 8 * 1024 * 1024) / duration_seconds
+    return target_total_bitrate - audio_bitrate
 
-def compress_video(input_path, output_path, target_size_MB, crf_value=23):
+
+def _run_ffmpeg(cmd):
+    start = time.perf_counter()
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {result.stderr.strip()[-500:]}")
+    return time.perf_counter() - start
+
+
+def sample_plan(duration_seconds, crf_count=len(SAMPLE_CRFS)):
+    """
+    (samples, sample_seconds) for the CRF probes, scaled to the duration: 3 one-second
+    samples for short files up to 8 four-second samples for long ones. None when the
+    probes would cover more than MAX_SAMPLE_SHARE of the file.
+    """
+    samples = min(8, 3 + int(duration_seconds // 120))
+    sample_seconds = min(4.0, max(1.0, duration_seconds / 100))
+    if crf_count * samples * sample_seconds > MAX_SAMPLE_SHARE * duration_seconds:
+        return None
+    return samples, sample_seconds
+
+
+def sample_starts(duration_seconds, samples, sample_seconds):
+    """Start times of `samples` evenly spaced windows; one window over the whole file when it is short."""
+    if duration_seconds <= samples * sample_seconds:
+        return [0.0]
+    spacing = duration_seconds / samples
+    return [spacing * (i + 0.5) - sample_seconds / 2 for i in range(samples)]
+
+
+def predict_crf(input_path, video_bitrate, samples=None, sample_seconds=None,
+                crf_candidates=SAMPLE_CRFS, preset='slower', probe_preset=PROBE_PRESET):
+    """
+    Predict the CRF whose average video bitrate matches `video_bitrate`.
+
+    Encodes short, evenly spaced samples at each candidate CRF with the fast
+    `probe_preset`, all in parallel, and fits log(bitrate) = a + b * crf, which
+    holds closely for x264 over the usable range. The samples are then encoded
+    once more at the real `preset` and the predicted CRF, and the fit is
+    shifted by the measured difference, since the bitrate ratio between two
+    presets depends on the CRF. Samples default to sample_plan(duration).
+
+    Returns (crf, in_range): in_range is False when the target lies outside
+    the sampled CRFs and the fit had to extrapolate. Returns (None, False)
+    when the file is too short for the samples to be worth encoding.
+    """
+    duration = probe(input_path).duration
+    if samples is None or sample_seconds is None:
+        plan = sample_plan(duration, len(crf_candidates))
+        if plan is None:
+            return None, False
+        samples, sample_seconds = plan
+    starts = sample_starts(duration, samples, sample_seconds)
+    window = min(sample_seconds, duration)
+
+    with tempfile.TemporaryDirectory(prefix="crf_samples_") as tmp:
+        def log_bitrates(crfs, sample_preset):
+            """Encode every sample at each CRF in parallel; log of the mean bitrate per CRF."""
+            jobs = [(crf, number, start) for crf in crfs for number, start in enumerate(starts)]
+            workers = min(len(jobs), os.cpu_count() or 1)
+            threads = max(1, (os.cpu_count() or 1) // workers)
+            paths = [os.path.join(tmp, f"crf{crf}_{number}_{sample_preset}.mkv") for crf, number, _ in jobs]
+            commands = [['ffmpeg', '-v', 'error', '-y', '-ss', f"{start:.3f}", '-i', input_path, '-t', str(window),
+                         '-map', '0:v:0', '-an', '-c:v', 'libx264', '-preset', sample_preset, '-crf', str(crf),
+                         '-threads', str(threads), path]
+                        for path, (crf, _, start) in zip(paths, jobs)]
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(_run_ffmpeg, commands))
+            total_bytes = {crf: 0 for crf in crfs}
+            for path, (crf, _, _) in zip(paths, jobs):
+                total_bytes[crf] += os.path.getsize(path)
+            return [math.log(total_bytes[crf] * 8 / (window * len(starts))) for crf in crfs]
+
+        slope, intercept = statistics.linear_regression(list(crf_candidates),
+                                                        log_bitrates(crf_candidates, probe_preset))
+        crf = (math.log(video_bitrate) - intercept) / slope
+        if preset != probe_preset:
+            check_crf = round(min(max(crf, min(crf_candidates)), max(crf_candidates)), 1)
+            intercept += log_bitrates([check_crf], preset)[0] - (intercept + slope * check_crf)
+            crf = (math.log(video_bitrate) - intercept) / slope
+
+    in_range = min(crf_candidates) <= crf <= max(crf_candidates)
+    return round(min(max(crf, 0.0), 51.0), 1), in_range
+
+
+def video_rate_args(video_bitrate, crf=None):
+    """x264 rate control: CRF capped by maxrate when a CRF is given, else average bitrate with a VBV cap."""
+    cap = ['-maxrate', str(int(video_bitrate * MAXRATE_FACTOR)), '-bufsize', str(int(video_bitrate * 2))]
+    if crf is not None:
+        return ['-crf', str(crf)] + cap
+    return ['-b:v', str(int(video_bitrate))] + cap
+
+
+def compress_video(input_path, output_path, target_size_MB, crf_value=None, rate_control="auto", preset='slower'):
     """
     Compresses a video file to a target size with as much quality retention as possible.
-    
+
     Args:
     input_path (str): Path to the input video file.
     output_path (str): Path where the compressed video will be saved.
     target_size_MB (int): Target size in megabytes for the output video.
-    crf_value (int): Constant Rate Factor for quality (default is 23, the range is 0-51, where lower numbers are higher quality).
+    crf_value (float): Constant Rate Factor for quality (0-51, where lower numbers are higher quality).
+        Predicted from sample encodes when not given.
+    rate_control (str): "crf" encodes once at the (predicted) CRF capped by maxrate, "2pass" runs a
+        two-pass encode at the target bitrate, "auto" uses CRF when the prediction did not extrapolate.
     """
-    
-    # Calculate target bitrate based on the desired size (in bits)
-    duration_seconds = float(subprocess.check_output(
-        f'ffprobe -v error -show_entries format=duration -of default=noprint_wrappers=1:nokey=1 "{input_path}"',
-        shell=True))
-    target_total_bitrate = (target_size_MB * 8 * 1024 * 1024) / duration_seconds
-    
-    # Audio bitrate to subtract from target total bitrate to get video bitrate
-    audio_bitrate = 128000  # This is a good default for decent quality audio
 
-    # Calculate video bitrate
-    video_bitrate = target_total_bitrate - audio_bitrate
+    # Calculate target bitrate based on the desired size (in bits)
+    duration_seconds = probe(input_path).duration
+    audio_bitrate = AUDIO_BITRATE
+    video_bitrate = target_video_bitrate(target_size_MB, duration_seconds, audio_bitrate)
 
     if video_bitrate <= 0:
         print("Error: Target size too low to accommodate even audio bitrate.")
         sys.exit(1)
-    
+
+    start = time.perf_counter()
+    if crf_value is None and rate_control != "2pass":
+        crf_value, in_range = predict_crf(input_path, video_bitrate, preset=preset)
+        if crf_value is None:
+            print("Video too short for sample encodes to pay off, using a two-pass encode instead")
+            rate_control = "2pass"
+        else:
+            print(f"Predicted CRF {crf_value} for {video_bitrate / 1000:.0f} kb/s "
+                  f"from sample encodes ({time.perf_counter() - start:.1f} s)")
+        if rate_control == "auto" and not in_range:
+            print("Prediction is outside the sampled CRF range, using a two-pass encode instead")
+            rate_control = "2pass"
+
     # Build and run ffmpeg command
-    cmd = (
-        f'ffmpeg -i "{input_path}" -b:v {int(video_bitrate)} -crf {crf_value} '
-        f'-b:a {int(audio_bitrate)} -preset slower "{output_path}"'
-    )
-    subprocess.run(cmd, shell=True)
-    
+    audio_args = ['-c:a', 'aac', '-b:a', str(int(audio_bitrate))]
+    if rate_control == "2pass":
+        with tempfile.TemporaryDirectory(prefix="2pass_") as tmp:
+            passlog = os.path.join(tmp, "ffmpeg2pass")
+            video_args = ['-c:v', 'libx264', '-preset', preset, '-b:v', str(int(video_bitrate)),
+                          '-passlogfile', passlog]
+            subprocess.run(['ffmpeg', '-y', '-i', input_path] + video_args + ['-pass', '1', '-an', '-f', 'null', os.devnull])
+            subprocess.run(['ffmpeg', '-y', '-i', input_path] + video_args + ['-pass', '2'] + audio_args + [output_path])
+    else:
+        cmd = (['ffmpeg', '-y', '-i', input_path, '-c:v', 'libx264', '-preset', preset]
+               + video_rate_args(video_bitrate, crf_value) + audio_args + [output_path])
+        subprocess.run(cmd)
+
     # Verify that file has been created
     if not os.path.isfile(output_path):
         print("Error: Compression failed, output file not created.")
         sys.exit(1)
     else:
+        report_size(output_path, target_size_MB, time.perf_counter() - start)
         print(f"Compression successful. File saved at {output_path}")
 
+
+def report_size(output_path, target_size_MB, seconds, tolerance=0.05):
+    """Print the output size against the target; returns the relative deviation."""
+    size = os.path.getsize(output_path)
+    target_bytes = target_size_MB * 1024 * 1024
+    deviation = (size - target_bytes) / target_bytes
+    print(f"Output size {size / 1024 / 1024:.2f} MB, target {target_size_MB} MB ({deviation:+.1%}), "
+          f"{seconds:.1f} s in total")
+    if deviation > tolerance:
+        print(f"Warning: output exceeds the target by more than {tolerance:.0%}")
+    return deviation
+
+
+def plan_chunks(frame_count, keyframe_frames, chunks):
+    """
+    Split [0, frame_count) into up to `chunks` ranges that start on keyframes.
+
+    Each boundary is the keyframe nearest to an even split, so segments are
+    roughly equal in length and every one decodes independently.
+    """
+    keyframes = sorted(set(k for k in keyframe_frames if 0 < k < frame_count))
+    starts = [0]
+    for i in range(1, chunks):
+        ideal = frame_count * i / chunks
+        candidates = [k for k in keyframes if k > starts[-1]]
+        if not candidates:
+            break
+        nearest = min(candidates, key=lambda k: abs(k - ideal))
+        if nearest not in starts:
+            starts.append(nearest)
+    ends = starts[1:] + [frame_count]
+    return list(zip(starts, ends))
+
+
+def compress_video_chunked(input_path, output_path, target_size_MB, chunks=None,
+                           preset='slower', crf_value=None, predict=True):
+    """
+    Compress to a target size by encoding keyframe-aligned segments concurrently.
+
+    Every segment is encoded in its own ffmpeg process with the same rate
+    control: the CRF predicted from sample encodes (capped by maxrate), or
+    the target average bitrate when the prediction had to extrapolate or
+    `predict` is False. Either way each segment gets a share of the size
+    budget proportional to its length. Audio is encoded once alongside them.
+    The segments are then joined losslessly with the concat demuxer and
+    muxed with the audio.
+
+    Returns a dict with the wall-clock seconds, output size and the deviation
+    from the target size.
+    """
+    chunks = chunks or os.cpu_count() or 1
+    info = probe(input_path)
+    index = load_seek_index(input_path)
+    fps = index.fps or info.frame_rate
+    video_bitrate = target_video_bitrate(target_size_MB, info.duration)
+    if video_bitrate <= 0:
+        raise ValueError("Target size too low to accommodate even audio bitrate.")
+
+    start = time.perf_counter()
+    if crf_value is None and predict:
+        crf_value, in_range = predict_crf(input_path, video_bitrate, preset=preset)
+        if crf_value is None:
+            print("Video too short for sample encodes to pay off, encoding segments at the average bitrate")
+        else:
+            print(f"Predicted CRF {crf_value} for {video_bitrate / 1000:.0f} kb/s "
+                  f"from sample encodes ({time.perf_counter() - start:.1f} s)")
+        if crf_value is not None and not in_range:
+            print("Prediction is outside the sampled CRF range, encoding segments at the average bitrate")
+            crf_value = None
+
+    ranges = plan_chunks(index.frame_count, index.keyframe_frames, chunks)
+    keyframe_times = {frame: pts - index.start_pts
+                      for frame, pts in zip(index.keyframe_frames, index.keyframe_pts)}
+    threads = max(1, (os.cpu_count() or 1) // len(ranges))
+    has_audio = bool(info.audio_tracks)
+    output_dir = os.path.dirname(os.path.abspath(output_path))
+
+    with tempfile.TemporaryDirectory(dir=output_dir, prefix=".compress_") as tmp:
+        segment_paths = []
+        commands = []
+        for number, (first, end) in enumerate(ranges):
+            segment_path = os.path.join(tmp, f"segment_{number:04d}.mp4")
+            segment_paths.append(segment_path)
+            # -ss before -i is relative to the start time; boundaries are keyframes, so no frames are lost
+            seek = keyframe_times.get(first, first / fps)
+            commands.append([
+                'ffmpeg', '-v', 'error', '-y', '-ss', f"{seek:.6f}", '-i', input_path,
+                '-frames:v', str(end - first), '-map', '0:v:0', '-an',
+                '-c:v', 'libx264', '-preset', preset, *video_rate_args(video_bitrate, crf_value),
+                '-threads', str(threads), segment_path
+            ])
+        audio_path = os.path.join(tmp, "audio.m4a")
+        if has_audio:
+            commands.append([
+                'ffmpeg', '-v', 'error', '-y', '-i', input_path, '-map', '0:a:0', '-vn',
+                '-c:a', 'aac', '-b:a', str(AUDIO_BITRATE), audio_path
+            ])
+
+        with ThreadPoolExecutor(max_workers=len(commands)) as pool:
+            encode_seconds = list(pool.map(_run_ffmpeg, commands))
+
+        list_path = os.path.join(tmp, "segments.txt")
+        with open(list_path, "w") as f:
+            for segment_path in segment_paths:
+                f.write(f"file '{segment_path}'\n")
+        cmd = ['ffmpeg', '-v', 'error', '-y', '-f', 'concat', '-safe', '0', '-i', list_path]
+        if has_audio:
+            cmd += ['-i', audio_path, '-map', '0:v', '-map', '1:a']
+        cmd += ['-c', 'copy', output_path]
+        _run_ffmpeg(cmd)
+    seconds = time.perf_counter() - start
+
+    print(f"Encoded {len(ranges)} segments (segment encodes took "
+          f"{sum(encode_seconds[:len(ranges)]):.1f} s in total)")
+    deviation = report_size(output_path, target_size_MB, seconds)
+    return {"seconds": seconds, "segments": len(ranges), "size": os.path.getsize(output_path),
+            "deviation": deviation}
+
+
 if __name__ == "__main__":
-    # Parse command line arguments
-    if len(sys.argv) != 3:
-        print("Usage: python compress_video.py input_path target_size_MB")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Compress a video to a target size.")
+    parser.add_argument("input_path", help="Video to compress")
+    parser.add_argument("target_size_MB", type=int, help="Target size in megabytes")
+    parser.add_argument("--chunks", type=int, nargs="?", const=0, default=None,
+                        help="Encode N keyframe-aligned segments in parallel (default with no N: one per core)")
+    parser.add_argument("--rate-control", choices=["auto", "crf", "2pass"], default="auto",
+                        help="CRF predicted from sample encodes, two-pass at the target bitrate, "
+                             "or CRF unless the prediction extrapolates (default)")
+    parser.add_argument("--crf", type=float, help="Use this CRF instead of predicting one")
+    parser.add_argument("--compare", action="store_true",
+                        help="With --chunks, also run a single-segment encode and report the wall-clock speedup")
+    args = parser.parse_args()
+
+    input_path = args.input_path
+    target_size_MB = args.target_size_MB
 
-    input_path = sys.argv[1]
-    target_size_MB = int(sys.argv[2])
-    
     # Output path is the same as the input with "_compressed" appended
     base, ext = os.path.splitext(input_path)
     output_path = f"{base}_compressed{ext}"
 
-    compress_video(input_path, output_path, target_size_MB)
+    if args.chunks is None:
+        compress_video(input_path, output_path, target_size_MB, crf_value=args.crf, rate_control=args.rate_control)
+        sys.exit(0)
+
+    try:
+        chunked = compress_video_chunked(input_path, output_path, target_size_MB, chunks=args.chunks or None,
+                                         crf_value=args.crf, predict=args.rate_control != "2pass")
+        if args.compare:
+            serial_path = f"{base}_compressed_serial{ext}"
+            serial = compress_video_chunked(input_path, serial_path, target_size_MB, chunks=1,
+                                            crf_value=args.crf, predict=args.rate_control != "2pass")
+            os.remove(serial_path)
+            print(f"Speedup: {serial['seconds'] / chunked['seconds']:.2f}x "
+                  f"({serial['seconds']:.1f} s single segment vs {chunked['seconds']:.1f} s chunked)")
+    except (ValueError, RuntimeError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    print(f"Compression successful. File saved at {output_path}")
@@ -1,37 +1,205 @@
 import cv2
+import csv
 import os
 import argparse
+from functools import partial
 from pathlib import Path
 
-def create_frames(video_file_path, fps):
-    video = cv2.VideoCapture(video_file_path)
-    video_fps = video.get(cv2.CAP_PROP_FPS)
-    frame_interval = int(round(video_fps / fps))
-    output_dir = Path(video_file_path).parent.joinpath("extractedFrames")
-    output_dir.mkdir(exist_ok=True)
-    
-    count = 0
-    saved_frame_count = 0
-    while True:
-        ret, frame = video.read()
-        if not ret:
-            break
-        if count % frame_interval == 0:
-            frame_file = output_dir / f"frame_{saved_frame_count:04d}.png"
-            cv2.imwrite(str(frame_file), frame)
-            saved_frame_count += 1
-        count += 1
-
-    video.release()
-    print(f"Extracted {saved_frame_count} frames to {output_dir}")
+from frameSampling import (read_frames, read_keyframes, keyframe_seek_index, exact_video_info,
+                           plan_frame_indices, frame_name_width)
+from framePool import FramePool
+from frameWriter import write_frames, encode_frames, image_params, default_workers
+from frameStore import create_frame_store
+from frameBatch import claim_output_dir, expand_inputs, run_batch
+from frameDedupe import dhash
+from frameIndex import INDEX_FILE_NAME, bytes_hash, index_extraction
+from parallelExtract import extract_parallel
+
+def create_frames(video_file_path, fps, strategy="auto", image_format="png",
+                  png_compression=None, jpeg_quality=None, workers=None, queue_depth=None,
+                  segments=1, container="none", keyframes=False, output_dir=None, resume=False,
+                  index_path=None):
+    """
+    Extract frames next to the video (or into `output_dir`) and return how many were written.
+    With `resume`, frames already present in a loose-file output are kept and not extracted again,
+    provided the folder was written from this same video.
+    Every output frame is recorded in an SQLite frame index (`index_path`, by default
+    frames.sqlite in the output folder or next to the container).
+    """
+    params = image_params(image_format, png_compression, jpeg_quality)
+    info = exact_video_info(video_file_path)
+    workers = workers or default_workers()
+    queue_depth = queue_depth or 2 * workers
+
+    # PTS of every frame read, by frame index; keyframe mode takes them from the packet scan
+    frame_pts = {}
+    if keyframes:
+        if segments > 1:
+            raise ValueError("--keyframes cannot be combined with --segments")
+        seek_index = keyframe_seek_index(video_file_path)
+        frame_total = len(seek_index.keyframe_frames)
+
+        def decode(pool):
+            for frame_index, pts, frame in read_keyframes(video_file_path, seek_index=seek_index, pool=pool):
+                frame_pts[frame_index] = pts
+                yield frame_index, frame
+    else:
+        indices = plan_frame_indices(info, fps=fps)
+        frame_total = len(indices)
+
+        def decode(pool):
+            return read_frames(video_file_path, indices, info, strategy, pool=pool)
+
+    # dHash of every frame read, for the frame index
+    dhashes = {}
+
+    # Writer threads and encoders finish frames out of order, so each one hands its
+    # frame buffer back to the pool when done; the reader waits while all are held
+    pool = FramePool(queue_depth + workers + 1)
+
+    def read():
+        for frame_index, frame in decode(pool):
+            dhashes[frame_index] = dhash(frame)
+            yield frame_index, frame
+
+    if container != "none":
+        if segments > 1:
+            raise ValueError("--container cannot be combined with --segments")
+        output_dir = Path(output_dir or Path(video_file_path).parent.joinpath("extractedFrames"))
+        store_path = output_dir.with_name(output_dir.name + (".tar" if container == "tar" else ".frames"))
+        frames = read()
+        content_hashes = {}
+        with create_frame_store(store_path, container, info.fps, image_format, params) as store:
+            if container == "tar":
+                for frame_index, data in encode_frames(frames, image_format, params, workers, queue_depth,
+                                                       release=pool.release):
+                    store.append_encoded(frame_index, data, frame_pts.get(frame_index))
+                    content_hashes[frame_index] = bytes_hash(data)
+            else:
+                for frame_index, frame in frames:
+                    store.append(frame_index, frame, frame_pts.get(frame_index))
+                    content_hashes[frame_index] = bytes_hash(frame)
+                    pool.release(frame)
+            count = len(store.index)
+        index_extraction(index_path or f"{store_path}.sqlite", video_file_path, info.fps,
+                         [(frame_index, store_path) for frame_index in content_hashes],
+                         frame_pts, dhashes, content_hashes, output_location=store_path)
+        print(f"Extracted {count} frames to {store_path}")
+        return count
+
+    output_dir = Path(output_dir or Path(video_file_path).parent.joinpath("extractedFrames"))
+    output_dir.mkdir(parents=True, exist_ok=True)
+    # Only frames of this same video are kept; a folder of another video raises ValueError
+    reusable = claim_output_dir(output_dir, video_file_path, resume)
+    width = frame_name_width(frame_total)
+
+    if keyframes:
+        def output_path_for(sequence, _):
+            return output_dir / f"frame_{sequence:0{width}d}.{image_format}"
+        present = []
+    else:
+        # Names follow the position in the full plan, so a resumed run fills in the gaps
+        sequence_of = {frame_index: sequence for sequence, frame_index in enumerate(indices)}
+
+        def output_path_for(_, frame_index):
+            return output_dir / f"frame_{sequence_of[frame_index]:0{width}d}.{image_format}"
+
+        if reusable:
+            done = {i for i in indices
+                    if output_path_for(None, i).exists() and output_path_for(None, i).stat().st_size}
+            present = [(i, output_path_for(None, i)) for i in indices if i in done]
+            indices = [i for i in indices if i not in done]
+        else:
+            present = []
+    existing = len(present)
+    index_path = index_path or output_dir / INDEX_FILE_NAME
+
+    if segments > 1:
+        dhashes = extract_parallel(video_file_path, info, indices, output_path_for, segments, params)
+        written = [(i, output_path_for(None, i)) for i in indices if output_path_for(None, i).exists()]
+        count = index_extraction(index_path, video_file_path, info.fps, present + written, dhashes=dhashes,
+                                   output_location=output_dir)
+        print(f"Extracted {count} frames to {output_dir} using {segments} segments")
+        return count
+
+    written = write_frames(read(), output_path_for, workers=workers,
+                           queue_depth=queue_depth, params=params, release=pool.release)
+
+    if keyframes:
+        with open(output_dir / "keyframes.csv", "w", newline="") as f:
+            writer = csv.writer(f)
+            # pts_time counts from the first video frame, like the frame index; packet_pts_time is
+            # the PTS as stored in the file (pts_time plus the stream start time)
+            writer.writerow(["file", "frame_number", "pts_time", "packet_pts_time"])
+            for frame_index, path in written:
+                pts = frame_pts[frame_index]
+                writer.writerow([path.name, frame_index, f"{pts:.6f}", f"{pts + seek_index.start_pts:.6f}"])
+
+    count = index_extraction(index_path, video_file_path, info.fps, present + written, frame_pts, dhashes,
+                             output_location=output_dir)
+    if existing:
+        print(f"Extracted {len(written)} frames to {output_dir} ({existing} already present)")
+    else:
+        print(f"Extracted {count} frames to {output_dir}")
+    return count
 
 def main():
     parser = argparse.ArgumentParser(description="Extract frames from a video at specified FPS.")
-    parser.add_argument("video_file_path", type=str, help="Path to the video file.")
+    parser.add_argument("video_file_path", type=str, nargs="+",
+                        help="Path to the video file, or several files, directories or glob patterns for batch mode.")
     parser.add_argument("--fps", type=float, default=1.0, help="Frames per second to extract.")
+    parser.add_argument("--strategy", choices=["auto", "grab", "seek", "ffmpeg"], default="auto",
+                        help="How frames are read (default: pick automatically).")
+    parser.add_argument("--format", choices=["png", "jpg"], default="png", help="Output image format.")
+    parser.add_argument("--png-compression", type=int, choices=range(10), metavar="0-9",
+                        help="PNG compression level (lower is faster, larger files).")
+    parser.add_argument("--jpeg-quality", type=int, choices=range(101), metavar="0-100",
+                        help="JPEG quality.")
+    parser.add_argument("--workers", type=int,
+                        help="Number of image writer threads (default: one per core, shared between batch jobs).")
+    parser.add_argument("--queue-depth", type=int,
+                        help="Decoded frames allowed to wait for a writer (default: 2 per writer).")
+    parser.add_argument("--segments", type=int, default=1,
+                        help="Split long videos into this many keyframe-aligned ranges decoded in parallel processes.")
+    parser.add_argument("--container", choices=["none", "tar", "array"], default="none",
+                        help="Write one indexed container instead of loose images: a tar of encoded "
+                             "frames or a chunked memory-mapped array store.")
+    parser.add_argument("--keyframes", action="store_true",
+                        help="Extract only keyframes (I-frames), skipping decode of all other frames; "
+                             "ignores --fps and --strategy and records each keyframe's PTS.")
+    parser.add_argument("--index",
+                        help="SQLite frame index to record outputs in (default: frames.sqlite in the output "
+                             "folder, or <container>.sqlite); several runs may share one file.")
+    parser.add_argument("--jobs", type=int,
+                        help="Batch mode: videos processed in parallel (default: one per core).")
+    parser.add_argument("--manifest", default="createFrames_manifest.json",
+                        help="Batch mode: manifest recording finished videos, so reruns skip or resume them.")
     args = parser.parse_args()
 
-    create_frames(args.video_file_path, args.fps)
+    options = dict(fps=args.fps, strategy=args.strategy, image_format=args.format,
+                   png_compression=args.png_compression, jpeg_quality=args.jpeg_quality,
+                   queue_depth=args.queue_depth, segments=args.segments,
+                   container=args.container, keyframes=args.keyframes, index_path=args.index)
+
+    if len(args.video_file_path) == 1 and os.path.isfile(args.video_file_path[0]):
+        try:
+            create_frames(args.video_file_path[0], workers=args.workers, **options)
+        except ValueError as e:
+            print(f"Error: {e}")
+        return
+
+    videos = expand_inputs(args.video_file_path)
+    if not videos:
+        print("Error: no video files found")
+        return
+    jobs = args.jobs or default_workers()
+    workers = args.workers or max(1, default_workers() // jobs)
+    run_batch(videos, partial(create_frames_batch_job, workers=workers, **options), args.manifest, jobs)
+
+def create_frames_batch_job(video_file_path, **options):
+    # One output folder per video, so videos sharing a directory do not overwrite each other
+    output_dir = Path(video_file_path).parent / "extractedFrames" / Path(video_file_path).stem
+    return create_frames(video_file_path, output_dir=output_dir, resume=True, **options)
 
 if __name__ == "__main__":
     main()
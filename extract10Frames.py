@@ -1,17 +1,21 @@
 import cv2
 import sys
 
-video_file = sys.argv[1] 
+from frameSampling import sample_frames
 
-cap = cv2.VideoCapture(video_file)
+FRAME_COUNT = 10
 
-frame_count = 0
-success = True
-
-while success and frame_count < 10:
-    success, frame = cap.read()
-    if success:
+def extract_frames(video_file, count=FRAME_COUNT):
+    """Save `count` evenly spaced frames of the video as frame0.jpg, frame1.jpg, ..."""
+    frame_count = 0
+    for _, frame in sample_frames(video_file, count=count):
         cv2.imwrite(f"frame{frame_count}.jpg", frame)
         frame_count += 1
+    return frame_count
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python extract10Frames.py <video_file_path>")
+        sys.exit(1)
 
-cap.release()
\ No newline at end of file
+    extract_frames(sys.argv[1])
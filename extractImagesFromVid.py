@@ -1,52 +1,197 @@
 import cv2
+import csv
 import os
-import sys
+import argparse
+from functools import partial
+from pathlib import Path
+
+from frameSampling import (read_frames, read_keyframes, keyframe_seek_index, exact_video_info,
+                           plan_frame_indices, frame_name_width)
+from frameBatch import claim_output_dir, expand_inputs, run_batch
+from frameDedupe import FrameDeduper, dhash
+from frameIndex import INDEX_FILE_NAME, bytes_hash, index_extraction
+from frameStore import create_frame_store
+from parallelExtract import extract_parallel
 
 # Configuration: Number of images to extract per minute
 IMAGES_PER_MINUTE = 20
 
-def extract_images(video_path, images_per_minute):
-    # Create the output directory
+def extract_images(video_path, images_per_minute, segments=1, container="none", keyframes=False,
+                   dedupe_distance=None, resume=False, index_path=None, output_dir=None):
+    """
+    Extract images into `output_dir` (default `<video name>_images`, or a container) and return
+    how many were written.
+    With `resume`, images already present from an interrupted run of the same video are kept and
+    not extracted again; a folder holding another video's images raises ValueError.
+    Every output image is recorded in an SQLite frame index (`index_path`, by default
+    frames.sqlite in the output folder or next to the container).
+    Raises ValueError when the video or its keyframes cannot be read.
+    """
     video_name = os.path.basename(video_path).split('.')[0]
-    output_dir = f"{video_name}_images"
-    os.makedirs(output_dir, exist_ok=True)
+    info = exact_video_info(video_path)
+    indices = None
+    if keyframes:
+        if segments > 1:
+            raise ValueError("--keyframes cannot be combined with --segments")
+        seek_index = keyframe_seek_index(video_path)
+        frame_total = len(seek_index.keyframe_frames)
+    else:
+        indices = plan_frame_indices(info, images_per_minute=images_per_minute)
+        frame_total = len(indices)
 
-    # Open the video file
-    cap = cv2.VideoCapture(video_path)
-    if not cap.isOpened():
-        print(f"Error: Could not open video file {video_path}")
-        return
+    output_dir = str(output_dir or f"{video_name}_images")
+    width = frame_name_width(frame_total)
+    present = []
+    # Without keyframes or dedupe, names follow the position in the full plan,
+    # so a resumed run can fill in the gaps
+    planned_names = indices is not None and dedupe_distance is None
+    if planned_names:
+        sequence_of = {frame_index: sequence for sequence, frame_index in enumerate(indices)}
 
-    fps = cap.get(cv2.CAP_PROP_FPS)
-    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    duration_minutes = total_frames / (fps * 60)
-    frames_to_extract = int(duration_minutes * images_per_minute)
+    def output_path_for(sequence, frame_index):
+        if planned_names:
+            sequence = sequence_of[frame_index]
+        return os.path.join(output_dir, f"frame_{sequence:0{width}d}.jpg")
 
-    # Calculate the frame interval
-    frame_interval = total_frames // frames_to_extract
+    reusable = container == "none" and claim_output_dir(output_dir, video_path, resume)
+    if reusable and planned_names:
+        done = {i for i in indices
+                if os.path.exists(output_path_for(None, i)) and os.path.getsize(output_path_for(None, i))}
+        present = [(i, output_path_for(None, i)) for i in indices if i in done]
+        indices = [i for i in indices if i not in done]
+    existing = len(present)
+
+    if keyframes:
+        frames = read_keyframes(video_path, seek_index=seek_index)
+    else:
+        frames = ((frame_index, None, frame) for frame_index, frame in read_frames(video_path, indices, info))
+    deduper = None
+    if dedupe_distance is not None:
+        if segments > 1:
+            raise ValueError("--dedupe cannot be combined with --segments")
+        deduper = FrameDeduper(dedupe_distance)
+        frames = deduper.filter(frames)
+        dhashes = deduper.index
+    else:
+        dhashes = {}
+        frames = hash_frames(frames, dhashes)
+    frame_pts = {}
+
+    if container != "none":
+        if segments > 1:
+            raise ValueError("--container cannot be combined with --segments")
+        store_path = f"{output_dir}.tar" if container == "tar" else f"{output_dir}.frames"
+        content_hashes = {}
+        with create_frame_store(store_path, container, info.fps, "jpg") as store:
+            for frame_index, pts, frame in frames:
+                if container == "tar":
+                    ok, encoded = cv2.imencode(".jpg", frame)
+                    if not ok:
+                        raise IOError(f"Could not encode frame {frame_index}")
+                    store.append_encoded(frame_index, encoded.tobytes(), pts)
+                    content_hashes[frame_index] = bytes_hash(encoded)
+                else:
+                    store.append(frame_index, frame, pts)
+                    content_hashes[frame_index] = bytes_hash(frame)
+                if pts is not None:
+                    frame_pts[frame_index] = pts
+            extracted_count = len(store.index)
+        index_extraction(index_path or f"{store_path}.sqlite", video_path, info.fps,
+                         [(frame_index, store_path) for frame_index in content_hashes],
+                         frame_pts, dhashes, content_hashes, output_location=store_path)
+        print(f"Extracted {extracted_count} images to {store_path}")
+        report_dedupe(deduper)
+        return extracted_count
+
+    # Create the output directory
+    os.makedirs(output_dir, exist_ok=True)
+    index_path = index_path or os.path.join(output_dir, INDEX_FILE_NAME)
+
+    if segments > 1:
+        dhashes = extract_parallel(video_path, info, indices, output_path_for, segments)
+        written = [(i, output_path_for(None, i)) for i in indices if os.path.exists(output_path_for(None, i))]
+        extracted_count = index_extraction(index_path, video_path, info.fps, present + written,
+                                           dhashes=dhashes, output_location=output_dir)
+        print(f"Extracted {extracted_count} images to {output_dir}")
+        return extracted_count
 
-    frame_count = 0
     extracted_count = 0
+    written = []
+    keyframe_rows = []
+    for frame_index, pts, frame in frames:
+        output_path = output_path_for(extracted_count, frame_index)
+        cv2.imwrite(output_path, frame)
+        written.append((frame_index, output_path))
+        if keyframes:
+            frame_pts[frame_index] = pts
+            keyframe_rows.append([os.path.basename(output_path), frame_index, f"{pts:.6f}",
+                                  f"{pts + seek_index.start_pts:.6f}"])
+        extracted_count += 1
 
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
+    if keyframes:
+        with open(os.path.join(output_dir, "keyframes.csv"), "w", newline="") as f:
+            writer = csv.writer(f)
+            # Same columns as createFrames.py: relative and in-file PTS
+            writer.writerow(["file", "frame_number", "pts_time", "packet_pts_time"])
+            writer.writerows(keyframe_rows)
 
-        if frame_count % frame_interval == 0:
-            output_path = os.path.join(output_dir, f"frame_{extracted_count:04d}.jpg")
-            cv2.imwrite(output_path, frame)
-            extracted_count += 1
+    if existing:
+        print(f"Extracted {extracted_count} images to {output_dir} ({existing} already present)")
+    else:
+        print(f"Extracted {extracted_count} images to {output_dir}")
+    index_extraction(index_path, video_path, info.fps, present + written, frame_pts, dhashes,
+                     output_location=output_dir)
+    report_dedupe(deduper)
+    return existing + extracted_count
 
-        frame_count += 1
+def extract_images_batch_job(video_path, **options):
+    # One output folder per video, next to it, so videos with the same name do not share a folder
+    output_dir = Path(video_path).parent / f"{Path(video_path).stem}_images"
+    return extract_images(video_path, output_dir=output_dir, resume=True, **options)
 
-    cap.release()
-    print(f"Extracted {extracted_count} images to {output_dir}")
+def hash_frames(frames, dhashes):
+    """Pass frames through, recording each frame's dHash for the frame index."""
+    for frame_index, pts, frame in frames:
+        dhashes[frame_index] = dhash(frame)
+        yield frame_index, pts, frame
+
+def report_dedupe(deduper):
+    if deduper is not None:
+        stats = deduper.stats()
+        print(f"Dropped {stats['frames_dropped']} of {stats['frames_seen']} frames as near-duplicates")
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Usage: python extractImagesFromVid.py <video_file_path>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Extract evenly spaced images from a video.")
+    parser.add_argument("video_path", nargs="+",
+                        help="Path to the video file, or several files, directories or glob patterns for batch mode")
+    parser.add_argument("--images-per-minute", type=float, default=IMAGES_PER_MINUTE,
+                        help=f"Images to extract per minute of video (default: {IMAGES_PER_MINUTE})")
+    parser.add_argument("--segments", type=int, default=1,
+                        help="Split long videos into this many keyframe-aligned ranges decoded in parallel processes")
+    parser.add_argument("--container", choices=["none", "tar", "array"], default="none",
+                        help="Write one indexed container instead of loose images")
+    parser.add_argument("--keyframes", action="store_true",
+                        help="Extract only keyframes (I-frames) without decoding other frames, and record their PTS")
+    parser.add_argument("--dedupe", nargs="?", type=int, const=5, metavar="DISTANCE",
+                        help="Drop frames whose dHash is within DISTANCE bits (default 5) of the last kept frame")
+    parser.add_argument("--index", help="SQLite frame index to record outputs in (default: frames.sqlite in the "
+                                        "output folder, or <container>.sqlite); several runs may share one file")
+    parser.add_argument("--jobs", type=int, help="Batch mode: videos processed in parallel (default: one per core)")
+    parser.add_argument("--manifest", default="extractImages_manifest.json",
+                        help="Batch mode: manifest recording finished videos, so reruns skip or resume them")
+    args = parser.parse_args()
+
+    options = dict(images_per_minute=args.images_per_minute, segments=args.segments, container=args.container,
+                   keyframes=args.keyframes, dedupe_distance=args.dedupe, index_path=args.index)
 
-    video_path = sys.argv[1]
-    extract_images(video_path, IMAGES_PER_MINUTE)
+    if len(args.video_path) == 1 and os.path.isfile(args.video_path[0]):
+        try:
+            extract_images(args.video_path[0], **options)
+        except ValueError as e:
+            print(f"Error: {e}")
+    else:
+        videos = expand_inputs(args.video_path)
+        if videos:
+            run_batch(videos, partial(extract_images_batch_job, **options), args.manifest, args.jobs)
+        else:
+            print("Error: no video files found")
@@ -2,9 +2,13 @@
 Face Detection Tools Package
 
 This package contains tools for face detection, quality analysis, and training image generation.
+
+The package exports extract_faces, the training-face extraction entry point, and
+FaceDetectionConfig, its settings object, so callers such as the benchmarks can
+import them from the package.
 """
 
 from .face_quality import FaceQualityAnalyzer
-from .generateTrainingFaces import generate_training_faces
+from .generateTrainingFaces import extract_faces, FaceDetectionConfig
 
-__all__ = ['FaceQualityAnalyzer', 'generate_training_faces']
+__all__ = ['FaceQualityAnalyzer', 'extract_faces', 'FaceDetectionConfig']
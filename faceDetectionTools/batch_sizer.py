@@ -0,0 +1,109 @@
+import psutil
+from typing import Dict, List, Optional
+
+
+class AdaptiveBatchSizer:
+    """
+    Pick a detection batch size for CPU runs by measuring it.
+
+    During the first `probe_batches` batches the size is doubled while the
+    measured throughput (frames per second) keeps improving and there is
+    memory headroom for the next size. After that the size with the best
+    throughput is locked in. At any point the size is halved if system
+    memory use goes above `max_memory_percent`.
+    """
+
+    # Rough working-set multiplier for MTCNN's image pyramid relative to the RGB frame
+    PYRAMID_OVERHEAD = 4
+
+    def __init__(self, initial_batch_size: int = 2, max_batch_size: int = 32,
+                 probe_batches: int = 6, max_memory_percent: float = 85.0,
+                 min_gain: float = 0.05):
+        self.batch_size = max(1, initial_batch_size)
+        self.max_batch_size = max(self.batch_size, max_batch_size)
+        self.probe_batches = probe_batches
+        self.max_memory_percent = max_memory_percent
+        self.min_gain = min_gain
+
+        self.converged = False
+        self.chosen_batch_size: Optional[int] = None
+        self._batches_seen = 0
+        self._throughput: Dict[int, float] = {}
+        self.history: List[Dict] = []
+        self.shrink_events = 0
+
+    def _best_size(self) -> int:
+        """Largest measured size whose throughput beats every smaller size by `min_gain`."""
+        best = None
+        for size in sorted(self._throughput):
+            if best is None or self._throughput[size] > self._throughput[best] * (1 + self.min_gain):
+                best = size
+        return best
+
+    def _converge(self, size: int) -> None:
+        self.batch_size = size
+        self.chosen_batch_size = size
+        self.converged = True
+
+    def record(self, frames: int, seconds: float, frame_bytes: int = 0) -> int:
+        """
+        Record one processed batch and return the batch size to use next.
+
+        Args:
+            frames: Number of frames in the batch
+            seconds: Wall-clock time spent detecting the batch
+            frame_bytes: Size of one decoded frame, used to check memory headroom
+        """
+        if frames <= 0 or seconds <= 0:
+            return self.batch_size
+
+        memory = psutil.virtual_memory()
+        throughput = frames / seconds
+        self._batches_seen += 1
+        self.history.append({
+            "batch_size": frames,
+            "seconds_per_frame": seconds / frames,
+            "frames_per_second": throughput,
+            "memory_percent": memory.percent
+        })
+
+        if memory.percent >= self.max_memory_percent:
+            self.shrink_events += 1
+            size = max(1, self.batch_size // 2)
+            if self.converged:
+                self._converge(size)
+            else:
+                self.batch_size = size
+            return self.batch_size
+
+        # A short final batch says nothing about the size being probed
+        if self.converged or frames != self.batch_size:
+            return self.batch_size
+
+        # Keep the best observation for each size; the first batch pays warm-up costs
+        self._throughput[frames] = max(throughput, self._throughput.get(frames, 0.0))
+        best = self._best_size()
+
+        if self._batches_seen >= self.probe_batches:
+            self._converge(best)
+        elif frames == best and frames < self.max_batch_size:
+            next_size = min(self.max_batch_size, frames * 2)
+            needed = next_size * frame_bytes * self.PYRAMID_OVERHEAD
+            if needed and needed > memory.available * 0.5:
+                self._converge(best)
+            else:
+                self.batch_size = next_size
+        elif frames != best:
+            # Growing stopped paying off
+            self._converge(best)
+        return self.batch_size
+
+    def report(self) -> dict:
+        return {
+            "mode": "adaptive_cpu",
+            "chosen_batch_size": self.chosen_batch_size if self.converged else self.batch_size,
+            "converged": self.converged,
+            "shrink_events": self.shrink_events,
+            "throughput_by_batch_size": {str(k): v for k, v in sorted(self._throughput.items())},
+            "history": self.history
+        }
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import cv2
+import numpy as np
+from typing import List, Optional, Tuple
+
+
+def load_cheap_detector() -> cv2.CascadeClassifier:
+    """OpenCV's bundled frontal-face Haar cascade; orders of magnitude cheaper than MTCNN."""
+    # Some OpenCV builds (e.g. 5.x headless) do not include the Haar cascade classifier
+    if not hasattr(cv2, "CascadeClassifier") or not hasattr(cv2, "data"):
+        raise RuntimeError(f"The coarse pass needs cv2.CascadeClassifier, which OpenCV {cv2.__version__} "
+                           "does not provide; install an OpenCV build with the objdetect Haar cascades "
+                           "or disable two_pass")
+    cascade_path = cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
+    cascade = cv2.CascadeClassifier(cascade_path)
+    if cascade.empty():
+        raise RuntimeError(f"Could not load Haar cascade from {cascade_path}")
+    return cascade
+
+
+def build_face_timeline(video: cv2.VideoCapture, fps: float, total_frames: int,
+                        coarse_fps: float, short_edge: int = 360,
+                        min_face_size: int = 20,
+                        detector: Optional[cv2.CascadeClassifier] = None) -> List[Tuple[int, int]]:
+    """
+    Sample the video at `coarse_fps` by seeking and count faces with a cheap detector.
+
+    Returns a face-density timeline of (frame_index, face_count), with 0-based
+    frame indices. Frames between samples are never decoded.
+    """
+    detector = detector or load_cheap_detector()
+    step = max(1, int(round(fps / coarse_fps)))
+    timeline = []
+    # Work buffers reused for every sample
+    frame = small = gray = None
+
+    for frame_index in range(0, total_frames, step):
+        video.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+        ret, frame = video.read(frame)
+        if not ret:
+            break
+
+        height, width = frame.shape[:2]
+        scale = min(1.0, short_edge / min(height, width))
+        if scale < 1.0:
+            small = cv2.resize(frame, (int(width * scale), int(height * scale)), dst=small,
+                               interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small if scale < 1.0 else frame, cv2.COLOR_BGR2GRAY, dst=gray)
+        min_size = max(12, int(min_face_size * scale))
+        faces = detector.detectMultiScale(gray, scaleFactor=1.2, minNeighbors=3,
+                                          minSize=(min_size, min_size))
+        timeline.append((frame_index, len(faces)))
+
+    return timeline
+
+
+def timeline_to_windows(timeline: List[Tuple[int, int]], pad_frames: int,
+                        total_frames: int) -> List[Tuple[int, int]]:
+    """
+    Turn a face-density timeline into merged [start, end) frame windows around
+    every sample that contained a face.
+    """
+    if not timeline:
+        return []
+    indices = np.array([frame_index for frame_index, _ in timeline])
+    counts = np.array([count for _, count in timeline])
+    hits = indices[counts > 0]
+    if hits.size == 0:
+        return []
+
+    starts = np.clip(hits - pad_frames, 0, total_frames)
+    ends = np.clip(hits + pad_frames + 1, 0, total_frames)
+
+    windows = []
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        if windows and start <= windows[-1][1]:
+            windows[-1] = (windows[-1][0], max(windows[-1][1], end))
+        else:
+            windows.append((start, end))
+    return windows
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import csv
+import json
+import argparse
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+import face_recognition
+from tqdm import tqdm
+
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.webp'}
+CACHE_MANIFEST = ".gallery_cache.json"
+CACHE_EMBEDDINGS = ".gallery_cache.npy"
+
+
+class Gallery:
+    """Reference embeddings for a set of players, one row per reference image."""
+
+    def __init__(self, players: List[str], labels: np.ndarray, embeddings: np.ndarray):
+        self.players = players
+        self.labels = labels
+        self.embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        self._squared_norms = np.einsum('ij,ij->i', self.embeddings, self.embeddings)
+
+    def identify(self, embeddings: np.ndarray, threshold: float = 0.6) -> Tuple[List[str], np.ndarray]:
+        """
+        Label a batch of face embeddings by nearest reference image.
+
+        Distances are Euclidean, as used by face_recognition (0.6 is its usual
+        tolerance). Faces further than `threshold` from every reference are
+        labelled "unknown".
+        """
+        if len(embeddings) == 0 or len(self.embeddings) == 0:
+            return ["unknown"] * len(embeddings), np.full(len(embeddings), np.inf, dtype=np.float32)
+
+        queries = np.asarray(embeddings, dtype=np.float32)
+        squared = (np.einsum('ij,ij->i', queries, queries)[:, None]
+                   + self._squared_norms[None, :]
+                   - 2.0 * queries @ self.embeddings.T)
+        nearest = np.argmin(squared, axis=1)
+        distances = np.sqrt(np.maximum(squared[np.arange(len(queries)), nearest], 0.0))
+        names = [self.players[self.labels[row]] if distance <= threshold else "unknown"
+                 for row, distance in zip(nearest, distances)]
+        return names, distances
+
+
+def embed_reference_image(image_path: str) -> Optional[np.ndarray]:
+    """Embed the largest face in a reference image, or None if no face is found."""
+    image = face_recognition.load_image_file(image_path)
+    locations = face_recognition.face_locations(image)
+    if not locations:
+        return None
+    largest = max(locations, key=lambda box: (box[2] - box[0]) * (box[1] - box[3]))
+    return face_recognition.face_encodings(image, known_face_locations=[largest])[0]
+
+
+def build_gallery(gallery_dir: str) -> Gallery:
+    """
+    Build (or incrementally update) the gallery for a folder-per-player layout.
+
+    Embeddings are cached next to the gallery. Only reference images that are
+    new or whose size/mtime changed are re-embedded; removed images are dropped.
+    """
+    gallery_path = Path(gallery_dir)
+    manifest_path = gallery_path / CACHE_MANIFEST
+    embeddings_path = gallery_path / CACHE_EMBEDDINGS
+
+    cached_entries: Dict[str, dict] = {}
+    cached_embeddings = np.empty((0, 128), dtype=np.float32)
+    if manifest_path.exists() and embeddings_path.exists():
+        with open(manifest_path, 'r') as f:
+            cached_entries = {entry['path']: entry for entry in json.load(f)}
+        cached_embeddings = np.load(embeddings_path)
+
+    players = sorted(d.name for d in gallery_path.iterdir()
+                     if d.is_dir() and not d.name.startswith('.'))
+
+    entries = []
+    rows = []
+    to_embed = []
+    for player in players:
+        for image_file in sorted((gallery_path / player).iterdir()):
+            if image_file.name.startswith('.') or image_file.suffix.lower() not in IMAGE_EXTENSIONS:
+                continue
+            stat = image_file.stat()
+            rel_path = str(image_file.relative_to(gallery_path))
+            entry = {'path': rel_path, 'player': player, 'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+            cached = cached_entries.get(rel_path)
+            if cached and cached['size'] == entry['size'] and cached['mtime'] == entry['mtime'] \
+                    and cached['player'] == player:
+                entry['has_face'] = cached['has_face']
+                rows.append(cached_embeddings[cached['row']] if cached['has_face'] else None)
+            else:
+                to_embed.append(len(entries))
+                rows.append(None)
+            entries.append(entry)
+
+    print(f"Gallery: {len(players)} players, {len(entries)} reference images, "
+          f"{len(to_embed)} new or changed")
+    for i in tqdm(to_embed, desc="Embedding reference images", disable=not to_embed):
+        embedding = embed_reference_image(str(gallery_path / entries[i]['path']))
+        entries[i]['has_face'] = embedding is not None
+        rows[i] = embedding
+        if embedding is None:
+            print(f"Warning: no face found in {entries[i]['path']}")
+
+    # Rewrite the cache with only the images that are still present
+    embeddings = []
+    labels = []
+    for entry, row in zip(entries, rows):
+        if entry['has_face']:
+            entry['row'] = len(embeddings)
+            embeddings.append(row)
+            labels.append(players.index(entry['player']))
+    embeddings = np.array(embeddings, dtype=np.float32).reshape(-1, 128)
+
+    np.save(embeddings_path, embeddings)
+    with open(manifest_path, 'w') as f:
+        json.dump(entries, f, indent=2)
+
+    return Gallery(players, np.array(labels, dtype=np.intp), embeddings)
+
+
+def iter_video_frames(video_path: str, sample_fps: float) -> Iterator[Tuple[int, float, np.ndarray]]:
+    """Yield (frame_index, seconds, rgb_frame) at `sample_fps`, skipping other frames with grab()."""
+    video = cv2.VideoCapture(video_path)
+    if not video.isOpened():
+        raise ValueError(f"Could not open video file {video_path}")
+    fps = video.get(cv2.CAP_PROP_FPS) or 25.0
+    interval = max(1, int(round(fps / sample_fps)))
+    frame_index = 0
+    while video.grab():
+        if frame_index % interval == 0:
+            ret, frame = video.retrieve()
+            if not ret:
+                break
+            yield frame_index, frame_index / fps, cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        frame_index += 1
+    video.release()
+
+
+def iter_image_folder(folder: str) -> Iterator[Tuple[int, float, np.ndarray]]:
+    """Yield (index, 0.0, rgb_image) for every image in a folder, in name order."""
+    image_files = sorted(f for f in Path(folder).iterdir()
+                         if not f.name.startswith('.') and f.suffix.lower() in IMAGE_EXTENSIONS)
+    for index, image_file in enumerate(image_files):
+        yield index, 0.0, face_recognition.load_image_file(str(image_file))
+
+
+def detect_and_encode(frame: np.ndarray, detect_width: int) -> Tuple[List[Tuple[int, int, int, int]], np.ndarray]:
+    """Find faces on a downscaled copy, then encode them all on the full frame in one call."""
+    scale = min(1.0, detect_width / frame.shape[1])
+    small = frame if scale >= 1.0 else cv2.resize(frame, None, fx=scale, fy=scale,
+                                                   interpolation=cv2.INTER_AREA)
+    locations = [tuple(int(round(v / scale)) for v in box) for box in face_recognition.face_locations(small)]
+    if not locations:
+        return [], np.empty((0, 128), dtype=np.float32)
+    encodings = face_recognition.face_encodings(frame, known_face_locations=locations)
+    return locations, np.asarray(encodings, dtype=np.float32)
+
+
+def build_timelines(detections: List[dict], max_gap: float) -> Dict[str, List[dict]]:
+    """Merge per-frame detections of each player into time segments."""
+    timelines: Dict[str, List[dict]] = {}
+    for detection in sorted(detections, key=lambda d: d['frame']):
+        player = detection['player']
+        if player == "unknown":
+            continue
+        segments = timelines.setdefault(player, [])
+        if segments and detection['time'] - segments[-1]['end'] <= max_gap:
+            segments[-1]['end'] = detection['time']
+            segments[-1]['end_frame'] = detection['frame']
+            segments[-1]['detections'] += 1
+        else:
+            segments.append({'start': detection['time'], 'end': detection['time'],
+                             'start_frame': detection['frame'], 'end_frame': detection['frame'],
+                             'detections': 1})
+    return timelines
+
+
+def find_players(source: str, gallery: Gallery, output_dir: str, sample_fps: float = 1.0,
+                 threshold: float = 0.6, batch_size: int = 16, detect_width: int = 960,
+                 max_gap: float = 2.0) -> None:
+    """Label every face in a video or image folder and write per-frame and per-player results."""
+    if os.path.isdir(source):
+        frames = iter_image_folder(source)
+    else:
+        frames = iter_video_frames(source, sample_fps)
+
+    detections = []
+    pending = []
+
+    def flush():
+        if not pending:
+            return
+        embeddings = np.concatenate([enc for _, _, _, enc in pending])
+        names, distances = gallery.identify(embeddings, threshold)
+        row = 0
+        for frame_index, seconds, locations, _ in pending:
+            for top, right, bottom, left in locations:
+                detections.append({
+                    'frame': frame_index, 'time': round(seconds, 3),
+                    'player': names[row], 'distance': round(float(distances[row]), 4),
+                    'top': top, 'right': right, 'bottom': bottom, 'left': left
+                })
+                row += 1
+        pending.clear()
+
+    for frame_index, seconds, frame in tqdm(frames, desc="Labelling faces"):
+        locations, encodings = detect_and_encode(frame, detect_width)
+        if locations:
+            pending.append((frame_index, seconds, locations, encodings))
+        if len(pending) >= batch_size:
+            flush()
+    flush()
+
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+    with open(output_path / "frames.csv", 'w', newline='') as csvfile:
+        fieldnames = ['frame', 'time', 'player', 'distance', 'top', 'right', 'bottom', 'left']
+        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(detections)
+
+    timelines = build_timelines(detections, max_gap)
+    with open(output_path / "timelines.json", 'w') as f:
+        json.dump(timelines, f, indent=2)
+
+    known = sum(1 for d in detections if d['player'] != "unknown")
+    print(f"\nLabelled {known} of {len(detections)} faces; {len(timelines)} players seen")
+    for player, segments in sorted(timelines.items()):
+        print(f"  {player}: {len(segments)} segment(s), "
+              f"{sum(s['detections'] for s in segments)} detection(s)")
+    print(f"Results saved to: {output_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Recognise known players in a video or image folder.')
+    parser.add_argument('source', help='Video file or folder of images to label')
+    parser.add_argument('gallery', help='Folder with one sub-folder of reference images per player')
+    parser.add_argument('--output', default='playerFaces', help='Output folder for frames.csv and timelines.json')
+    parser.add_argument('--fps', type=float, default=1.0, help='Frames per second to sample from videos')
+    parser.add_argument('--threshold', type=float, default=0.6,
+                        help='Maximum embedding distance for a match; further faces are "unknown"')
+    parser.add_argument('--batch-size', type=int, default=16, help='Frames per nearest-neighbour batch')
+    parser.add_argument('--detect-width', type=int, default=960, help='Frame width used for face detection')
+    parser.add_argument('--max-gap', type=float, default=2.0,
+                        help='Seconds between detections that still belong to one timeline segment')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.source):
+        print(f"Error: {args.source} does not exist!")
+        sys.exit(1)
+
+    gallery = build_gallery(args.gallery)
+    if len(gallery.embeddings) == 0:
+        print("Error: no reference faces found in the gallery!")
+        sys.exit(1)
+
+    find_players(args.source, gallery, args.output, args.fps, args.threshold,
+                 args.batch_size, args.detect_width, args.max_gap)
+
+
+if __name__ == "__main__":
+    main()
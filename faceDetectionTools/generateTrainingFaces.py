@@ -3,21 +3,28 @@ import numpy as np
 from pathlib import Path
 import argparse
 import time
+import itertools
 from collections import defaultdict
 import tensorflow as tf
 from mtcnn import MTCNN
-from typing import NamedTuple, List, Dict, Tuple, Optional
+from typing import NamedTuple, List, Dict, Tuple, Optional, Any, Iterator
 import subprocess
 import os
 import face_recognition
-from scipy.spatial.distance import cosine
 import multiprocessing
 from tqdm import tqdm
 import json
 from dataclasses import dataclass, asdict
 import logging
+from framePool import FramePool
 
 from .face_quality import FaceQualityAnalyzer
+from .scene_sampler import SceneChangeSampler
+from .batch_sizer import AdaptiveBatchSizer
+from .shard_writer import TarShardWriter, json_default
+from .coarse_pass import build_face_timeline, timeline_to_windows
+from .sample_selection import select_diverse_samples
+from .identity_registry import IdentityRegistry
 
 @dataclass
 class FaceDetectionConfig:
@@ -36,6 +43,33 @@ class FaceDetectionConfig:
     save_metadata: bool
     quality_metrics: Dict[str, Any]
     logging: Dict[str, Any]
+    # "fixed" samples every 1/frames_per_second, "scene" detects after shot changes
+    sampling_mode: str = "fixed"
+    scene_change_threshold: float = 0.3
+    scene_max_gap_seconds: float = 2.0
+    scene_min_gap_frames: int = 2
+    # Resize frames to this short edge for MTCNN only (0 = detect at full resolution)
+    detection_short_edge: int = 0
+    # CPU-only runs measure throughput to pick the batch size instead of using 1
+    adaptive_batch_size: bool = True
+    max_batch_size: int = 32
+    adaptive_probe_batches: int = 6
+    max_memory_percent: float = 85.0
+    # "folders" writes one folder per identity, "shards" writes tar shards under output_dir/shards
+    export_format: str = "folders"
+    shard_max_mb: int = 1024
+    # Cheap low-rate pass that limits the detection pass to windows containing faces
+    two_pass: bool = False
+    coarse_fps: float = 0.2
+    coarse_short_edge: int = 360
+    coarse_padding_seconds: float = 1.0
+    # Diversity-aware sample selection: weight of time vs. appearance, and of quality
+    selection_time_weight: float = 0.5
+    selection_quality_power: float = 1.0
+    # Directory of a persistent identity registry shared across runs ("" = per-run identities)
+    identity_registry: str = ""
+    # "opencv" (cv2.VideoCapture) or "ffmpeg" (zero-copy rawvideo pipe, decodes straight to RGB)
+    frame_reader: str = "opencv"
 
     @classmethod
     def from_file(cls, config_path: str) -> 'FaceDetectionConfig':
@@ -91,9 +125,12 @@ def configure_gpu(memory_fraction: float = 1.0) -> bool:
         return False
 
 def get_optimal_batch_size(config: FaceDetectionConfig, has_gpu: bool) -> int:
-    """Determine optimal batch size based on available GPU memory."""
+    """
+    Determine optimal batch size based on available GPU memory.
+    On CPU this is only the starting size; AdaptiveBatchSizer tunes it during the run.
+    """
     if not has_gpu:
-        return 1
+        return config.batch_size if config.adaptive_batch_size else 1
 
     try:
         gpu = tf.config.experimental.get_visible_devices('GPU')[0]
@@ -102,42 +139,194 @@ def get_optimal_batch_size(config: FaceDetectionConfig, has_gpu: bool) -> int:
     except:
         return config.batch_size
 
-def process_video_info(video_path: str) -> Tuple[cv2.VideoCapture, int, int, float]:
+def process_video_info(video_path: str) -> Tuple[cv2.VideoCapture, int, float, float]:
     """Get video information and validate the video file."""
     video = cv2.VideoCapture(video_path)
     if not video.isOpened():
         raise ValueError(f"Could not open video file {video_path}")
 
     total_frames = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
-    fps = int(video.get(cv2.CAP_PROP_FPS))
+    # Keep the exact rate (29.97, not 29): frame numbers are turned into seek times with it
+    fps = video.get(cv2.CAP_PROP_FPS)
     duration = total_frames / fps
 
     print(f"\nVideo Information:")
     print(f"Path: {video_path}")
     print(f"Total frames: {total_frames}")
-    print(f"FPS: {fps}")
+    print(f"FPS: {fps:.3f}")
     print(f"Duration: {duration:.2f} seconds")
 
     return video, total_frames, fps, duration
 
+def iter_sampled_frames(video: cv2.VideoCapture, fps: float, config: FaceDetectionConfig,
+                        pool: FramePool,
+                        pbar: Optional[tqdm] = None,
+                        sampler: Optional[SceneChangeSampler] = None,
+                        windows: Optional[List[Tuple[int, int]]] = None,
+                        video_path: Optional[str] = None) -> Iterator[Tuple[int, np.ndarray]]:
+    """
+    Yield (frame_number, rgb_frame) for the frames that should go through detection.
+
+    With a scene sampler every frame is decoded and scored, and only frames just
+    after a shot change or after the maximum gap are yielded. Otherwise every
+    `fps / frames_per_second`-th frame is yielded. If `windows` ([start, end)
+    frame ranges) are given, the video is seeked to each window and frames
+    outside them are never decoded; frame numbers stay global.
+
+    Yielded frames are RGB buffers taken from `pool`, filled by
+    colour-converting OpenCV's reused BGR buffer, or straight from an ffmpeg
+    pipe already in RGB with `frame_reader == "ffmpeg"`. The caller releases
+    every yielded frame to the pool once it is done with it; decoding waits
+    while all of the pool's buffers are held.
+    """
+    frame_interval = max(1, int(fps / config.frames_per_second))
+    bgr: Optional[np.ndarray] = None
+
+    for start, end in windows if windows is not None else [(0, None)]:
+        if sampler is not None:
+            sampler.reset()
+        processed_frames = start
+
+        if config.frame_reader == "ffmpeg":
+            from ffmpegReader import FFmpegFrameReader
+
+            # Without a scene sampler only the sampled frames need converting
+            filters = None if sampler is not None else \
+                [f"select=not(mod(n+{start + 1}\\,{frame_interval}))"]
+            reader = FFmpegFrameReader(
+                video_path, pix_fmt="rgb24", pool=pool, filters=filters,
+                # Half a frame early, so rounding cannot drop frame `start` or keep `start - 1`;
+                # one frame of slack at the end, the window end is enforced on frame numbers below
+                start=(start - 0.5) / fps if start else None,
+                duration=(end - start + 1) / fps if end is not None else None
+            )
+            with reader:
+                for frame in reader:
+                    if sampler is None:
+                        # Only every frame_interval-th frame comes out of the select filter
+                        step = frame_interval - (processed_frames % frame_interval)
+                        if end is not None and processed_frames + step > end:
+                            pool.release(frame)
+                            break
+                        processed_frames += step
+                        if pbar is not None:
+                            pbar.update(step)
+                        yield processed_frames, frame
+                        continue
+                    if end is not None and processed_frames >= end:
+                        pool.release(frame)
+                        break
+                    processed_frames += 1
+                    if pbar is not None:
+                        pbar.update(1)
+                    if sampler.should_detect(frame, processed_frames):
+                        yield processed_frames, frame
+                    else:
+                        pool.release(frame)
+            continue
+
+        if start > 0:
+            video.set(cv2.CAP_PROP_POS_FRAMES, start)
+
+        while end is None or processed_frames < end:
+            # grab() only decodes; frames are converted to BGR (retrieve) and then
+            # to RGB only when they are actually used, into reused buffers
+            if not video.grab():
+                break
+            processed_frames += 1
+            if pbar is not None:
+                pbar.update(1)
+
+            if sampler is None and processed_frames % frame_interval != 0:
+                continue
+            ret, bgr = video.retrieve(bgr)
+            if not ret:
+                break
+            if sampler is not None and not sampler.should_detect(bgr, processed_frames):
+                continue
+
+            rgb = cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB, dst=pool.acquire())
+            yield processed_frames, pool.issue(rgb)
+
+def get_detection_scale(frame_shape: Tuple[int, ...], detection_short_edge: int) -> float:
+    """Return the factor frames are resized by before detection (never upscales)."""
+    short_edge = min(frame_shape[:2])
+    if detection_short_edge <= 0 or short_edge <= detection_short_edge:
+        return 1.0
+    return detection_short_edge / short_edge
+
+def resize_for_detection(frame: np.ndarray, scale: float) -> np.ndarray:
+    """Downscale a frame for detection only; crops are still taken from the original."""
+    if scale >= 1.0:
+        return frame
+    height, width = frame.shape[:2]
+    size = (max(1, int(round(width * scale))), max(1, int(round(height * scale))))
+    return cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+
+def map_detection_to_source(face: Dict[str, Any], scale: float,
+                            frame_shape: Tuple[int, ...]) -> Dict[str, Any]:
+    """Map an MTCNN result from detection coordinates back to source frame coordinates."""
+    height, width = frame_shape[:2]
+    x, y, w, h = face['box']
+    if scale < 1.0:
+        x, y, w, h = (int(round(v / scale)) for v in (x, y, w, h))
+
+    # MTCNN can return boxes that start outside the frame
+    x0, y0 = max(0, x), max(0, y)
+    x1, y1 = min(width, x + w), min(height, y + h)
+
+    mapped = dict(face)
+    mapped['box'] = (x0, y0, max(0, x1 - x0), max(0, y1 - y0))
+    if scale < 1.0 and 'keypoints' in face:
+        mapped['keypoints'] = {
+            name: (int(round(px / scale)), int(round(py / scale)))
+            for name, (px, py) in face['keypoints'].items()
+        }
+    return mapped
+
+def encode_faces(frame: np.ndarray, boxes: List[Tuple[int, int, int, int]]) -> np.ndarray:
+    """
+    Encode all faces of one RGB frame in a single face_recognition call.
+
+    The detector boxes are passed as known locations, so face_recognition does
+    not re-run its own HOG detection (which misses many faces in tight crops).
+    Returns a (len(boxes), 128) float32 array.
+    """
+    if not boxes:
+        return np.empty((0, 128), dtype=np.float32)
+    # face_recognition expects (top, right, bottom, left)
+    locations = [(y, x + w, y + h, x) for x, y, w, h in boxes]
+    encodings = face_recognition.face_encodings(frame, known_face_locations=locations)
+    return np.asarray(encodings, dtype=np.float32).reshape(len(boxes), -1)
+
 def detect_faces_batch(detector: MTCNN, frames: List[np.ndarray], 
                       frame_numbers: List[int], config: FaceDetectionConfig,
-                      quality_analyzer: FaceQualityAnalyzer) -> List[FaceOccurrence]:
-    """Detect and analyze faces in a batch of frames."""
-    face_occurrences = []
+                      quality_analyzer: FaceQualityAnalyzer) -> Tuple[List[FaceOccurrence], np.ndarray]:
+    """
+    Detect and analyze faces in a batch of frames.
+
+    Returns the face occurrences and a contiguous (N, 128) embedding array for
+    the batch; each occurrence's embedding is a row of that array.
+    """
+    scales = [get_detection_scale(frame.shape, config.detection_short_edge) for frame in frames]
+    detection_frames = [resize_for_detection(frame, scale) for frame, scale in zip(frames, scales)]
     
     # Process frames in parallel using multiprocessing
     with multiprocessing.Pool() as pool:
-        batch_faces = pool.map(detector.detect_faces, frames)
+        batch_faces = pool.map(detector.detect_faces, detection_frames)
 
+    candidates = []
+    frame_encodings = []
     for i, faces in enumerate(batch_faces):
         frame = frames[i]
         frame_num = frame_numbers[i]
+        boxes = []
         
         for face in faces:
             if face['confidence'] < config.min_confidence:
                 continue
 
+            face = map_detection_to_source(face, scales[i], frame.shape)
             x, y, w, h = face['box']
             face_img = frame[y:y+h, x:x+w]
             
@@ -150,29 +339,48 @@ def detect_faces_batch(detector: MTCNN, frames: List[np.ndarray],
             if quality_score < config.min_quality_score:
                 continue
 
-            try:
-                face_encoding = face_recognition.face_encodings(face_img)[0]
-            except IndexError:
-                continue
+            # Copy the crop: frames may be reused buffers and a view would keep the whole frame alive
+            boxes.append(face['box'])
+            candidates.append((frame_num, face_img.copy(), quality_score, quality_metrics, face['box']))
 
-            face_occurrences.append(
-                FaceOccurrence(
-                    frame_num=frame_num,
-                    image=face_img,
-                    quality_score=quality_score,
-                    quality_metrics=quality_metrics,
-                    embedding=face_encoding,
-                    bbox=face['box']
-                )
-            )
+        if boxes:
+            frame_encodings.append(encode_faces(frame, boxes))
+
+    if not candidates:
+        return [], np.empty((0, 128), dtype=np.float32)
 
-    return face_occurrences
+    embeddings = np.ascontiguousarray(np.concatenate(frame_encodings))
+    face_occurrences = [
+        FaceOccurrence(
+            frame_num=frame_num,
+            image=face_img,
+            quality_score=quality_score,
+            quality_metrics=quality_metrics,
+            embedding=embeddings[j],
+            bbox=bbox
+        )
+        for j, (frame_num, face_img, quality_score, quality_metrics, bbox) in enumerate(candidates)
+    ]
+
+    return face_occurrences, embeddings
 
 def save_face_data(face_id: int, occurrences: List[FaceOccurrence], 
-                  output_path: Path, images_per_face: int) -> None:
-    """Save face images and metadata."""
-    face_folder = output_path / f"face{face_id:02d}"
-    face_folder.mkdir(exist_ok=True)
+                  output_path: Path, images_per_face: int,
+                  shard_writer: Optional[TarShardWriter] = None,
+                  time_weight: float = 0.5, quality_power: float = 1.0) -> Dict[str, Any]:
+    """
+    Save face images and metadata.
+
+    The `images_per_face` samples are chosen by quality-weighted k-center
+    selection over the embeddings and frame numbers, so near-identical frames
+    are not saved twice.
+
+    By default each identity gets its own folder of JPEGs plus metadata.json.
+    With a shard writer the selected samples are appended to tar shards instead,
+    each with a JSON record of its frame number, bbox, quality and identity.
+    Returns the identity metadata.
+    """
+    identity = f"face{face_id:02d}"
 
     # Sort occurrences by quality score
     occurrences.sort(key=lambda x: x.quality_score, reverse=True)
@@ -190,26 +398,49 @@ def save_face_data(face_id: int, occurrences: List[FaceOccurrence],
             "max_size": max([o.bbox[2] * o.bbox[3] for o in occurrences])
         }
     }
-    
-    with open(face_folder / "metadata.json", "w") as f:
-        json.dump(metadata, f, indent=2)
 
-    # Select best quality samples with temporal distribution
-    if len(occurrences) <= images_per_face:
-        samples = occurrences
-    else:
-        # Divide occurrences into segments for temporal distribution
-        segment_size = len(occurrences) // images_per_face
-        samples = []
-        for i in range(0, len(occurrences), segment_size):
-            segment = occurrences[i:i + segment_size]
-            samples.append(max(segment, key=lambda x: x.quality_score))
-        samples = samples[:images_per_face]
+    if shard_writer is None:
+        face_folder = output_path / identity
+        face_folder.mkdir(exist_ok=True)
+        with open(face_folder / "metadata.json", "w") as f:
+            json.dump(metadata, f, indent=2, default=json_default)
+
+    # Select diverse, high quality samples
+    selected = select_diverse_samples(
+        np.stack([o.embedding for o in occurrences]),
+        np.array([o.frame_num for o in occurrences]),
+        np.array([o.quality_score for o in occurrences]),
+        images_per_face,
+        time_weight=time_weight,
+        quality_power=quality_power
+    )
+    samples = [occurrences[i] for i in selected]
 
     # Save selected samples with quality information
     for i, sample in enumerate(samples):
-        output_file = face_folder / f"frame_{sample.frame_num:04d}_quality_{sample.quality_score:.2f}.jpg"
-        cv2.imwrite(str(output_file), cv2.cvtColor(sample.image, cv2.COLOR_RGB2BGR))
+        image_bgr = cv2.cvtColor(sample.image, cv2.COLOR_RGB2BGR)
+        if shard_writer is None:
+            output_file = face_folder / f"frame_{sample.frame_num:04d}_quality_{sample.quality_score:.2f}.jpg"
+            cv2.imwrite(str(output_file), image_bgr)
+            continue
+
+        ok, encoded = cv2.imencode(".jpg", image_bgr)
+        if not ok:
+            continue
+        shard_writer.write_sample(
+            f"{identity}_{sample.frame_num:06d}_{i:02d}",
+            encoded.tobytes(),
+            {
+                "identity": identity,
+                "face_id": face_id,
+                "frame_num": sample.frame_num,
+                "bbox": list(sample.bbox),
+                "quality_score": sample.quality_score,
+                "quality_metrics": sample.quality_metrics
+            }
+        )
+
+    return metadata
 
 def extract_faces(video_path: str, config: FaceDetectionConfig) -> None:
     """
@@ -225,74 +456,185 @@ def extract_faces(video_path: str, config: FaceDetectionConfig) -> None:
     
     has_gpu = configure_gpu(config.gpu_memory_fraction)
     config.batch_size = get_optimal_batch_size(config, has_gpu)
-    
-    # Initialize components
-    quality_analyzer = FaceQualityAnalyzer()
-    detector = MTCNN(min_face_size=config.min_face_size)
+    batch_sizer = None
+    if not has_gpu and config.adaptive_batch_size:
+        batch_sizer = AdaptiveBatchSizer(
+            initial_batch_size=config.batch_size,
+            max_batch_size=config.max_batch_size,
+            probe_batches=config.adaptive_probe_batches,
+            max_memory_percent=config.max_memory_percent
+        )
     
     # Process video
     video, total_frames, fps, duration = process_video_info(video_path)
-    frame_interval = max(1, int(fps / config.frames_per_second))
-    
+
+    # Initialize components. The detector sees downscaled frames, so its minimum
+    # face size is scaled too; min_face_size is still enforced on source boxes.
+    frame_shape = (int(video.get(cv2.CAP_PROP_FRAME_HEIGHT)), int(video.get(cv2.CAP_PROP_FRAME_WIDTH)))
+    detection_scale = get_detection_scale(frame_shape, config.detection_short_edge)
+    if detection_scale < 1.0:
+        print(f"Detecting at {detection_scale:.2f}x of source resolution")
+    quality_analyzer = FaceQualityAnalyzer()
+    detector = MTCNN(min_face_size=max(12, int(config.min_face_size * detection_scale)))
+
+    sampler = None
+    if config.sampling_mode == "scene":
+        sampler = SceneChangeSampler(
+            threshold=config.scene_change_threshold,
+            max_gap=max(1, int(fps * config.scene_max_gap_seconds)),
+            min_gap=config.scene_min_gap_frames,
+            channel_order="rgb" if config.frame_reader == "ffmpeg" else "bgr"
+        )
+    elif config.sampling_mode != "fixed":
+        raise ValueError(f"Unknown sampling_mode: {config.sampling_mode}")
+
+    windows = None
+    coarse_report = None
+    frames_to_scan = total_frames
+    if config.two_pass:
+        print("\nCoarse pass: Building face timeline...")
+        coarse_start = time.time()
+        timeline = build_face_timeline(video, fps, total_frames, config.coarse_fps,
+                                       short_edge=config.coarse_short_edge,
+                                       min_face_size=config.min_face_size)
+        # Pad by one coarse step so faces between two samples are still covered
+        coarse_step = max(1, int(round(fps / config.coarse_fps)))
+        pad_frames = coarse_step + int(fps * config.coarse_padding_seconds)
+        windows = timeline_to_windows(timeline, pad_frames, total_frames)
+        frames_to_scan = sum(end - start for start, end in windows)
+        video.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        coarse_report = {
+            "samples": len(timeline),
+            "samples_with_faces": sum(1 for _, count in timeline if count),
+            "windows": windows,
+            "frames_in_windows": frames_to_scan,
+            "seconds": time.time() - coarse_start
+        }
+        print(f"Found faces in {len(windows)} window(s) covering "
+              f"{frames_to_scan} of {total_frames} frames")
+
     # Initialize tracking variables
     face_occurrences: Dict[int, List[FaceOccurrence]] = defaultdict(list)
-    known_face_encodings: List[np.ndarray] = []
-    known_face_ids: List[int] = []
-    face_count = 0
-    processed_frames = 0
+    registry = IdentityRegistry(config.identity_registry or None)
+    known_identities_at_start = registry.size
+    new_identities = 0
+    detector_calls = 0
     
     print("\nFirst pass: Identifying unique faces...")
     start_time = time.time()
     
-    with tqdm(total=total_frames, desc="Processing frames") as pbar:
-        while True:
-            frames = []
-            frame_numbers = []
+    try:
+        with tqdm(total=frames_to_scan, desc="Processing frames") as pbar:
+            # Frames are released after their batch is detected, so the pool holds one
+            # batch of buffers and follows the batch size as AdaptiveBatchSizer changes it
+            frame_pool = FramePool(config.batch_size)
+            sampled_frames = iter_sampled_frames(video, fps, config, frame_pool, pbar, sampler, windows,
+                                                 video_path)
+            while True:
+                frames = []
+                frame_numbers = []
             
-            # Read batch of frames
-            for _ in range(config.batch_size):
-                for _ in range(frame_interval):
-                    ret, frame = video.read()
-                    if not ret:
-                        break
-                    processed_frames += 1
-                    pbar.update(1)
-                
-                if not ret:
-                    break
-                    
-                frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
-                frame_numbers.append(processed_frames)
+                # Read batch of frames
+                for frame_num, frame in itertools.islice(sampled_frames, config.batch_size):
+                    frames.append(frame)
+                    frame_numbers.append(frame_num)
 
-            if not frames:
-                break
+                if not frames:
+                    break
 
-            # Process batch
-            new_occurrences = detect_faces_batch(detector, frames, frame_numbers, config, quality_analyzer)
-
-            # Group faces by identity
-            for occurrence in new_occurrences:
-                new_face = True
-                if known_face_encodings:
-                    face_distances = [cosine(occurrence.embedding, enc) for enc in known_face_encodings]
-                    min_distance = min(face_distances)
-                    if min_distance < config.face_similarity_threshold:
-                        face_id = known_face_ids[face_distances.index(min_distance)]
-                        new_face = False
+                # Process batch
+                detector_calls += len(frames)
+                batch_start = time.time()
+                new_occurrences, embeddings = detect_faces_batch(detector, frames, frame_numbers, config,
+                                                                 quality_analyzer)
+                if batch_sizer is not None:
+                    config.batch_size = batch_sizer.record(len(frames), time.time() - batch_start, frames[0].nbytes)
+                for frame in frames:
+                    frame_pool.release(frame)
+                frame_pool.resize(config.batch_size)
+
+                if not new_occurrences:
+                    continue
+
+                # Group faces by identity: one matrix product matches the whole batch
+                face_ids, distances = registry.match(embeddings)
+                batch_first_row = registry.size
+                for occurrence, face_id, distance in zip(new_occurrences, face_ids, distances):
+                    if registry.size > batch_first_row:
+                        # Identities added earlier in this batch may be nearer than the registry match
+                        new_ids, new_distances = registry.match(occurrence.embedding, first_row=batch_first_row)
+                        if new_distances[0] < distance:
+                            face_id, distance = new_ids[0], new_distances[0]
+                    if distance < config.face_similarity_threshold:
+                        face_id = int(face_id)
+                        if face_id not in face_occurrences and len(face_occurrences) >= config.max_faces:
+                            continue
+                        registry.update(face_id, occurrence.embedding, source=video_path)
+                        face_occurrences[face_id].append(occurrence)
+                    elif len(face_occurrences) < config.max_faces:
+                        face_id = registry.add(occurrence.embedding, source=video_path)
+                        new_identities += 1
                         face_occurrences[face_id].append(occurrence)
 
-                if new_face and face_count < config.max_faces:
-                    face_count += 1
-                    known_face_encodings.append(occurrence.embedding)
-                    known_face_ids.append(face_count)
-                    face_occurrences[face_count].append(occurrence)
-
-    video.release()
+        registry_size = registry.size
+    finally:
+        video.release()
+        registry.close()
+    face_count = len(face_occurrences)
     print(f"\nFirst pass complete. Found {face_count} unique faces.")
+    if config.identity_registry:
+        print(f"Identity registry: {new_identities} new, {registry_size} total "
+              f"({known_identities_at_start} before this run)")
+    print(f"Ran face detection on {detector_calls} of {total_frames} frames")
+    if sampler is not None:
+        stats = sampler.stats()
+        print(f"Scene sampler: {stats['shot_changes']} shot changes, "
+              f"detection ratio {stats['detection_ratio']:.3f}")
 
     print("\nSecond pass: Saving face data...")
+    shard_writer = None
+    if config.export_format == "shards":
+        shard_writer = TarShardWriter(output_path / "shards",
+                                      max_shard_bytes=config.shard_max_mb * 1024 * 1024)
+    elif config.export_format != "folders":
+        raise ValueError(f"Unknown export_format: {config.export_format}")
+
+    identities = []
     for face_id, occurrences in tqdm(face_occurrences.items(), desc="Saving faces"):
-        save_face_data(face_id, occurrences, output_path, config.images_per_face)
+        identities.append(save_face_data(face_id, occurrences, output_path, config.images_per_face,
+                                         shard_writer, config.selection_time_weight,
+                                         config.selection_quality_power))
+
+    if shard_writer is not None:
+        shard_writer.close()
+        with open(output_path / "shards" / "identities.json", "w") as f:
+            json.dump(identities, f, indent=2, default=json_default)
+        print(f"Wrote {len(shard_writer.index)} samples to {len(shard_writer.shards)} shard(s)")
+
+    # Run report
+    if batch_sizer is not None:
+        batch_report = batch_sizer.report()
+        print(f"Adaptive batch size: {batch_report['chosen_batch_size']}")
+    else:
+        batch_report = {"mode": "gpu" if has_gpu else "fixed", "chosen_batch_size": config.batch_size}
+    run_report = {
+        "video_path": video_path,
+        "total_frames": total_frames,
+        "detector_calls": detector_calls,
+        "unique_faces": face_count,
+        "identity_registry": {
+            "path": config.identity_registry or None,
+            "identities_before": known_identities_at_start,
+            "new_identities": new_identities,
+            "identities_total": registry_size
+        },
+        "processing_time_seconds": time.time() - start_time,
+        "batch_sizing": batch_report,
+        "scene_sampler": sampler.stats() if sampler is not None else None,
+        "coarse_pass": coarse_report
+    }
+    with open(output_path / "extraction_stats.json", "w") as f:
+        json.dump(run_report, f, indent=2, default=json_default)
 
     print(f"\nProcessing complete!")
     print(f"Found {face_count} unique faces")
@@ -0,0 +1,161 @@
+import sqlite3
+import time
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+class IdentityRegistry:
+    """
+    Face identities that persist across extract_faces runs.
+
+    Metadata lives in an SQLite table and the identity centroids in a
+    memory-mapped float32 matrix (`embeddings.f32`), one row per identity.
+    Opening the registry only maps the file and normalises the used rows, so
+    it loads in milliseconds even with thousands of identities. Matching is a
+    single matrix-vector product against all centroids.
+
+    With `registry_dir=None` the registry lives in memory only, which gives a
+    single run the same matching behaviour without persisting anything.
+    """
+
+    INITIAL_CAPACITY = 1024
+
+    def __init__(self, registry_dir: Optional[str] = None, dim: int = 128):
+        self.registry_dir = Path(registry_dir) if registry_dir else None
+        if self.registry_dir is not None:
+            self.registry_dir.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(self.registry_dir / "identities.sqlite"))
+        else:
+            self._db = sqlite3.connect(":memory:")
+
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS identities (
+                id INTEGER PRIMARY KEY,
+                row INTEGER UNIQUE NOT NULL,
+                label TEXT,
+                sample_count INTEGER NOT NULL,
+                first_seen REAL NOT NULL,
+                last_seen REAL NOT NULL,
+                last_source TEXT
+            );
+        """)
+        stored_dim = self._get_meta("dim")
+        self.dim = int(stored_dim) if stored_dim else dim
+        if not stored_dim:
+            self._set_meta("dim", self.dim)
+
+        rows = self._db.execute("SELECT id, row, sample_count FROM identities ORDER BY row").fetchall()
+        self.size = len(rows)
+        self._ids = np.array([r[0] for r in rows], dtype=np.int64)
+        self._counts = np.array([r[2] for r in rows], dtype=np.int64)
+        capacity = max(self.INITIAL_CAPACITY, int(self._get_meta("capacity") or 0), self.size)
+        self._open_matrix(capacity)
+        self._normalized = self._normalize(self._matrix[:self.size])
+
+    # --- storage -----------------------------------------------------------
+
+    def _get_meta(self, key: str) -> Optional[str]:
+        row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value) -> None:
+        self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def _open_matrix(self, capacity: int) -> None:
+        self.capacity = capacity
+        if self.registry_dir is None:
+            old = getattr(self, "_matrix", None)
+            self._matrix = np.zeros((capacity, self.dim), dtype=np.float32)
+            if old is not None:
+                self._matrix[:len(old)] = old
+            return
+
+        path = self.registry_dir / "embeddings.f32"
+        nbytes = capacity * self.dim * 4
+        if not path.exists() or path.stat().st_size < nbytes:
+            with open(path, "ab") as f:
+                f.truncate(nbytes)
+        self._matrix = np.memmap(path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+        self._set_meta("capacity", capacity)
+
+    def _grow(self) -> None:
+        if isinstance(self._matrix, np.memmap):
+            self._matrix.flush()
+            del self._matrix
+        self._open_matrix(self.capacity * 2)
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    # --- queries -----------------------------------------------------------
+
+    def match(self, embeddings: np.ndarray, first_row: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the closest identity for each embedding.
+
+        Only identities from `first_row` on are compared (registry.size taken
+        earlier limits the search to identities added since). Returns
+        (ids, cosine_distances); ids are -1 and distances inf when there is
+        nothing to compare against.
+        """
+        queries = self._normalize(np.atleast_2d(embeddings))
+        if self.size <= first_row:
+            return (np.full(len(queries), -1, dtype=np.int64),
+                    np.full(len(queries), np.inf, dtype=np.float32))
+        similarity = queries @ self._normalized[first_row:].T
+        best = np.argmax(similarity, axis=1)
+        distances = 1.0 - similarity[np.arange(len(queries)), best]
+        return self._ids[first_row:][best], distances
+
+    def add(self, embedding: np.ndarray, label: Optional[str] = None,
+            source: Optional[str] = None) -> int:
+        """Register a new identity and return its id."""
+        if self.size == self.capacity:
+            self._grow()
+        row = self.size
+        self._matrix[row] = embedding
+        now = time.time()
+        cursor = self._db.execute(
+            "INSERT INTO identities (row, label, sample_count, first_seen, last_seen, last_source) "
+            "VALUES (?, ?, 1, ?, ?, ?)",
+            (row, label, now, now, source)
+        )
+        self.size += 1
+        self._ids = np.append(self._ids, cursor.lastrowid)
+        self._counts = np.append(self._counts, 1)
+        self._normalized = np.vstack([self._normalized, self._normalize(embedding[None])])
+        return int(cursor.lastrowid)
+
+    def update(self, identity_id: int, embedding: np.ndarray, source: Optional[str] = None) -> None:
+        """Fold a new sample into an identity's centroid (running mean)."""
+        row = int(np.flatnonzero(self._ids == identity_id)[0])
+        self._counts[row] += 1
+        centroid = self._matrix[row]
+        centroid += (np.asarray(embedding, dtype=np.float32) - centroid) / self._counts[row]
+        self._normalized[row] = self._normalize(centroid)
+        self._db.execute(
+            "UPDATE identities SET sample_count = ?, last_seen = ?, last_source = ? WHERE id = ?",
+            (int(self._counts[row]), time.time(), source, identity_id)
+        )
+
+    def label(self, identity_id: int) -> Optional[str]:
+        row = self._db.execute("SELECT label FROM identities WHERE id = ?", (identity_id,)).fetchone()
+        return row[0] if row else None
+
+    def close(self) -> None:
+        if isinstance(self._matrix, np.memmap):
+            self._matrix.flush()
+        self._db.commit()
+        self._db.close()
+
+    def __enter__(self) -> "IdentityRegistry":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,53 @@
+import numpy as np
+
+
+def select_diverse_samples(embeddings: np.ndarray, timestamps: np.ndarray,
+                           quality: np.ndarray, k: int, time_weight: float = 0.5,
+                           quality_power: float = 1.0) -> np.ndarray:
+    """
+    Pick `k` diverse, high-quality samples with quality-weighted k-center selection.
+
+    Samples are points in a feature space made of the L2-normalised embedding
+    plus the timestamp scaled to [0, time_weight]. Starting from the best
+    quality sample, each step adds the sample whose distance to the nearest
+    already-selected sample, multiplied by its quality weight, is largest.
+    Every step is one vectorised pass over all N samples, so the whole
+    selection is O(N*K).
+
+    Returns the indices of the selected samples in selection order.
+    """
+    n = len(embeddings)
+    quality = np.asarray(quality, dtype=np.float32)
+    if k <= 0 or n == 0:
+        return np.empty(0, dtype=np.intp)
+    k = min(k, n)
+    if k == n:
+        return np.argsort(-quality, kind="stable")
+
+    features = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(features, axis=1, keepdims=True)
+    features = features / np.maximum(norms, 1e-12)
+
+    timestamps = np.asarray(timestamps, dtype=np.float32)
+    span = float(timestamps.max() - timestamps.min())
+    scaled_time = (timestamps - timestamps.min()) / span * time_weight if span > 0 \
+        else np.zeros(n, dtype=np.float32)
+    features = np.hstack([features, scaled_time[:, None]])
+
+    # Quality weights in (0, 1] so a low-quality sample can still win if it is far away
+    weights = np.clip(quality / max(float(quality.max()), 1e-12), 1e-3, 1.0) ** quality_power
+
+    selected = np.empty(k, dtype=np.intp)
+    selected[0] = int(np.argmax(quality))
+    min_dist = np.full(n, np.inf, dtype=np.float32)
+    diff = np.empty_like(features)
+
+    for j in range(1, k):
+        np.subtract(features, features[selected[j - 1]], out=diff)
+        np.minimum(min_dist, np.sqrt(np.einsum("ij,ij->i", diff, diff)), out=min_dist)
+        score = min_dist * weights
+        # Exact duplicates have distance 0 too; never pick the same sample twice
+        score[selected[:j]] = -1.0
+        selected[j] = int(np.argmax(score))
+
+    return selected
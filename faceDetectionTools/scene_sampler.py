@@ -0,0 +1,118 @@
+import cv2
+import numpy as np
+from typing import Optional, Tuple
+
+
+class SceneChangeSampler:
+    """
+    Decide which decoded frames are worth running the face detector on.
+
+    Every frame is reduced to a tiny thumbnail and compared against the
+    previous one with a combined pixel-difference / luma-histogram signal.
+    Detection is requested on the first frames after a shot change and
+    whenever `max_gap` frames have passed without a detection, so static
+    wide shots are sampled sparsely and fast cuts are never skipped.
+    """
+
+    def __init__(self, threshold: float = 0.3, max_gap: int = 50, min_gap: int = 2,
+                 settle_frames: int = 2, thumb_size: Tuple[int, int] = (64, 36),
+                 histogram_bins: int = 32, channel_order: str = "bgr"):
+        self.threshold = threshold
+        self.max_gap = max(1, max_gap)
+        self.min_gap = max(1, min_gap)
+        self.settle_frames = max(0, settle_frames)
+        self.thumb_size = thumb_size
+        self.histogram_bins = histogram_bins
+
+        # Preallocated work buffers, sized on the first frame
+        self._thumb: Optional[np.ndarray] = None
+        self._prev_gray: Optional[np.ndarray] = None
+        self._gray: Optional[np.ndarray] = None
+        self._prev_hist: Optional[np.ndarray] = None
+        self._luma_weights = np.array([0.114, 0.587, 0.299], dtype=np.float32)
+        if channel_order == "rgb":
+            self._luma_weights = self._luma_weights[::-1].copy()
+
+        self._last_detection: Optional[int] = None
+        self._pending_cut: Optional[int] = None
+
+        self.frames_seen = 0
+        self.detections = 0
+        self.shot_changes = 0
+
+    def reset(self) -> None:
+        """Forget the previous frame, e.g. after seeking to a new position."""
+        self._prev_gray = None
+        self._prev_hist = None
+        self._last_detection = None
+        self._pending_cut = None
+
+    def change_score(self, frame: np.ndarray) -> float:
+        """
+        Return a shot-change score between 0 (identical) and 1 (completely different)
+        for `frame` relative to the previously scored frame. The first frame, and the
+        first one after reset(), is only the baseline and scores 0.
+        """
+        self._thumb = cv2.resize(frame, self.thumb_size, dst=self._thumb,
+                                 interpolation=cv2.INTER_AREA)
+        if self._gray is None:
+            self._gray = np.empty(self._thumb.shape[:2], dtype=np.float32)
+        np.dot(self._thumb, self._luma_weights, out=self._gray)
+
+        hist = np.bincount(
+            (self._gray * (self.histogram_bins / 256.0)).astype(np.intp).ravel(),
+            minlength=self.histogram_bins
+        ).astype(np.float32)
+        hist /= hist.sum()
+
+        if self._prev_gray is None:
+            score = 0.0
+            self._prev_gray = self._gray.copy()
+        else:
+            pixel_diff = float(np.mean(np.abs(self._gray - self._prev_gray))) / 255.0
+            hist_diff = float(np.abs(hist - self._prev_hist).sum()) / 2.0
+            score = min(1.0, 0.5 * pixel_diff * 4.0 + 0.5 * hist_diff)
+            self._prev_gray[...] = self._gray
+        self._prev_hist = hist
+        return score
+
+    def should_detect(self, frame: np.ndarray, frame_num: int) -> bool:
+        """
+        Score `frame` and return True if full face detection should run on it.
+
+        Frames must be passed in decode order, including the ones that end up
+        being skipped, so the change signal sees every cut.
+        """
+        self.frames_seen += 1
+        score = self.change_score(frame)
+
+        if score >= self.threshold:
+            self.shot_changes += 1
+            # Wait a couple of frames so we land on the new shot, not a dissolve
+            self._pending_cut = frame_num + self.settle_frames
+
+        since_last = (frame_num - self._last_detection
+                      if self._last_detection is not None else None)
+
+        detect = False
+        if since_last is None:
+            detect = True
+        elif self._pending_cut is not None and frame_num >= self._pending_cut:
+            detect = since_last >= self.min_gap
+            if detect:
+                self._pending_cut = None
+        elif since_last >= self.max_gap:
+            detect = True
+
+        if detect:
+            self._last_detection = frame_num
+            self.detections += 1
+        return detect
+
+    def stats(self) -> dict:
+        return {
+            "frames_seen": self.frames_seen,
+            "detections": self.detections,
+            "shot_changes": self.shot_changes,
+            "detection_ratio": self.detections / self.frames_seen if self.frames_seen else 0.0
+        }
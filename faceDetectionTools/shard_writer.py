@@ -0,0 +1,107 @@
+import io
+import json
+import tarfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+def json_default(value: Any) -> Any:
+    """json.dump fallback for NumPy scalars and arrays in metadata."""
+    if isinstance(value, (np.generic, np.ndarray)):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class TarShardWriter:
+    """
+    Write training samples into size-bounded tar shards (WebDataset layout).
+
+    Each sample is stored as `<key>.jpg` and `<key>.json` next to each other in
+    the same shard. Shards are written sequentially through a large write buffer
+    and rolled over once they would exceed `max_shard_bytes`. On close an
+    `index.jsonl` is written with the shard and byte offsets of every member,
+    so single samples can be read back with one seek.
+    """
+
+    def __init__(self, output_dir: Path, prefix: str = "faces",
+                 max_shard_bytes: int = 1024 * 1024 * 1024,
+                 buffer_bytes: int = 8 * 1024 * 1024):
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.prefix = prefix
+        self.max_shard_bytes = max_shard_bytes
+        self.buffer_bytes = buffer_bytes
+
+        self._shard_index = -1
+        self._file = None
+        self._tar: Optional[tarfile.TarFile] = None
+        self.shards: List[str] = []
+        self.index: List[Dict] = []
+
+    def _open_next_shard(self) -> None:
+        self._close_shard()
+        self._shard_index += 1
+        shard_name = f"{self.prefix}-{self._shard_index:06d}.tar"
+        self._file = open(self.output_dir / shard_name, "wb", buffering=self.buffer_bytes)
+        self._tar = tarfile.open(fileobj=self._file, mode="w", format=tarfile.USTAR_FORMAT)
+        self.shards.append(shard_name)
+
+    def _close_shard(self) -> None:
+        if self._tar is not None:
+            self._tar.close()
+            self._file.close()
+            self._tar = None
+            self._file = None
+
+    def _add_member(self, name: str, data: bytes, mtime: float) -> Dict:
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        info.mtime = mtime
+        header_size = len(info.tobuf(self._tar.format, self._tar.encoding, self._tar.errors))
+        offset = self._tar.offset + header_size
+        self._tar.addfile(info, io.BytesIO(data))
+        return {"offset": offset, "size": len(data)}
+
+    def write_sample(self, key: str, image_bytes: bytes, metadata: Dict) -> None:
+        """Append one sample; starts a new shard if this one would overflow."""
+        meta_bytes = json.dumps(metadata, default=json_default).encode("utf-8")
+        # Two 512-byte headers plus padding per member
+        sample_bytes = len(image_bytes) + len(meta_bytes) + 4 * 512
+        if self._tar is None or \
+                (self._tar.offset > 0 and self._tar.offset + sample_bytes > self.max_shard_bytes):
+            self._open_next_shard()
+
+        mtime = time.time()
+        image_entry = self._add_member(f"{key}.jpg", image_bytes, mtime)
+        meta_entry = self._add_member(f"{key}.json", meta_bytes, mtime)
+        self.index.append({
+            "key": key,
+            "shard": self.shards[-1],
+            "jpg": image_entry,
+            "json": meta_entry
+        })
+
+    def close(self) -> None:
+        self._close_shard()
+        with open(self.output_dir / "index.jsonl", "w") as f:
+            for entry in self.index:
+                f.write(json.dumps(entry) + "\n")
+
+    def __enter__(self) -> "TarShardWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def read_sample(shard_dir: Path, entry: Dict) -> Tuple[bytes, Dict]:
+    """Read one sample back using an `index.jsonl` entry."""
+    with open(Path(shard_dir) / entry["shard"], "rb") as f:
+        f.seek(entry["jpg"]["offset"])
+        image_bytes = f.read(entry["jpg"]["size"])
+        f.seek(entry["json"]["offset"])
+        metadata = json.loads(f.read(entry["json"]["size"]))
+    return image_bytes, metadata
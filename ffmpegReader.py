@@ -0,0 +1,152 @@
+"""
+Zero-copy ffmpeg rawvideo pipe reader.
+
+One ffmpeg process decodes the video and applies the scale/fps/pixel-format
+filters; this side only reads fixed-size frames from its stdout straight into
+reused NumPy buffers with readinto(), so reading a frame allocates nothing
+once the buffers exist.
+
+Buffers come from a FramePool (see framePool.py), which sets the contract:
+- by default a ring of `ring_size` buffers for in-order consumers: a frame
+  stays valid until `ring_size - 1` further frames have been read;
+- with `pool=FramePool(n)`, for consumers that finish frames out of order
+  (writer threads, batches released piecemeal): each frame stays valid until
+  the consumer passes it to pool.release(), and read() waits for a released
+  buffer when all n are held. Every frame read must be released.
+
+ffmpeg's stderr goes to a temporary file. When ffmpeg exits with an error,
+read() raises RuntimeError with the end of that output instead of reporting
+a normal end of file.
+"""
+import functools
+import subprocess
+import tempfile
+from typing import Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from framePool import FramePool
+from frameSampling import get_video_info
+
+PIXEL_FORMAT_CHANNELS = {"rgb24": 3, "bgr24": 3, "gray": 1}
+
+# Characters of ffmpeg's error output included in exceptions
+STDERR_TAIL = 2000
+
+
+@functools.lru_cache(maxsize=1)
+def passthrough_args() -> List[str]:
+    """Keep every decoded frame: -fps_mode passthrough, or -vsync 0 before ffmpeg 5.1."""
+    result = subprocess.run(['ffmpeg', '-hide_banner', '-h', 'long'], stdout=subprocess.PIPE,
+                            stderr=subprocess.STDOUT, text=True)
+    if '-fps_mode' in result.stdout:
+        return ['-fps_mode', 'passthrough']
+    return ['-vsync', '0']
+
+
+class FFmpegFrameReader:
+    def __init__(self, video_path: str, width: Optional[int] = None, height: Optional[int] = None,
+                 fps: Optional[float] = None, pix_fmt: str = "bgr24", ring_size: int = 4,
+                 filters: Optional[Sequence[str]] = None, start: Optional[float] = None,
+                 duration: Optional[float] = None, threads: Optional[int] = None,
+                 input_args: Optional[Sequence[str]] = None, pool: Optional[FramePool] = None):
+        """
+        Args:
+            video_path: Input file
+            width, height: Output size; give one to keep the aspect ratio, none for the source size
+            fps: Output frame rate (ffmpeg fps filter); None keeps every frame
+            pix_fmt: rgb24, bgr24 or gray
+            ring_size: Number of frame buffers to rotate through for an in-order consumer
+            filters: Extra filters applied before fps/scale/format (e.g. a select filter)
+            start, duration: Seconds to seek to / read, with accurate seeking
+            threads: Decoder threads (ffmpeg default: automatic)
+            input_args: Extra ffmpeg options placed before -i (e.g. -skip_frame nokey)
+            pool: Buffers released explicitly by an out-of-order consumer (replaces the ring)
+        """
+        if pix_fmt not in PIXEL_FORMAT_CHANNELS:
+            raise ValueError(f"Unsupported pixel format: {pix_fmt}")
+
+        info = get_video_info(video_path)
+        if width is None and height is None:
+            width, height = info.width, info.height
+        elif width is None:
+            width = int(round(info.width * height / info.height / 2)) * 2
+        elif height is None:
+            height = int(round(info.height * width / info.width / 2)) * 2
+        self.width, self.height = width, height
+        self.channels = PIXEL_FORMAT_CHANNELS[pix_fmt]
+        self.frames_read = 0
+
+        vf: List[str] = list(filters or [])
+        if fps is not None:
+            vf.append(f"fps={fps}")
+        if (width, height) != (info.width, info.height):
+            vf.append(f"scale={width}:{height}")
+        vf.append(f"format={pix_fmt}")
+
+        cmd = ['ffmpeg', '-v', 'error', '-nostdin']
+        if threads is not None:
+            cmd += ['-threads', str(threads)]
+        cmd += list(input_args or [])
+        if start:
+            cmd += ['-ss', f"{start:.6f}"]
+        cmd += ['-i', video_path]
+        if duration is not None:
+            cmd += ['-t', f"{duration:.6f}"]
+        cmd += ['-map', '0:v:0', '-vf', ','.join(vf)] + passthrough_args()
+        cmd += ['-f', 'rawvideo', '-pix_fmt', pix_fmt, 'pipe:1']
+
+        self.shape = (height, width) if self.channels == 1 else (height, width, self.channels)
+        self.frame_bytes = width * height * self.channels
+        self.pool = pool or FramePool(max(2, ring_size), in_order=True)
+        self.video_path = video_path
+
+        # Unbuffered so readinto() lands directly in our buffers
+        self._stderr = tempfile.TemporaryFile()
+        self._process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=self._stderr, bufsize=0)
+
+    def read(self) -> Optional[np.ndarray]:
+        """Read the next frame into a pool buffer and return it, or None at the end."""
+        frame = self.pool.acquire()
+        if frame is None or frame.shape != self.shape:
+            frame = np.empty(self.shape, dtype=np.uint8)
+        view = memoryview(frame).cast('B')
+        filled = 0
+        while filled < self.frame_bytes:
+            n = self._process.stdout.readinto(view[filled:])
+            if not n:
+                self.pool.release(frame)
+                self._check_exit()
+                return None
+            filled += n
+        self.frames_read += 1
+        return self.pool.issue(frame)
+
+    def _check_exit(self) -> None:
+        """At the end of the output: raise if ffmpeg failed rather than finished."""
+        returncode = self._process.wait()
+        if returncode != 0:
+            self._stderr.seek(0)
+            error = self._stderr.read().decode("utf-8", "replace").strip()[-STDERR_TAIL:]
+            raise RuntimeError(f"ffmpeg exited with code {returncode} reading {self.video_path}: "
+                               f"{error or 'no error output'}")
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        while True:
+            frame = self.read()
+            if frame is None:
+                return
+            yield frame
+
+    def close(self) -> None:
+        if self._process.poll() is None:
+            self._process.kill()
+        self._process.stdout.close()
+        self._process.wait()
+        self._stderr.close()
+
+    def __enter__(self) -> "FFmpegFrameReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
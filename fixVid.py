@@ -2,10 +2,15 @@ import sys
 import subprocess
 import os
 
+from mediaProbe import describe, probe
+
+# An output shorter than this fraction of the source duration lost data
+MIN_DURATION_RATIO = 0.9
+
 def run_command(cmd):
-    """ Runs a shell command and captures the output. """
+    """ Runs a command and captures the output. """
     try:
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
+        result = subprocess.run(cmd, capture_output=True, text=True)
         return result.stdout, result.stderr
     except Exception as e:
         print(f"Error running command: {cmd}\n{e}")
@@ -14,92 +19,164 @@ def run_command(cmd):
 def check_integrity(video_path):
     """ Checks file integrity using ffprobe. """
     print(f"Checking integrity of {video_path}...\n")
-    cmd = f'ffprobe -v error -show_entries format=duration,bit_rate -show_streams -i "{video_path}"'
-    stdout, stderr = run_command(cmd)
-    if stderr:
-        print(f"Integrity Check Failed: {stderr}\n")
+    try:
+        info = probe(video_path)
+    except ValueError as e:
+        print(f"Integrity Check Failed: {e}\n")
         return False
-    print(stdout)
+    if info.errors:
+        print(f"Integrity Check Failed: {info.errors}\n")
+        return False
+    print(describe(info))
     return True
 
+def verify_output(path, expected_duration=None, video=True, audio=True):
+    """ Fast probe of a repair output: it must parse cleanly, have the wanted streams and full length. """
+    if not os.path.isfile(path) or os.path.getsize(path) == 0:
+        return False, "no output"
+    try:
+        info = probe(path, use_cache=False)
+    except ValueError as e:
+        return False, str(e)
+    if info.errors:
+        return False, info.errors
+    if video and info.video is None:
+        return False, "no video stream"
+    if audio and not info.audio_tracks:
+        return False, "no audio stream"
+    if expected_duration and (info.duration or 0) < expected_duration * MIN_DURATION_RATIO:
+        return False, f"duration {info.duration}s is short of {expected_duration:.2f}s"
+    return True, ""
+
 def remux_video(video_path, output_path):
     """ Remuxes the video to fix container issues. """
     print(f"Remuxing {video_path} to {output_path}...\n")
-    cmd = f'ffmpeg -i "{video_path}" -c copy "{output_path}"'
+    # Only the stream types MP4 can hold: data and timecode tracks (tmcd from MXF/MOV) make the muxer fail
+    cmd = ['ffmpeg', '-v', 'error', '-y', '-i', video_path,
+           '-map', '0:v', '-map', '0:a?', '-map', '0:s?', '-c', 'copy', output_path]
     _, stderr = run_command(cmd)
     if "error" in stderr.lower():
-        print(f"Remuxing failed: {stderr}\n")
-        return False
-    return True
+        print(f"Remuxing reported errors: {stderr}\n")
 
-def extract_video(video_path, output_path):
-    """ Extracts the video stream, ignoring errors. """
-    print(f"Extracting video stream from {video_path} to {output_path}...\n")
-    cmd = f'ffmpeg -err_detect ignore_err -i "{video_path}" -c:v copy -an "{output_path}"'
+def extract_streams(video_path, video_output, audio_output):
+    """ Extracts the video and audio streams in one pass, ignoring errors. """
+    print(f"Extracting streams from {video_path} to {video_output} and {audio_output}...\n")
+    cmd = ['ffmpeg', '-v', 'error', '-y', '-err_detect', 'ignore_err', '-i', video_path,
+           '-map', '0:v:0', '-c', 'copy', video_output]
+    if audio_output:
+        cmd += ['-map', '0:a:0', '-c', 'copy', audio_output]
     _, stderr = run_command(cmd)
     if "error" in stderr.lower():
-        print(f"Video extraction failed: {stderr}\n")
-        return False
-    return True
+        print(f"Extraction reported errors: {stderr}\n")
 
-def extract_audio(video_path, output_path):
-    """ Extracts the audio stream, ignoring errors. """
-    print(f"Extracting audio stream from {video_path} to {output_path}...\n")
-    cmd = f'ffmpeg -err_detect ignore_err -i "{video_path}" -c:a copy -vn "{output_path}"'
-    _, stderr = run_command(cmd)
-    if "error" in stderr.lower():
-        print(f"Audio extraction failed: {stderr}\n")
-        return False
-    return True
+def rebuild_video(video_path, output_path, video_source=None, audio_source=None):
+    """
+    Writes the repaired file, re-encoding only the streams that did not extract cleanly.
 
-def reencode_video(video_path, output_path):
-    """ Re-encodes the video to a more compatible format. """
-    print(f"Re-encoding {video_path} to {output_path}...\n")
-    cmd = f'ffmpeg -i "{video_path}" -c:v libx264 -preset fast -crf 23 -c:a aac -b:a 128k "{output_path}"'
+    video_source / audio_source are clean extracted streams to copy; a stream without
+    one is re-encoded from the damaged original.
+    """
+    print(f"Rebuilding {output_path} (video: {'copy' if video_source else 're-encode'}, "
+          f"audio: {'copy' if audio_source else 're-encode'})...\n")
+    cmd = ['ffmpeg', '-v', 'error', '-y']
+    inputs = []
+    for path in (video_source, audio_source):
+        if path:
+            inputs.append(path)
+    if not (video_source and audio_source):
+        inputs.append(video_path)
+    for path in inputs:
+        if path == video_path:
+            cmd += ['-err_detect', 'ignore_err']
+        cmd += ['-i', path]
+
+    original = inputs.index(video_path) if video_path in inputs else None
+    if video_source:
+        cmd += ['-map', f"{inputs.index(video_source)}:v:0", '-c:v', 'copy']
+    else:
+        cmd += ['-map', f"{original}:v:0", '-c:v', 'libx264', '-preset', 'fast', '-crf', '23']
+    if audio_source:
+        cmd += ['-map', f"{inputs.index(audio_source)}:a:0", '-c:a', 'copy']
+    else:
+        cmd += ['-map', f"{original}:a:0?", '-c:a', 'aac', '-b:a', '128k']
+    cmd.append(output_path)
     _, stderr = run_command(cmd)
     if "error" in stderr.lower():
-        print(f"Re-encoding failed: {stderr}\n")
-        return False
-    return True
+        print(f"Rebuild reported errors: {stderr}\n")
 
-def main():
-    if len(sys.argv) < 2:
-        print("Usage: python fixVid.py <video_file>")
-        sys.exit(1)
+def repair_video(video_file):
+    """
+    Runs the repair stages in order of cost and stops at the first output that verifies.
 
-    video_file = sys.argv[1]
-    if not os.path.exists(video_file):
-        print(f"File not found: {video_file}")
-        sys.exit(1)
+    1. Remux (stream copy) for container damage.
+    2. One-pass extraction of the video and audio streams, each verified on its own.
+    3. Rebuild that copies the clean streams and re-encodes only the damaged ones.
 
+    Returns the path of the repaired file, or None.
+    """
     base_name = os.path.splitext(video_file)[0]
 
     # Step 1: Check Integrity
     if not check_integrity(video_file):
         print("File integrity check failed. Proceeding with repairs...\n")
+    try:
+        source = probe(video_file)
+    except ValueError:
+        source = None  # unreadable header: extraction still tries to recover audio
+    duration = source.duration if source else None
+    has_audio = bool(source.audio_tracks) if source else True
 
     # Step 2: Remux Video
     remuxed_video = f"{base_name}_remuxed.mp4"
-    if remux_video(video_file, remuxed_video):
+    remux_video(video_file, remuxed_video)
+    ok, reason = verify_output(remuxed_video, duration, audio=has_audio)
+    if ok:
         print(f"Remuxing successful! Output: {remuxed_video}")
-    else:
-        print("Remuxing failed. Proceeding to extraction...")
+        return remuxed_video
+    print(f"Remuxed file did not verify ({reason}). Proceeding to extraction...")
+    if os.path.exists(remuxed_video):
+        os.remove(remuxed_video)
 
-    # Step 3: Extract Video & Audio
+    # Step 3: Extract Video & Audio in one pass
     extracted_video = f"{base_name}_video.mp4"
-    extracted_audio = f"{base_name}_audio.aac"
-    video_ok = extract_video(video_file, extracted_video)
-    audio_ok = extract_audio(video_file, extracted_audio)
-
-    # Step 4: Re-encode if necessary
-    reencoded_video = f"{base_name}_fixed.mp4"
-    if video_ok or audio_ok:
-        if reencode_video(video_file, reencoded_video):
-            print(f"Re-encoding successful! Output: {reencoded_video}")
-        else:
-            print("Re-encoding failed. Please check the file manually.")
-    else:
-        print("Could not extract usable video or audio. File may be corrupted.")
+    extracted_audio = f"{base_name}_audio.mka" if has_audio else None
+    extract_streams(video_file, extracted_video, extracted_audio)
+    video_ok, reason = verify_output(extracted_video, duration, audio=False)
+    if not video_ok:
+        print(f"Video stream is damaged ({reason})")
+    audio_ok = False
+    if has_audio:
+        audio_ok, reason = verify_output(extracted_audio, duration, video=False)
+        if not audio_ok:
+            print(f"Audio stream is damaged ({reason})")
+
+    # Step 4: Re-encode only the damaged stream
+    fixed_video = f"{base_name}_fixed.mp4"
+    rebuild_video(video_file, fixed_video,
+                  video_source=extracted_video if video_ok else None,
+                  audio_source=extracted_audio if audio_ok else None)
+    for path in (extracted_video, extracted_audio):
+        if path and os.path.exists(path):
+            os.remove(path)
+    ok, reason = verify_output(fixed_video, duration, audio=has_audio and source is not None)
+    if ok:
+        print(f"Repair successful! Output: {fixed_video}")
+        return fixed_video
+    print(f"Repair failed ({reason}). File may be corrupted; please check it manually.")
+    return None
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python fixVid.py <video_file>")
+        sys.exit(1)
+
+    video_file = sys.argv[1]
+    if not os.path.exists(video_file):
+        print(f"File not found: {video_file}")
+        sys.exit(1)
+
+    if repair_video(video_file) is None:
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
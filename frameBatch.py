@@ -0,0 +1,145 @@
+"""
+Batch runner for the frame extraction tools.
+
+Inputs may be video files, directories (searched recursively for video files)
+or glob patterns. Videos are processed in parallel in a process pool. Every
+finished video is recorded in a JSON manifest together with its size, mtime
+and output count, so a rerun skips videos that are already done. Videos that
+failed or were interrupted run again; tools called with `resume=True` keep
+the frames already written and only extract the missing ones.
+"""
+import glob
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+# Written into every loose-file output folder to record which video its frames came from
+SOURCE_MARKER = ".source.json"
+
+VIDEO_EXTENSIONS = {'.mp4', '.mov', '.mxf', '.mkv', '.avi', '.m4v', '.mts', '.webm', '.wmv', '.mpg', '.mpeg'}
+
+
+def expand_inputs(inputs: Iterable[str]) -> List[str]:
+    """Resolve files, directories and glob patterns to a sorted list of unique video paths."""
+    videos = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            candidates = (str(p) for p in Path(item).rglob('*'))
+        elif os.path.isfile(item):
+            videos.add(os.path.abspath(item))
+            continue
+        else:
+            candidates = glob.glob(item, recursive=True)
+        videos.update(os.path.abspath(p) for p in candidates
+                      if os.path.isfile(p) and Path(p).suffix.lower() in VIDEO_EXTENSIONS)
+    return sorted(videos)
+
+
+def claim_output_dir(output_dir: str, video_path: str, resume: bool = False) -> bool:
+    """
+    Record `video_path` as the source of the frames in `output_dir`.
+
+    With `resume`, returns True only when the frames already in the folder can
+    be kept: the folder was claimed by this same, unchanged video. A folder
+    claimed by a different video raises ValueError instead of mixing frames
+    from two sources. Without a matching claim (or without `resume`) the
+    frames are extracted again and the folder is claimed afresh.
+    """
+    marker = Path(output_dir) / SOURCE_MARKER
+    source = {"video": os.path.abspath(video_path), **BatchManifest._signature(video_path)}
+    claimed = None
+    if marker.exists():
+        try:
+            with open(marker) as f:
+                claimed = json.load(f)
+        except (OSError, ValueError):
+            claimed = None
+    if resume and claimed is not None and claimed.get("video") != source["video"]:
+        raise ValueError(f"{output_dir} holds frames of {claimed.get('video')}, not {source['video']}")
+    reusable = resume and claimed == source
+    if not reusable:
+        Path(output_dir).mkdir(parents=True, exist_ok=True)
+        with open(marker, "w") as f:
+            json.dump(source, f)
+    return reusable
+
+
+class BatchManifest:
+    """JSON record of finished and failed videos, rewritten atomically after every change."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.videos: Dict[str, Dict] = {}
+        if self.path.exists():
+            with open(self.path) as f:
+                self.videos = json.load(f).get("videos", {})
+
+    @staticmethod
+    def _signature(video_path: str) -> Dict:
+        stat = os.stat(video_path)
+        return {"size": stat.st_size, "mtime": stat.st_mtime}
+
+    def is_complete(self, video_path: str) -> bool:
+        entry = self.videos.get(video_path)
+        return (entry is not None and entry.get("status") == "complete"
+                and entry.get("size") == os.path.getsize(video_path)
+                and entry.get("mtime") == os.path.getmtime(video_path))
+
+    def record(self, video_path: str, status: str, outputs: Optional[int] = None,
+               error: Optional[str] = None, seconds: Optional[float] = None) -> None:
+        entry = {"status": status, **self._signature(video_path)}
+        if outputs is not None:
+            entry["outputs"] = outputs
+        if error is not None:
+            entry["error"] = error
+        if seconds is not None:
+            entry["seconds"] = round(seconds, 2)
+        self.videos[video_path] = entry
+        self.save()
+
+    def save(self) -> None:
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"videos": self.videos}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def _run_one(job: Callable[[str], int], video_path: str):
+    start = time.perf_counter()
+    return job(video_path), time.perf_counter() - start
+
+
+def run_batch(videos: List[str], job: Callable[[str], int], manifest_path: str,
+              jobs: Optional[int] = None) -> BatchManifest:
+    """
+    Run `job(video_path) -> output_count` for every video not already complete.
+
+    `job` must be picklable (a module-level function or functools.partial of one).
+    """
+    manifest = BatchManifest(manifest_path)
+    pending = [video for video in videos if not manifest.is_complete(video)]
+    skipped = len(videos) - len(pending)
+    print(f"{len(videos)} videos, {skipped} already complete, {len(pending)} to process")
+    if not pending:
+        return manifest
+
+    jobs = max(1, min(jobs or os.cpu_count() or 1, len(pending)))
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {pool.submit(_run_one, job, video): video for video in pending}
+        for future in as_completed(futures):
+            video = futures[future]
+            try:
+                outputs, seconds = future.result()
+            except Exception as e:
+                manifest.record(video, "failed", error=str(e))
+                print(f"Failed: {video}: {e}")
+                continue
+            manifest.record(video, "complete", outputs=outputs, seconds=seconds)
+            print(f"Done: {video} ({outputs} outputs, {seconds:.1f} s)")
+
+    failed = sum(1 for video in pending if manifest.videos[video]["status"] == "failed")
+    print(f"Batch finished: {len(pending) - failed} completed, {failed} failed; manifest: {manifest.path}")
+    return manifest
@@ -0,0 +1,180 @@
+"""
+SQLite index of extracted frames.
+
+Every extraction records, per output frame, the source video, frame number,
+PTS, SMPTE timecode, output path, a content hash of the stored image and its
+dHash. Downstream tools look frames up by time range or hash with indexed
+queries instead of parsing filenames:
+
+    with FrameIndex("extractedFrames/frames.sqlite") as index:
+        for frame in index.frames_in_range("/ingest/match.mxf", 600.0, 660.0):
+            print(frame.output_path, frame.timecode)
+
+PTS are seconds from the source's first video frame in every extraction
+mode, and timecodes continue from the source's start timecode when it has
+one. Frames stored in a frame store (see frameStore.py) are recorded with
+the store path as `output_path`; `frame_number` selects the frame inside it.
+Several extractions may share one index file; re-extracting into the same
+folder or store replaces that location's rows.
+"""
+import hashlib
+import os
+import sqlite3
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from frameSampling import frames_to_timecode
+from mediaProbe import probe
+
+INDEX_FILE_NAME = "frames.sqlite"
+
+
+class FrameRecord(NamedTuple):
+    source_path: str
+    frame_number: int
+    pts: Optional[float]
+    timecode: Optional[str]
+    output_path: str
+    content_hash: str
+    dhash: Optional[str] = None
+
+
+def bytes_hash(data) -> str:
+    """Content hash of encoded image bytes or a raw frame buffer."""
+    return hashlib.blake2b(memoryview(data).cast("B"), digest_size=16).hexdigest()
+
+
+def file_hash(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+
+
+def format_dhash(value: Optional[int]) -> Optional[str]:
+    """64-bit dHash as fixed-width hex, so it fits SQLite and compares as text."""
+    return None if value is None else f"{value:016x}"
+
+
+class FrameIndex:
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        # Batch jobs may write to one shared index from several processes
+        self._db = sqlite3.connect(str(db_path), timeout=60)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS frames (
+                id INTEGER PRIMARY KEY,
+                source_path TEXT NOT NULL,
+                frame_number INTEGER NOT NULL,
+                pts REAL,
+                timecode TEXT,
+                output_path TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                dhash TEXT,
+                UNIQUE (output_path, frame_number)
+            );
+            CREATE INDEX IF NOT EXISTS frames_source_pts ON frames (source_path, pts);
+            CREATE INDEX IF NOT EXISTS frames_content_hash ON frames (content_hash);
+            CREATE INDEX IF NOT EXISTS frames_dhash ON frames (dhash);
+        """)
+
+    def add_frames(self, records: Iterable[FrameRecord]) -> int:
+        """Insert or update records in one transaction; a missing dhash keeps the stored one."""
+        with self._db:
+            cursor = self._db.executemany("""
+                INSERT INTO frames (source_path, frame_number, pts, timecode, output_path, content_hash, dhash)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (output_path, frame_number) DO UPDATE SET
+                    source_path = excluded.source_path, pts = excluded.pts, timecode = excluded.timecode,
+                    content_hash = excluded.content_hash, dhash = COALESCE(excluded.dhash, frames.dhash)
+            """, [tuple(record) for record in records])
+        return cursor.rowcount
+
+    def replace_location(self, location: str, records: Iterable[FrameRecord]) -> int:
+        """
+        Replace every row whose output is `location` (a frame store) or lies inside
+        it (an output folder) with `records`, in one transaction.
+        """
+        location = os.path.abspath(location)
+        prefix = os.path.join(location, '')
+        where = "output_path = ? OR substr(output_path, 1, ?) = ?"
+        params = (location, len(prefix), prefix)
+        # A resumed run re-records the frames it kept without their dHash; keep the
+        # stored one where the file is unchanged
+        stored = {row[:3]: row[3] for row in self._db.execute(
+            f"SELECT output_path, frame_number, content_hash, dhash FROM frames WHERE {where}", params)}
+        records = [record if record.dhash is not None else record._replace(
+                       dhash=stored.get((record.output_path, record.frame_number, record.content_hash)))
+                   for record in records]
+        with self._db:
+            self._db.execute(f"DELETE FROM frames WHERE {where}", params)
+        return self.add_frames(records)
+
+    def _select(self, where: str, params: Tuple) -> List[FrameRecord]:
+        rows = self._db.execute(
+            f"SELECT {', '.join(FrameRecord._fields)} FROM frames WHERE {where} ORDER BY source_path, pts",
+            params).fetchall()
+        return [FrameRecord(*row) for row in rows]
+
+    def frames_in_range(self, source_path: str, start: float, end: float) -> List[FrameRecord]:
+        """Frames of `source_path` with start <= pts < end (seconds)."""
+        return self._select("source_path = ? AND pts >= ? AND pts < ?",
+                            (os.path.abspath(source_path), start, end))
+
+    def frames_for_source(self, source_path: str) -> List[FrameRecord]:
+        return self._select("source_path = ?", (os.path.abspath(source_path),))
+
+    def find_by_hash(self, content_hash: str) -> List[FrameRecord]:
+        return self._select("content_hash = ?", (content_hash,))
+
+    def find_by_dhash(self, dhash: str) -> List[FrameRecord]:
+        return self._select("dhash = ?", (dhash,))
+
+    def close(self) -> None:
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def index_extraction(index_path: str, source_path: str, fps: float,
+                     outputs: Iterable[Tuple[int, str]],
+                     frame_pts: Optional[Dict[int, float]] = None,
+                     dhashes: Optional[Dict[int, int]] = None,
+                     content_hashes: Optional[Dict[int, str]] = None,
+                     output_location: Optional[str] = None) -> int:
+    """
+    Record one extraction's (frame_number, output_path) pairs.
+
+    `frame_pts` must be relative to the first video frame (as read_keyframes
+    yields them); PTS default to frame_number / fps. Content hashes default to
+    hashing the output file. With `output_location` (the output folder or frame
+    store) rows left there by earlier extractions are removed first.
+    Returns the number of recorded frames.
+    """
+    frame_pts = frame_pts or {}
+    dhashes = dhashes or {}
+    content_hashes = content_hashes or {}
+    source_path = os.path.abspath(source_path)
+    try:
+        start_timecode = probe(source_path).timecode
+    except (OSError, ValueError):
+        start_timecode = None
+    records = []
+    for frame_number, output_path in outputs:
+        pts = frame_pts.get(frame_number, frame_number / fps if fps else None)
+        records.append(FrameRecord(
+            source_path=source_path,
+            frame_number=frame_number,
+            pts=round(pts, 6) if pts is not None else None,
+            timecode=frames_to_timecode(frame_number, fps, start_timecode) if fps else None,
+            output_path=os.path.abspath(output_path),
+            content_hash=content_hashes.get(frame_number) or file_hash(output_path),
+            dhash=format_dhash(dhashes.get(frame_number))
+        ))
+    with FrameIndex(index_path) as index:
+        if output_location is not None:
+            index.replace_location(output_location, records)
+        else:
+            index.add_frames(records)
+    return len(records)
@@ -0,0 +1,77 @@
+"""
+Reusable frame buffers shared between a frame reader and its consumers.
+
+Readers decode every frame into a buffer taken from a FramePool instead of
+allocating a new array. When a buffer may be reused depends on the consumer:
+
+- in order (the default ring of read_frames / FFmpegFrameReader): the
+  consumer is done with frames in the order it received them and never hands
+  them back. The pool recycles the oldest frame once all `size` buffers are
+  out, so a frame stays valid until `size - 1` further frames have been read.
+- out of order (writer pools, encoders): the consumer calls release(frame)
+  when it no longer needs a frame, in any order. A buffer is only reused
+  after its release, and acquire() blocks while all `size` buffers are held,
+  which also bounds memory. Every frame handed out must be released.
+"""
+import queue
+import threading
+from collections import deque
+from typing import Optional
+
+import numpy as np
+
+
+class FramePool:
+    def __init__(self, size: int, in_order: bool = False):
+        self.size = max(1, size)
+        self.in_order = in_order
+        self._free: "queue.Queue[np.ndarray]" = queue.Queue()
+        self._allocated = 0
+        self._lock = threading.Lock()
+        self._issued: "deque[np.ndarray]" = deque()
+
+    def acquire(self) -> Optional[np.ndarray]:
+        """
+        A free buffer to decode the next frame into, or None when the reader
+        should allocate a new one (fewer than `size` buffers exist yet). Blocks
+        until a buffer is released when all of them are held.
+        """
+        if self.in_order and len(self._issued) >= self.size:
+            self._free.put(self._issued.popleft())
+        try:
+            return self._free.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._allocated < self.size:
+                self._allocated += 1
+                return None
+        return self._free.get()
+
+    def issue(self, frame: np.ndarray) -> np.ndarray:
+        """Record `frame` (the filled buffer) as handed to the consumer and return it."""
+        if self.in_order:
+            self._issued.append(frame)
+        return frame
+
+    def release(self, frame: np.ndarray) -> None:
+        """Return a buffer for reuse: a frame the consumer is done with, or one the reader did not fill."""
+        with self._lock:
+            if self._allocated > self.size:
+                self._allocated -= 1  # the pool was shrunk; let this buffer go
+                return
+        self._free.put(frame)
+
+    def resize(self, size: int) -> None:
+        """
+        Change the number of buffers for an out-of-order pool. Growing lets the
+        reader allocate more; surplus buffers are freed as they are released.
+        """
+        with self._lock:
+            self.size = max(1, size)
+            while self._allocated > self.size:
+                try:
+                    self._free.get_nowait()
+                except queue.Empty:
+                    break
+                self._allocated -= 1
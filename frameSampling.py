@@ -0,0 +1,332 @@
+"""
+Shared frame sampling engine for the frame extraction tools.
+
+Frames can be requested by rate (fps), by images per minute, by an exact
+count spread evenly over the video, or by explicit timestamps. The planned
+frame indices are then read with the cheapest strategy:
+
+- "grab":   decode sequentially and only convert (retrieve) the wanted frames,
+            best when targets are close together
+- "seek":   jump to each target, best when targets are far apart
+- "ffmpeg": one ffmpeg process with a select filter piping raw frames,
+            also used when OpenCV cannot open the file
+- "auto":   per target, grab forward when the gap is short and seek otherwise
+
+When a packet-scan seek index is available (see seekIndex.py), frame counts
+are exact and "seek"/"auto" know where every GOP starts: they seek only when
+the target's keyframe lies beyond the decoder's position and otherwise decode
+forward, so no GOP is decoded twice.
+
+read_keyframes is a separate fast path for visual indexing: the decoder is
+told to skip every non-key frame, so long-GOP sources are indexed at a
+fraction of the cost of a full decode.
+"""
+import shutil
+from typing import Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from framePool import FramePool
+from mediaProbe import probe
+from seekIndex import SeekIndex, cached_seek_index, load_seek_index
+
+# Gaps longer than this are cheaper to seek over than to decode through
+# (seeking decodes from the previous keyframe, typically <= 2 s away)
+SEEK_GAP_SECONDS = 4.0
+
+
+class VideoInfo(NamedTuple):
+    fps: float
+    frame_count: int
+    width: int
+    height: int
+
+    @property
+    def duration(self) -> float:
+        return self.frame_count / self.fps if self.fps else 0.0
+
+
+def get_video_info(video_path: str) -> VideoInfo:
+    """Read fps, frame count and size with OpenCV, falling back to ffprobe."""
+    cap = cv2.VideoCapture(video_path)
+    if cap.isOpened():
+        info = VideoInfo(
+            fps=cap.get(cv2.CAP_PROP_FPS),
+            frame_count=int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
+            width=int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            height=int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        )
+        cap.release()
+        if info.fps > 0 and info.frame_count > 0:
+            return info
+    return _probe_video_info(video_path)
+
+
+def _probe_video_info(video_path: str) -> VideoInfo:
+    media = probe(video_path)
+    video = media.video
+    if video is None:
+        raise ValueError(f"No video stream in {video_path}")
+    return VideoInfo(fps=media.frame_rate, frame_count=media.frame_count,
+                     width=video.width or 0, height=video.height or 0)
+
+
+def plan_frame_indices(info: VideoInfo, fps: Optional[float] = None,
+                       images_per_minute: Optional[float] = None,
+                       count: Optional[int] = None,
+                       timestamps: Optional[Sequence[float]] = None) -> List[int]:
+    """
+    Turn exactly one sampling request into sorted, unique frame indices.
+
+    Args:
+        fps: Frames per second to sample
+        images_per_minute: Images per minute of video, evenly spaced
+        count: Exact number of frames spread evenly from first to last frame
+        timestamps: Explicit times in seconds
+    """
+    modes = [fps, images_per_minute, count, timestamps]
+    if sum(mode is not None for mode in modes) != 1:
+        raise ValueError("Specify exactly one of fps, images_per_minute, count or timestamps")
+    if info.frame_count <= 0:
+        raise ValueError("Could not determine the number of frames in the video")
+    for name, value in (("fps", fps), ("images_per_minute", images_per_minute)):
+        if value is not None and value <= 0:
+            raise ValueError(f"{name} must be positive, got {value}")
+
+    if fps is not None:
+        interval = max(1, int(round(info.fps / fps)))
+        indices = range(0, info.frame_count, interval)
+    elif images_per_minute is not None:
+        frames_to_extract = max(1, int(info.duration / 60 * images_per_minute))
+        interval = max(1, info.frame_count // frames_to_extract)
+        indices = range(0, info.frame_count, interval)
+    elif count is not None:
+        indices = np.linspace(0, info.frame_count - 1, num=max(1, count)).round().astype(int).tolist()
+    else:
+        indices = [min(info.frame_count - 1, max(0, int(round(t * info.fps)))) for t in timestamps]
+
+    return sorted(set(indices))
+
+
+def choose_strategy(video_path: str, strategy: str = "auto") -> str:
+    """Resolve "auto" to "ffmpeg" for files OpenCV cannot open; otherwise keep it."""
+    if strategy not in ("auto", "grab", "seek", "ffmpeg"):
+        raise ValueError(f"Unknown sampling strategy: {strategy}")
+    if strategy == "auto":
+        cap = cv2.VideoCapture(video_path)
+        opened = cap.isOpened()
+        cap.release()
+        if not opened and shutil.which('ffmpeg'):
+            return "ffmpeg"
+    return strategy
+
+
+def _read_opencv(video_path: str, indices: List[int], seek_gap: float,
+                 seek_index: Optional[SeekIndex] = None, ring_size: int = 2,
+                 pool: Optional[FramePool] = None) -> Iterator[Tuple[int, np.ndarray]]:
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError(f"Could not open video file {video_path}")
+    position = 0  # index of the next frame the decoder will return
+    # Frames are decoded into reused buffers (allocated on first use)
+    pool = pool or FramePool(ring_size, in_order=True)
+    try:
+        for target in indices:
+            gap = target - position
+            if seek_index is not None:
+                # A seek decodes from the target's keyframe anyway, so it only pays
+                # off when that keyframe lies beyond the decoder's current position.
+                # OpenCV seeks to the target itself (it backs off from the target
+                # internally; seeking straight to the keyframe lands one GOP early).
+                seek = gap < 0 or seek_index.keyframe_for(target) > position
+            else:
+                seek = gap < 0 or gap > seek_gap
+            if seek:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+                gap = 0
+            for _ in range(gap):
+                if not cap.grab():
+                    return
+            buffer = pool.acquire()
+            ret, frame = cap.read(buffer)
+            if not ret:
+                if buffer is not None:
+                    pool.release(buffer)
+                return
+            position = target + 1
+            yield target, pool.issue(frame)
+    finally:
+        cap.release()
+
+
+def _select_expression(indices: List[int]) -> str:
+    if len(indices) > 1:
+        step = indices[1] - indices[0]
+        if indices[0] == 0 and all(b - a == step for a, b in zip(indices, indices[1:])):
+            return f"not(mod(n\\,{step}))"
+    return "+".join(f"eq(n\\,{i})" for i in indices)
+
+
+def _read_ffmpeg(video_path: str, indices: List[int], ring_size: int,
+                 pool: Optional[FramePool] = None) -> Iterator[Tuple[int, np.ndarray]]:
+    from ffmpegReader import FFmpegFrameReader
+
+    with FFmpegFrameReader(video_path, filters=[f"select={_select_expression(indices)}"],
+                           ring_size=ring_size, pool=pool) as reader:
+        for target in indices:
+            frame = reader.read()
+            if frame is None:
+                break
+            yield target, frame
+
+
+def read_frames(video_path: str, indices: List[int], info: Optional[VideoInfo] = None,
+                strategy: str = "auto", max_in_flight: int = 1,
+                seek_index: Optional[SeekIndex] = None,
+                pool: Optional[FramePool] = None) -> Iterator[Tuple[int, np.ndarray]]:
+    """
+    Yield (frame_index, bgr_frame) for already planned, sorted frame indices.
+
+    Frames are decoded into reused buffers. By default they form a ring for a
+    consumer done with frames in order: callers may hold at most
+    `max_in_flight` yielded frames at a time (copy anything kept longer).
+    Consumers that finish frames out of order (writer threads) pass a
+    FramePool instead and release every frame to it once done.
+    Seeks use `seek_index`, or the video's cached seek index if one exists.
+    """
+    info = info or get_video_info(video_path)
+    strategy = choose_strategy(video_path, strategy)
+    ring_size = max_in_flight + 1
+
+    if strategy == "ffmpeg":
+        return _read_ffmpeg(video_path, indices, ring_size, pool)
+    if strategy == "grab":
+        return _read_opencv(video_path, indices, float('inf'), ring_size=ring_size, pool=pool)
+    seek_gap = 0 if strategy == "seek" else info.fps * SEEK_GAP_SECONDS
+    return _read_opencv(video_path, indices, seek_gap, seek_index or cached_seek_index(video_path),
+                        ring_size, pool)
+
+
+def exact_video_info(video_path: str, seek_index: Optional[SeekIndex] = None) -> VideoInfo:
+    """
+    get_video_info with the frame count taken from the packet scan when a seek
+    index is given or cached, instead of the container's estimate.
+    """
+    info = get_video_info(video_path)
+    seek_index = seek_index or cached_seek_index(video_path)
+    if seek_index is not None and seek_index.frame_count > 0:
+        info = info._replace(frame_count=seek_index.frame_count)
+    return info
+
+
+def sample_frames(video_path: str, fps: Optional[float] = None,
+                  images_per_minute: Optional[float] = None,
+                  count: Optional[int] = None,
+                  timestamps: Optional[Sequence[float]] = None,
+                  strategy: str = "auto", max_in_flight: int = 1,
+                  seek_index: Optional[SeekIndex] = None,
+                  pool: Optional[FramePool] = None) -> Iterator[Tuple[int, np.ndarray]]:
+    """
+    Yield (frame_index, bgr_frame) for the requested frames, in order.
+    See the module docstring for the sampling modes and strategies, and
+    read_frames for `max_in_flight`, `seek_index` and `pool`.
+    """
+    seek_index = seek_index or cached_seek_index(video_path)
+    info = exact_video_info(video_path, seek_index)
+    indices = plan_frame_indices(info, fps, images_per_minute, count, timestamps)
+    return read_frames(video_path, indices, info, strategy, max_in_flight, seek_index, pool)
+
+
+def keyframe_seek_index(video_path: str) -> SeekIndex:
+    """load_seek_index for the keyframe tools, with failures reported as ValueError."""
+    if not (shutil.which('ffmpeg') and shutil.which('ffprobe')):
+        raise ValueError("Keyframe extraction needs ffmpeg and ffprobe on the PATH")
+    try:
+        return load_seek_index(video_path)
+    except (OSError, RuntimeError) as e:
+        raise ValueError(f"Could not read keyframes of {video_path}: {e}")
+
+
+def read_keyframes(video_path: str, max_in_flight: int = 1,
+                   seek_index: Optional[SeekIndex] = None,
+                   pool: Optional[FramePool] = None) -> Iterator[Tuple[int, float, np.ndarray]]:
+    """
+    Yield (frame_index, pts_seconds, bgr_frame) for every keyframe, in order.
+
+    Keyframe numbers and PTS come from the packet-scan seek index. PTS are
+    relative to the first video frame (packet PTS minus the stream's start
+    time), the same base as frame_index / fps in the other modes. The frames
+    come from one ffmpeg process with `-skip_frame nokey`, so non-key frames
+    are never decoded. Buffers are reused as in read_frames: a ring for
+    `max_in_flight` frames held in order, or `pool` for out-of-order consumers
+    that release every frame.
+    """
+    seek_index = seek_index or keyframe_seek_index(video_path)
+    from ffmpegReader import FFmpegFrameReader
+
+    def generate():
+        with FFmpegFrameReader(video_path, ring_size=max_in_flight + 1, pool=pool,
+                               input_args=['-skip_frame', 'nokey']) as reader:
+            for frame_index, pts in zip(seek_index.keyframe_frames, seek_index.keyframe_pts):
+                frame = reader.read()
+                if frame is None:
+                    break
+                yield frame_index, pts - seek_index.start_pts, frame
+
+    return generate()
+
+
+def _dropped_frames_per_minute(fps: float) -> int:
+    """Frame numbers skipped each minute by drop-frame timecode (2 at 29.97, 4 at 59.94)."""
+    return int(round(fps * 0.066666))
+
+
+def timecode_to_frames(timecode: str, fps: float) -> int:
+    """
+    Frame count of an SMPTE timecode (HH:MM:SS:FF, or HH:MM:SS;FF for drop-frame).
+    Raises ValueError for anything else.
+    """
+    parts = timecode.replace(';', ':').replace('.', ':').split(':')
+    if len(parts) != 4:
+        raise ValueError(f"Not an SMPTE timecode: {timecode}")
+    hours, minutes, seconds, frames = (int(part) for part in parts)
+    base = max(1, int(round(fps)))
+    total = ((hours * 60 + minutes) * 60 + seconds) * base + frames
+    if ';' in timecode or '.' in timecode:
+        total_minutes = hours * 60 + minutes
+        total -= _dropped_frames_per_minute(fps) * (total_minutes - total_minutes // 10)
+    return total
+
+
+def frames_to_timecode(frame_number: int, fps: float, start_timecode: Optional[str] = None) -> str:
+    """
+    SMPTE timecode (HH:MM:SS:FF) for a 0-based frame number.
+
+    With `start_timecode` (the source's timecode of frame 0, see
+    mediaProbe.MediaInfo.timecode) the result continues from it, in
+    drop-frame notation (HH:MM:SS;FF) when the start uses it.
+    """
+    base = max(1, int(round(fps)))
+    drop = start_timecode is not None and (';' in start_timecode or '.' in start_timecode)
+    if start_timecode is not None:
+        frame_number += timecode_to_frames(start_timecode, fps)
+    separator = ':'
+    if drop:
+        # Renumber so that the first frame numbers of every minute except each tenth are skipped
+        dropped = _dropped_frames_per_minute(fps)
+        frames_per_minute = base * 60 - dropped
+        frames_per_ten_minutes = int(round(fps * 600))
+        tens, remainder = divmod(frame_number, frames_per_ten_minutes)
+        frame_number += dropped * 9 * tens
+        if remainder > dropped:
+            frame_number += dropped * ((remainder - dropped) // frames_per_minute)
+        separator = ';'
+    frames = frame_number % base
+    seconds = frame_number // base
+    return f"{seconds // 3600 % 24:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}{separator}{frames:02d}"
+
+
+def frame_name_width(frame_total: int) -> int:
+    """Digits needed to number `frame_total` outputs; at least 4 so short runs keep their names."""
+    return max(4, len(str(max(0, frame_total - 1))))
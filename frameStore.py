@@ -0,0 +1,203 @@
+"""
+Single-container frame stores, as an alternative to thousands of loose images.
+
+Two backends:
+
+- "tar":   encoded images (PNG/JPEG) appended to one tar file, with a sidecar
+           `<name>.tar.index.json` holding each member's byte offset
+- "array": raw BGR frames in fixed-size chunks of memory-mapped .npy files
+           (`chunk_00000.npy`, ...) inside one directory, plus `index.json`
+
+Both carry a per-frame index of frame number, PTS seconds and SMPTE timecode,
+and readers fetch frame `i` with one seek, without listing any directory.
+
+    with create_frame_store("match.tar", "tar", fps=25) as store:
+        store.append(frame_number, frame)
+
+    store = open_frame_store("match.tar")
+    frame = store[42]
+"""
+import io
+import json
+import tarfile
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from frameSampling import frames_to_timecode
+
+TAR_INDEX_SUFFIX = ".index.json"
+ARRAY_INDEX_NAME = "index.json"
+
+
+def _index_entry(frame_number: int, fps: float, pts: Optional[float] = None) -> Dict:
+    if pts is None and fps:
+        pts = frame_number / fps
+    return {
+        "frame_number": frame_number,
+        "pts": round(pts, 6) if pts is not None else None,
+        "timecode": frames_to_timecode(frame_number, fps) if fps else None
+    }
+
+
+class TarFrameStoreWriter:
+    """Append encoded frames to one tar file through a large sequential write buffer."""
+
+    def __init__(self, path: str, fps: float, image_format: str = "png",
+                 params: Optional[List[int]] = None, buffer_bytes: int = 8 * 1024 * 1024):
+        self.path = Path(path)
+        self.fps = fps
+        self.image_format = image_format
+        self.params = params or []
+        self._file = open(self.path, "wb", buffering=buffer_bytes)
+        self._tar = tarfile.open(fileobj=self._file, mode="w", format=tarfile.USTAR_FORMAT)
+        self.index: List[Dict] = []
+
+    def append(self, frame_number: int, frame: np.ndarray, pts: Optional[float] = None) -> None:
+        ok, encoded = cv2.imencode(f".{self.image_format}", frame, self.params)
+        if not ok:
+            raise IOError(f"Could not encode frame {frame_number}")
+        self.append_encoded(frame_number, encoded.tobytes(), pts)
+
+    def append_encoded(self, frame_number: int, data: bytes, pts: Optional[float] = None) -> None:
+        """Append an already encoded image (see frameWriter.encode_frames); `pts` defaults to frame_number / fps."""
+        info = tarfile.TarInfo(f"frame_{frame_number:08d}.{self.image_format}")
+        info.size = len(data)
+        header_size = len(info.tobuf(self._tar.format, self._tar.encoding, self._tar.errors))
+        entry = _index_entry(frame_number, self.fps, pts)
+        entry.update(offset=self._tar.offset + header_size, size=len(data))
+        self._tar.addfile(info, io.BytesIO(data))
+        self.index.append(entry)
+
+    def close(self) -> None:
+        self._tar.close()
+        self._file.close()
+        with open(str(self.path) + TAR_INDEX_SUFFIX, "w") as f:
+            json.dump({"backend": "tar", "fps": self.fps, "format": self.image_format,
+                       "frames": self.index}, f)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ArrayFrameStoreWriter:
+    """Copy raw frames into chunked memory-mapped .npy files; no encoding cost."""
+
+    def __init__(self, path: str, fps: float, chunk_size: int = 256):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.fps = fps
+        self.chunk_size = chunk_size
+        self._chunk: Optional[np.memmap] = None
+        self._chunk_number = -1
+        self._chunk_fill = 0
+        self._shape = None
+        self.index: List[Dict] = []
+
+    def _next_chunk(self) -> None:
+        self._flush_chunk()
+        self._chunk_number += 1
+        self._chunk = np.lib.format.open_memmap(
+            self.path / f"chunk_{self._chunk_number:05d}.npy", mode="w+",
+            dtype=np.uint8, shape=(self.chunk_size,) + self._shape)
+        self._chunk_fill = 0
+
+    def _flush_chunk(self) -> None:
+        if self._chunk is not None:
+            self._chunk.flush()
+            self._chunk = None
+
+    def append(self, frame_number: int, frame: np.ndarray, pts: Optional[float] = None) -> None:
+        if self._shape is None:
+            self._shape = frame.shape
+        elif frame.shape != self._shape:
+            raise ValueError(f"Frame {frame_number} has shape {frame.shape}, store expects {self._shape}")
+        if self._chunk is None or self._chunk_fill == self.chunk_size:
+            self._next_chunk()
+        self._chunk[self._chunk_fill] = frame
+        entry = _index_entry(frame_number, self.fps, pts)
+        entry.update(chunk=self._chunk_number, slot=self._chunk_fill)
+        self.index.append(entry)
+        self._chunk_fill += 1
+
+    def close(self) -> None:
+        self._flush_chunk()
+        with open(self.path / ARRAY_INDEX_NAME, "w") as f:
+            json.dump({"backend": "array", "fps": self.fps, "chunk_size": self.chunk_size,
+                       "shape": list(self._shape) if self._shape else None,
+                       "frames": self.index}, f)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def create_frame_store(path: str, backend: str, fps: float, image_format: str = "png",
+                       params: Optional[List[int]] = None, chunk_size: int = 256):
+    if backend == "tar":
+        return TarFrameStoreWriter(path, fps, image_format, params)
+    if backend == "array":
+        return ArrayFrameStoreWriter(path, fps, chunk_size)
+    raise ValueError(f"Unknown frame store backend: {backend}")
+
+
+class FrameStore:
+    """
+    Read-only access to a frame store by position (`store[i]`) or by source
+    frame number (`store.get_frame(n)`); `store.index` holds the per-frame records.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        if self.path.is_dir():
+            with open(self.path / ARRAY_INDEX_NAME) as f:
+                meta = json.load(f)
+        else:
+            with open(str(self.path) + TAR_INDEX_SUFFIX) as f:
+                meta = json.load(f)
+        self.backend = meta["backend"]
+        self.fps = meta["fps"]
+        self.index: List[Dict] = meta["frames"]
+        self._by_frame_number = {entry["frame_number"]: i for i, entry in enumerate(self.index)}
+        self._chunks: Dict[int, np.ndarray] = {}
+        self._file = open(self.path, "rb") if self.backend == "tar" else None
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __getitem__(self, position: int) -> np.ndarray:
+        entry = self.index[position]
+        if self.backend == "tar":
+            self._file.seek(entry["offset"])
+            data = self._file.read(entry["size"])
+            return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+        chunk = self._chunks.get(entry["chunk"])
+        if chunk is None:
+            chunk = np.load(self.path / f"chunk_{entry['chunk']:05d}.npy", mmap_mode="r")
+            self._chunks[entry["chunk"]] = chunk
+        return chunk[entry["slot"]]
+
+    def get_frame(self, frame_number: int) -> np.ndarray:
+        return self[self._by_frame_number[frame_number]]
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+        self._chunks.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_frame_store(path: str) -> FrameStore:
+    return FrameStore(path)
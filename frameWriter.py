@@ -0,0 +1,142 @@
+"""
+Pipelined image writing for the frame extraction tools.
+
+Encoding PNG/JPEG is slower than decoding, so frames are handed from the
+decoding thread to a pool of writer threads through a bounded queue.
+cv2.imwrite releases the GIL, so the writers run in parallel on all cores,
+and memory stays bounded by the queue depth.
+"""
+import os
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+_STOP = object()
+
+
+def image_params(image_format: str, png_compression: Optional[int] = None,
+                 jpeg_quality: Optional[int] = None) -> List[int]:
+    """cv2.imwrite parameters for the chosen format; None keeps OpenCV's default."""
+    if image_format == "png" and png_compression is not None:
+        return [cv2.IMWRITE_PNG_COMPRESSION, int(png_compression)]
+    if image_format in ("jpg", "jpeg") and jpeg_quality is not None:
+        return [cv2.IMWRITE_JPEG_QUALITY, int(jpeg_quality)]
+    return []
+
+
+def default_workers() -> int:
+    return os.cpu_count() or 1
+
+
+def write_frames(frames: Iterable[Tuple[int, np.ndarray]],
+                 output_path_for: Callable[[int, int], Path],
+                 workers: Optional[int] = None, queue_depth: Optional[int] = None,
+                 params: Optional[List[int]] = None,
+                 release: Optional[Callable[[np.ndarray], None]] = None) -> List[Tuple[int, Path]]:
+    """
+    Decode on the calling thread and encode on a writer pool.
+
+    Args:
+        frames: Iterable of (frame_index, bgr_frame), consumed on this thread
+        output_path_for: Maps (sequence_number, frame_index) to the output file
+        workers: Number of writer threads (default: one per core)
+        queue_depth: Frames allowed in flight (default: 2 per writer)
+        params: cv2.imwrite parameters
+        release: Called with each frame once its writer is done with it (e.g.
+            FramePool.release), in whatever order the writers finish
+
+    Returns (frame_index, output_path) for every written frame, in frame order.
+    """
+    workers = max(1, workers or default_workers())
+    queue_depth = max(1, queue_depth or 2 * workers)
+    params = params or []
+
+    pending: "queue.Queue" = queue.Queue(maxsize=queue_depth)
+    written: List[Tuple[int, int, Path]] = []
+    written_lock = threading.Lock()
+    errors: List[BaseException] = []
+
+    def writer():
+        while True:
+            item = pending.get()
+            if item is _STOP:
+                return
+            sequence, frame_index, frame = item
+            try:
+                if errors:
+                    continue  # drain the queue so the decoder is not blocked
+                path = output_path_for(sequence, frame_index)
+                if not cv2.imwrite(str(path), frame, params):
+                    raise IOError(f"Could not write {path}")
+            except BaseException as e:
+                errors.append(e)
+                continue
+            finally:
+                if release is not None:
+                    release(frame)
+            with written_lock:
+                written.append((sequence, frame_index, path))
+
+    threads = [threading.Thread(target=writer, daemon=True) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+
+    try:
+        for sequence, (frame_index, frame) in enumerate(frames):
+            if errors:
+                break
+            pending.put((sequence, frame_index, frame))
+    finally:
+        for _ in threads:
+            pending.put(_STOP)
+        for thread in threads:
+            thread.join()
+
+    if errors:
+        raise errors[0]
+    written.sort()
+    return [(frame_index, path) for _, frame_index, path in written]
+
+
+def encode_frames(frames: Iterable[Tuple[int, np.ndarray]], image_format: str = "png",
+                  params: Optional[List[int]] = None, workers: Optional[int] = None,
+                  queue_depth: Optional[int] = None,
+                  release: Optional[Callable[[np.ndarray], None]] = None) -> Iterator[Tuple[int, bytes]]:
+    """
+    Encode frames on a thread pool and yield (frame_index, encoded_bytes) in input order.
+
+    At most `queue_depth` frames are being encoded at once, which bounds memory.
+    Encodes finish out of order; `release` (e.g. FramePool.release) is called
+    with each frame as soon as it has been encoded.
+    """
+    workers = max(1, workers or default_workers())
+    queue_depth = max(1, queue_depth or 2 * workers)
+    extension = f".{image_format}"
+    params = params or []
+
+    def encode(frame):
+        try:
+            ok, encoded = cv2.imencode(extension, frame, params)
+        finally:
+            if release is not None:
+                release(frame)
+        if not ok:
+            raise IOError(f"Could not encode frame as {image_format}")
+        return encoded.tobytes()
+
+    in_flight = deque()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for frame_index, frame in frames:
+            in_flight.append((frame_index, pool.submit(encode, frame)))
+            if len(in_flight) >= queue_depth:
+                done_index, future = in_flight.popleft()
+                yield done_index, future.result()
+        while in_flight:
+            done_index, future = in_flight.popleft()
+            yield done_index, future.result()
@@ -86,20 +86,28 @@ def extract_faces(video_path: str, output_folder: str, max_faces: int = 30, imag
         except:
             pass
 
+    # Decode and colour-convert into buffers reused for every batch
+    bgr = None
+    rgb_buffers = [None] * batch_size
+
     print("First pass: Identifying unique faces...")
     while True:
         frames = []
         frame_numbers = []
-        for _ in range(batch_size):
-            # Skip frames to achieve desired sampling rate
+        for slot in range(batch_size):
+            # Skip frames to achieve desired sampling rate; only the sampled one is converted
             for _ in range(frame_interval):
-                ret, frame = video.read()
+                ret = video.grab()
                 if not ret:
                     break
                 processed_frames += 1
             if not ret:
                 break
-            frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+            ret, bgr = video.retrieve(bgr)
+            if not ret:
+                break
+            rgb_buffers[slot] = cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB, dst=rgb_buffers[slot])
+            frames.append(rgb_buffers[slot])
             frame_numbers.append(processed_frames)
 
         if not frames:
@@ -124,7 +132,8 @@ def extract_faces(video_path: str, output_folder: str, max_faces: int = 30, imag
                 if confidence < 0.95:
                     continue
                     
-                face_img = frames[i][y:y+h, x:x+w]
+                # Copy, since the frame buffer is reused for the next batch
+                face_img = frames[i][y:y+h, x:x+w].copy()
                 
                 # Check face quality with comprehensive metrics
                 quality_score, quality_metrics = get_face_quality(face_img, quality_analyzer)
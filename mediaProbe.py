@@ -0,0 +1,263 @@
+"""
+One cached ffprobe call per media file.
+
+probe(path) runs `ffprobe -print_format json -show_format -show_streams` once
+and returns a MediaInfo with the streams, frame rate, duration, start
+timecode and audio tracks. Results are cached in memory and on disk (one JSON
+file per media file under MEDIA_PROBE_CACHE, default
+~/.cache/video-tools/mediaProbe), keyed by absolute path, size and mtime, so
+repeated tool runs on the same media skip the subprocess until the file
+changes.
+
+Usage: python mediaProbe.py <media> [<media> ...] [--json] [--no-cache]
+"""
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+CACHE_DIR = Path(os.environ.get("MEDIA_PROBE_CACHE", Path.home() / ".cache" / "video-tools" / "mediaProbe"))
+CACHE_VERSION = 1
+
+_memory_cache: Dict[Tuple[str, int, int], "MediaInfo"] = {}
+
+
+def parse_rate(rate: Optional[str]) -> float:
+    """ffprobe rational ("30000/1001") to float; 0.0 when missing or undefined."""
+    if not rate:
+        return 0.0
+    num, _, denom = str(rate).partition('/')
+    try:
+        return float(num) / float(denom or 1)
+    except (ValueError, ZeroDivisionError):
+        return 0.0
+
+
+def _float(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _int(value: Any) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass
+class StreamInfo:
+    index: int
+    codec_type: str
+    codec_name: Optional[str] = None
+    duration: Optional[float] = None
+    bit_rate: Optional[int] = None
+    # video
+    width: Optional[int] = None
+    height: Optional[int] = None
+    pix_fmt: Optional[str] = None
+    frame_rate: float = 0.0
+    avg_frame_rate: float = 0.0
+    frame_count: Optional[int] = None
+    # audio
+    sample_rate: Optional[int] = None
+    channels: Optional[int] = None
+    channel_layout: Optional[str] = None
+    language: Optional[str] = None
+    timecode: Optional[str] = None
+    tags: Dict[str, str] = field(default_factory=dict)
+
+    @classmethod
+    def from_ffprobe(cls, stream: Dict[str, Any]) -> "StreamInfo":
+        tags = stream.get("tags", {})
+        return cls(
+            index=stream.get("index", 0),
+            codec_type=stream.get("codec_type", "unknown"),
+            codec_name=stream.get("codec_name"),
+            duration=_float(stream.get("duration")),
+            bit_rate=_int(stream.get("bit_rate")),
+            width=_int(stream.get("width")),
+            height=_int(stream.get("height")),
+            pix_fmt=stream.get("pix_fmt"),
+            frame_rate=parse_rate(stream.get("r_frame_rate")),
+            avg_frame_rate=parse_rate(stream.get("avg_frame_rate")),
+            frame_count=_int(stream.get("nb_frames")),
+            sample_rate=_int(stream.get("sample_rate")),
+            channels=_int(stream.get("channels")),
+            channel_layout=stream.get("channel_layout"),
+            language=tags.get("language"),
+            timecode=tags.get("timecode"),
+            tags=tags
+        )
+
+
+@dataclass
+class MediaInfo:
+    path: str
+    format_name: Optional[str]
+    duration: Optional[float]
+    size: Optional[int]
+    bit_rate: Optional[int]
+    start_time: Optional[float]
+    streams: List[StreamInfo]
+    tags: Dict[str, str] = field(default_factory=dict)
+    # Anything ffprobe reported at -v error; non-empty for damaged files
+    errors: str = ""
+
+    @property
+    def video(self) -> Optional[StreamInfo]:
+        """The first video stream (attached cover art is skipped)."""
+        for stream in self.streams:
+            if stream.codec_type == "video" and stream.tags.get("mimetype") is None and stream.frame_rate > 0:
+                return stream
+        return next((s for s in self.streams if s.codec_type == "video"), None)
+
+    @property
+    def audio_tracks(self) -> List[StreamInfo]:
+        return [stream for stream in self.streams if stream.codec_type == "audio"]
+
+    @property
+    def frame_rate(self) -> float:
+        video = self.video
+        if video is None:
+            return 0.0
+        return video.frame_rate or video.avg_frame_rate
+
+    @property
+    def frame_count(self) -> int:
+        """Frame count from the container, or estimated from duration and frame rate."""
+        video = self.video
+        if video is not None and video.frame_count:
+            return video.frame_count
+        duration = (video.duration if video is not None else None) or self.duration or 0.0
+        return int(duration * self.frame_rate)
+
+    @property
+    def timecode(self) -> Optional[str]:
+        """Start timecode from the container or any stream (MOV/MXF timecode tracks)."""
+        if self.tags.get("timecode"):
+            return self.tags["timecode"]
+        return next((s.timecode for s in self.streams if s.timecode), None)
+
+    @classmethod
+    def from_ffprobe(cls, path: str, data: Dict[str, Any], errors: str = "") -> "MediaInfo":
+        fmt = data.get("format", {})
+        return cls(
+            path=path,
+            format_name=fmt.get("format_name"),
+            duration=_float(fmt.get("duration")),
+            size=_int(fmt.get("size")),
+            bit_rate=_int(fmt.get("bit_rate")),
+            start_time=_float(fmt.get("start_time")),
+            streams=[StreamInfo.from_ffprobe(stream) for stream in data.get("streams", [])],
+            tags=fmt.get("tags", {}),
+            errors=errors
+        )
+
+
+def _cache_key(path: str) -> Tuple[str, int, int]:
+    stat = os.stat(path)
+    return os.path.abspath(path), stat.st_size, stat.st_mtime_ns
+
+
+def _cache_file(key: Tuple[str, int, int]) -> Path:
+    return CACHE_DIR / (hashlib.sha1(key[0].encode("utf-8")).hexdigest() + ".json")
+
+
+def _read_disk_cache(key: Tuple[str, int, int]) -> Optional[MediaInfo]:
+    try:
+        with open(_cache_file(key)) as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if cached.get("version") != CACHE_VERSION or cached.get("key") != list(key):
+        return None
+    return MediaInfo.from_ffprobe(key[0], cached["ffprobe"], cached.get("errors", ""))
+
+
+def _write_disk_cache(key: Tuple[str, int, int], data: Dict[str, Any], errors: str) -> None:
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp_path = _cache_file(key).with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"version": CACHE_VERSION, "key": list(key), "ffprobe": data, "errors": errors}, f)
+        os.replace(tmp_path, _cache_file(key))
+    except OSError:
+        pass  # the cache is an optimisation only
+
+
+def probe(path: str, use_cache: bool = True) -> MediaInfo:
+    """
+    Probe a media file, from the memory or disk cache when the file is unchanged.
+
+    Raises FileNotFoundError for missing files and ValueError when ffprobe
+    cannot read the file at all.
+    """
+    key = _cache_key(path)
+    if use_cache:
+        info = _memory_cache.get(key) or _read_disk_cache(key)
+        if info is not None:
+            _memory_cache[key] = info
+            return info
+
+    cmd = ['ffprobe', '-v', 'error', '-print_format', 'json', '-show_format', '-show_streams', path]
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    try:
+        data = json.loads(result.stdout or "{}")
+    except ValueError:
+        data = {}
+    if result.returncode != 0 or not data.get("streams"):
+        raise ValueError(f"Could not probe {path}: {result.stderr.strip() or 'no streams found'}")
+
+    errors = result.stderr.strip()
+    info = MediaInfo.from_ffprobe(key[0], data, errors)
+    _memory_cache[key] = info
+    if use_cache:
+        _write_disk_cache(key, data, errors)
+    return info
+
+
+def describe(info: MediaInfo) -> str:
+    lines = [f"{info.path}",
+             f"  format: {info.format_name}, duration: {info.duration}s, bit rate: {info.bit_rate}"]
+    if info.timecode:
+        lines.append(f"  start timecode: {info.timecode}")
+    for stream in info.streams:
+        if stream.codec_type == "video":
+            detail = f"{stream.width}x{stream.height} {stream.pix_fmt}, {stream.frame_rate:.3f} fps"
+        elif stream.codec_type == "audio":
+            detail = f"{stream.channels} ch {stream.channel_layout or ''} {stream.sample_rate} Hz".replace("  ", " ")
+        else:
+            detail = ""
+        language = f"[{stream.language}]" if stream.language else ""
+        parts = [f"  #{stream.index} {stream.codec_type}:", stream.codec_name or "", detail, language]
+        lines.append(" ".join(part for part in parts if part))
+    if info.errors:
+        lines.append(f"  errors: {info.errors}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Probe media files with a cached ffprobe call.")
+    parser.add_argument("paths", nargs="+", help="Media files to probe")
+    parser.add_argument("--json", action="store_true", help="Print the full probe result as JSON")
+    parser.add_argument("--no-cache", action="store_true", help="Always run ffprobe")
+    args = parser.parse_args()
+
+    for path in args.paths:
+        try:
+            info = probe(path, use_cache=not args.no_cache)
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}")
+            continue
+        print(json.dumps(asdict(info), indent=2) if args.json else describe(info))
+
+
+if __name__ == "__main__":
+    main()
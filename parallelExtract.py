@@ -0,0 +1,104 @@
+"""
+Parallel segmented frame extraction for long videos.
+
+The keyframe layout comes from the packet-scan seek index (no decoding), the
+timeline is split into N keyframe-aligned ranges, and each range is decoded
+by its own process starting at its keyframe. Every process writes the frames
+of its range under their global sequence numbers, so the output is identical
+to a serial run.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+import cv2
+
+from frameDedupe import dhash
+from frameSampling import VideoInfo
+from seekIndex import load_seek_index
+
+
+def split_ranges(frame_count: int, segments: int,
+                 keyframe_indices: Optional[List[int]] = None) -> List[Tuple[int, int]]:
+    """
+    Split [0, frame_count) into up to `segments` [start, end) ranges.
+    Boundaries are snapped to the nearest keyframe when keyframes are known.
+    """
+    boundaries = {0, frame_count}
+    for i in range(1, segments):
+        ideal = frame_count * i // segments
+        if keyframe_indices:
+            ideal = min(keyframe_indices, key=lambda k: abs(k - ideal))
+        if 0 < ideal < frame_count:
+            boundaries.add(ideal)
+    boundaries = sorted(boundaries)
+    return list(zip(boundaries, boundaries[1:]))
+
+
+def _extract_range(video_path: str, start: int, jobs: List[Tuple[int, str]],
+                   params: List[int]) -> Dict[int, int]:
+    """
+    Decode from `start` and write each (frame_index, output_path) job; runs in a worker process.
+    Returns the dHash of every written frame, for the frame index.
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError(f"Could not open video file {video_path}")
+    if start > 0:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+    position = start
+    written = {}
+    frame = None  # decode buffer, reused for every frame
+    try:
+        for frame_index, output_path in jobs:
+            for _ in range(frame_index - position):
+                if not cap.grab():
+                    return written
+            ret, frame = cap.read(frame)
+            if not ret:
+                return written
+            position = frame_index + 1
+            cv2.imwrite(output_path, frame, params)
+            written[frame_index] = dhash(frame)
+    finally:
+        cap.release()
+    return written
+
+
+def extract_parallel(video_path: str, info: VideoInfo, indices: List[int],
+                     output_path_for: Callable[[int, int], str], segments: Optional[int] = None,
+                     params: Optional[List[int]] = None) -> Dict[int, int]:
+    """
+    Write the frames at `indices` using `segments` decoder processes (default: one per core).
+
+    `output_path_for(sequence, frame_index)` is evaluated here, with the same
+    global sequence numbers a serial run uses. Returns {frame_index: dhash} for every
+    frame written, computed in the workers as a serial run computes it while decoding.
+    """
+    segments = max(1, segments or os.cpu_count() or 1)
+    try:
+        seek_index = load_seek_index(video_path)
+        keyframe_indices = seek_index.keyframe_frames
+        frame_count = seek_index.frame_count or info.frame_count
+    except (OSError, RuntimeError) as e:
+        print(f"Warning: could not probe keyframes ({e}); splitting without keyframe alignment")
+        keyframe_indices = None
+        frame_count = info.frame_count
+
+    ranges = split_ranges(frame_count, segments, keyframe_indices)
+    jobs_by_range = [[] for _ in ranges]
+    range_number = 0
+    for sequence, frame_index in enumerate(indices):
+        while frame_index >= ranges[range_number][1] and range_number < len(ranges) - 1:
+            range_number += 1
+        jobs_by_range[range_number].append((frame_index, str(output_path_for(sequence, frame_index))))
+
+    with ProcessPoolExecutor(max_workers=len(ranges)) as pool:
+        futures = [
+            pool.submit(_extract_range, video_path, start, jobs, params or [])
+            for (start, _), jobs in zip(ranges, jobs_by_range) if jobs
+        ]
+        dhashes = {}
+        for future in futures:
+            dhashes.update(future.result())
+        return dhashes
@@ -0,0 +1,147 @@
+"""
+Packet-scan seek index for sparse frame grabs.
+
+One ffprobe pass reads the video packets without decoding them and records
+the exact frame count and, for every keyframe, its frame number, PTS and
+byte offset. The result is cached in a sidecar file next to the video
+(`<video>.seekindex.json`) and reused until the video's size or mtime
+changes. Build indexes ahead of time with:
+
+    python seekIndex.py <video> [<video> ...] [--rebuild]
+
+With the index, frame grabs know the keyframe at or before every target: a
+target inside the GOP the decoder is already in is reached by decoding
+forward, and a seek is only issued when it saves work. Frame counts come
+from the packets instead of the container's estimate.
+"""
+import argparse
+import bisect
+import json
+import os
+import subprocess
+from typing import List, NamedTuple, Optional
+
+SIDECAR_SUFFIX = ".seekindex.json"
+INDEX_VERSION = 1
+
+
+class SeekIndex(NamedTuple):
+    fps: float
+    frame_count: int
+    start_pts: float
+    keyframe_frames: List[int]
+    keyframe_pts: List[float]
+    keyframe_pos: List[int]
+
+    def keyframe_for(self, frame_index: int) -> int:
+        """Frame number of the keyframe at or before `frame_index`."""
+        position = bisect.bisect_right(self.keyframe_frames, frame_index) - 1
+        return self.keyframe_frames[position] if position >= 0 else 0
+
+
+def sidecar_path(video_path: str) -> str:
+    return video_path + SIDECAR_SUFFIX
+
+
+def _parse_rate(rate: str) -> float:
+    num, _, denom = rate.partition('/')
+    try:
+        return float(num) / float(denom or 1)
+    except (ValueError, ZeroDivisionError):
+        return 0.0
+
+
+def build_seek_index(video_path: str) -> SeekIndex:
+    """Scan the packets of the first video stream (no decoding) into a SeekIndex."""
+    cmd = [
+        'ffprobe', '-v', 'error', '-select_streams', 'v:0',
+        '-show_entries', 'stream=r_frame_rate:packet=pts_time,dts_time,pos,flags',
+        '-of', 'csv', video_path
+    ]
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffprobe failed: {result.stderr.strip()}")
+
+    fps = 0.0
+    packets = []  # (pts, pos, is_key) in decode order
+    for line in result.stdout.splitlines():
+        fields = line.split(',')
+        if fields[0] == 'stream':
+            fps = _parse_rate(fields[1])
+        elif fields[0] == 'packet' and len(fields) >= 5:
+            pts_time, dts_time, pos, flags = fields[1:5]
+            time = pts_time if pts_time not in ('', 'N/A') else dts_time
+            packets.append((
+                float(time) if time not in ('', 'N/A') else None,
+                int(pos) if pos not in ('', 'N/A') else -1,
+                'K' in flags
+            ))
+
+    # Frame numbers follow presentation order; packets without timestamps keep decode order
+    if all(pts is not None for pts, _, _ in packets):
+        order = sorted(range(len(packets)), key=lambda i: packets[i][0])
+    else:
+        order = list(range(len(packets)))
+    keyframe_frames, keyframe_pts, keyframe_pos = [], [], []
+    for frame_number, packet_number in enumerate(order):
+        pts, pos, is_key = packets[packet_number]
+        if is_key:
+            keyframe_frames.append(frame_number)
+            keyframe_pts.append(pts if pts is not None else frame_number / fps if fps else 0.0)
+            keyframe_pos.append(pos)
+
+    start_pts = packets[order[0]][0] if packets and packets[order[0]][0] is not None else 0.0
+    return SeekIndex(fps=fps, frame_count=len(packets), start_pts=start_pts,
+                     keyframe_frames=keyframe_frames, keyframe_pts=keyframe_pts,
+                     keyframe_pos=keyframe_pos)
+
+
+def cached_seek_index(video_path: str) -> Optional[SeekIndex]:
+    """The sidecar index if it exists and still matches the video, else None."""
+    path = sidecar_path(video_path)
+    try:
+        with open(path) as f:
+            data = json.load(f)
+        stat = os.stat(video_path)
+    except (OSError, ValueError):
+        return None
+    if (data.get("version") != INDEX_VERSION or data.get("size") != stat.st_size
+            or data.get("mtime") != stat.st_mtime):
+        return None
+    return SeekIndex(**data["index"])
+
+
+def load_seek_index(video_path: str, rebuild: bool = False) -> SeekIndex:
+    """Return the cached seek index, building and caching it when missing or stale."""
+    if not rebuild:
+        index = cached_seek_index(video_path)
+        if index is not None:
+            return index
+    index = build_seek_index(video_path)
+    stat = os.stat(video_path)
+    try:
+        with open(sidecar_path(video_path), "w") as f:
+            json.dump({"version": INDEX_VERSION, "size": stat.st_size, "mtime": stat.st_mtime,
+                       "index": index._asdict()}, f)
+    except OSError as e:
+        print(f"Warning: could not cache seek index next to {video_path}: {e}")
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build packet-scan seek indexes for videos.")
+    parser.add_argument("videos", nargs="+", help="Video files to index")
+    parser.add_argument("--rebuild", action="store_true", help="Rescan even when a current index is cached")
+    args = parser.parse_args()
+
+    for video_path in args.videos:
+        try:
+            index = load_seek_index(video_path, rebuild=args.rebuild)
+        except (OSError, RuntimeError) as e:
+            print(f"Error: {video_path}: {e}")
+            continue
+        print(f"{video_path}: {index.frame_count} frames, {len(index.keyframe_frames)} keyframes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import subprocess
+
+import pytest
+
+from compressVideo import SAMPLE_CRFS, plan_chunks, predict_crf, sample_plan, sample_starts
+
+
+def make_clip(path, seconds):
+    subprocess.run(['ffmpeg', '-v', 'error', '-y', '-f', 'lavfi', '-i', 'testsrc2=size=160x90:rate=25',
+                    '-t', str(seconds), '-c:v', 'libx264', '-preset', 'ultrafast', str(path)], check=True)
+    return str(path)
+
+def test_sample_plan_skips_short_files_and_scales_with_duration():
+    assert sample_plan(40) is None
+    short, long = sample_plan(90), sample_plan(3600)
+    assert short == (3, 1.0)
+    assert long == (8, 4.0)
+    for duration in (90, 300, 3600):
+        samples, seconds = sample_plan(duration)
+        assert len(SAMPLE_CRFS) * samples * seconds <= 0.25 * duration
+
+def test_sample_starts_are_evenly_spaced_inside_the_file():
+    starts = sample_starts(100, 4, 2.0)
+    assert starts == pytest.approx([11.5, 36.5, 61.5, 86.5])
+    assert sample_starts(5, 3, 2.0) == [0.0]
+
+def test_predict_crf_skips_short_files(tmp_path):
+    assert predict_crf(make_clip(tmp_path / "short.mp4", 4), 500000) == (None, False)
+
+def test_predict_crf_lands_between_the_sampled_crfs(tmp_path):
+    clip = make_clip(tmp_path / "clip.mp4", 8)
+    low, low_in_range = predict_crf(clip, 2000000, samples=2, sample_seconds=1.0,
+                                    preset='ultrafast', probe_preset='ultrafast')
+    high, _ = predict_crf(clip, 200000, samples=2, sample_seconds=1.0, preset='veryfast', probe_preset='ultrafast')
+    assert low < high
+    assert 0.0 <= low <= 51.0 and 0.0 <= high <= 51.0
+    assert isinstance(low_in_range, bool)
+
+def test_plan_chunks_splits_on_the_keyframes_nearest_an_even_split():
+    assert plan_chunks(100, [0, 25, 50, 75], 4) == [(0, 25), (25, 50), (50, 75), (75, 100)]
+    assert plan_chunks(250, range(0, 250, 12), 4) == [(0, 60), (60, 120), (120, 192), (192, 250)]
+    assert plan_chunks(100, [0, 25, 50, 75], 1) == [(0, 100)]
+
+def test_plan_chunks_boundaries_without_enough_keyframes():
+    # Fewer keyframes than chunks: fewer, longer segments rather than splits between keyframes
+    assert plan_chunks(100, [0, 60], 4) == [(0, 60), (60, 100)]
+    assert plan_chunks(100, [], 3) == [(0, 100)]
+    # Keyframes at frame 0 or past the end never start a segment; every segment is non-empty
+    ranges = plan_chunks(100, [0, 10, 12, 90, 150], 3)
+    assert ranges == [(0, 12), (12, 90), (90, 100)]
+    assert all(start < end for start, end in ranges)
+    assert [end for _, end in ranges[:-1]] == [start for start, _ in ranges[1:]]
@@ -0,0 +1,201 @@
+import json
+import tarfile
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+
+from faceDetectionTools import batch_sizer
+from faceDetectionTools.batch_sizer import AdaptiveBatchSizer
+from faceDetectionTools.coarse_pass import build_face_timeline, timeline_to_windows
+from faceDetectionTools.identity_registry import IdentityRegistry
+from faceDetectionTools.scene_sampler import SceneChangeSampler
+from faceDetectionTools.shard_writer import TarShardWriter, read_sample
+from faceDetectionTools.sample_selection import select_diverse_samples
+
+def unit(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+def test_identity_registry_round_trip(tmp_path):
+    rng = np.random.default_rng(0)
+    people = [unit(rng.normal(size=128)) for _ in range(3)]
+
+    with IdentityRegistry(str(tmp_path)) as registry:
+        ids = [registry.add(person, source="a.mp4") for person in people]
+        registry.update(ids[1], people[1], source="b.mp4")
+
+    with IdentityRegistry(str(tmp_path)) as registry:
+        assert registry.size == 3
+        matched, distances = registry.match(np.stack(people))
+        assert matched.tolist() == ids
+        assert np.allclose(distances, 0.0, atol=1e-5)
+
+def test_identity_registry_matches_a_batch_like_single_queries():
+    rng = np.random.default_rng(1)
+    registry = IdentityRegistry()
+    for _ in range(5):
+        registry.add(unit(rng.normal(size=128)))
+    queries = rng.normal(size=(7, 128)).astype(np.float32)
+
+    ids, distances = registry.match(queries)
+    for query, face_id, distance in zip(queries, ids, distances):
+        single_ids, single_distances = registry.match(query)
+        assert single_ids[0] == face_id
+        assert np.isclose(single_distances[0], distance)
+    registry.close()
+
+def test_identity_registry_empty_match():
+    registry = IdentityRegistry()
+    ids, distances = registry.match(np.ones((2, 128), dtype=np.float32))
+    assert ids.tolist() == [-1, -1]
+    assert np.isinf(distances).all()
+    registry.close()
+
+def test_identity_registry_match_from_row_sees_only_newer_identities():
+    rng = np.random.default_rng(2)
+    registry = IdentityRegistry()
+    old_person = unit(rng.normal(size=128))
+    old = registry.add(old_person)
+    first_row = registry.size
+    assert registry.match(np.ones(128, dtype=np.float32), first_row=first_row)[0].tolist() == [-1]
+
+    person = unit(rng.normal(size=128))
+    new = registry.add(person)
+    ids, distances = registry.match(np.stack([person, old_person]), first_row=first_row)
+    assert ids.tolist() == [new, new]
+    assert np.isclose(distances[0], 0.0, atol=1e-5)
+    assert registry.match(old_person)[0].tolist() == [old]
+    registry.close()
+
+def fake_memory(monkeypatch, percent=40.0, available=8 * 1024 ** 3):
+    monkeypatch.setattr(batch_sizer.psutil, "virtual_memory",
+                        lambda: SimpleNamespace(percent=percent, available=available))
+
+def test_batch_sizer_grows_to_the_cap_and_stops_when_gains_end(monkeypatch):
+    fake_memory(monkeypatch)
+    sizer = AdaptiveBatchSizer(initial_batch_size=2, max_batch_size=8, probe_batches=10)
+    # Throughput scales linearly: doubling always pays, but never past max_batch_size
+    sizes = [sizer.batch_size]
+    for _ in range(4):
+        sizes.append(sizer.record(sizer.batch_size, 0.1, frame_bytes=1000))
+    assert sizes == [2, 4, 8, 8, 8]
+    assert sizer.batch_size <= sizer.max_batch_size
+
+    flat = AdaptiveBatchSizer(initial_batch_size=2, max_batch_size=32)
+    flat.record(2, 0.2)
+    assert flat.record(4, 0.4) == 2  # no throughput gain at 4: lock in 2
+    assert flat.converged and flat.chosen_batch_size == 2
+    assert flat.record(7, 0.1) == 2  # converged sizes ignore later measurements
+
+def test_batch_sizer_respects_memory_limits(monkeypatch):
+    fake_memory(monkeypatch, available=1000 * 4 * 4 * 2 - 1)
+    sizer = AdaptiveBatchSizer(initial_batch_size=2, max_batch_size=32)
+    # The next size (4 frames x 1000 bytes x pyramid overhead) needs more than half the free memory
+    assert sizer.record(2, 0.1, frame_bytes=1000) == 2
+    assert sizer.converged
+
+    fake_memory(monkeypatch, percent=95.0)
+    assert sizer.record(2, 0.1) == 1
+    assert sizer.record(1, 0.1) == 1  # never below one frame
+    assert sizer.shrink_events == 2
+    assert sizer.report()["chosen_batch_size"] == 1
+
+def test_timeline_to_windows_pads_merges_and_clips():
+    timeline = [(0, 1), (25, 0), (50, 2), (60, 1), (100, 0), (140, 1)]
+    assert timeline_to_windows(timeline, pad_frames=5, total_frames=143) == [(0, 6), (45, 66), (135, 143)]
+    # A one-frame gap keeps windows apart; windows that touch are merged
+    assert timeline_to_windows([(10, 1), (20, 1)], pad_frames=4, total_frames=100) == [(6, 15), (16, 25)]
+    assert timeline_to_windows([(10, 1), (19, 1)], pad_frames=4, total_frames=100) == [(6, 24)]
+    assert timeline_to_windows([(0, 0), (25, 0)], pad_frames=5, total_frames=50) == []
+    assert timeline_to_windows([], pad_frames=5, total_frames=50) == []
+
+class BrightFrameDetector:
+    """Stands in for the Haar cascade: one "face" in every bright frame."""
+    def __init__(self):
+        self.shapes = []
+
+    def detectMultiScale(self, gray, **kwargs):
+        self.shapes.append(gray.shape)
+        return [(0, 0, 20, 20)] if gray.mean() > 128 else []
+
+def test_face_timeline_samples_at_the_coarse_rate_on_downscaled_frames(tmp_path):
+    path = str(tmp_path / "clip.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 25.0, (320, 240))
+    for i in range(100):
+        writer.write(np.full((240, 320, 3), 230 if 40 <= i < 60 else 20, dtype=np.uint8))
+    writer.release()
+
+    detector = BrightFrameDetector()
+    video = cv2.VideoCapture(path)
+    try:
+        timeline = build_face_timeline(video, 25.0, 100, coarse_fps=2.5, short_edge=120, detector=detector)
+    finally:
+        video.release()
+    assert timeline == [(0, 0), (10, 0), (20, 0), (30, 0), (40, 1), (50, 1), (60, 0), (70, 0), (80, 0), (90, 0)]
+    assert set(detector.shapes) == {(120, 160)}
+    assert timeline_to_windows(timeline, pad_frames=10, total_frames=100) == [(30, 61)]
+
+def test_select_diverse_samples_edge_cases():
+    rng = np.random.default_rng(2)
+    embeddings = rng.normal(size=(5, 128))
+    timestamps = np.arange(5, dtype=np.float32)
+    quality = np.array([0.2, 0.9, 0.5, 0.9, 0.1])
+
+    assert select_diverse_samples(embeddings, timestamps, quality, 0).tolist() == []
+    assert select_diverse_samples(embeddings, timestamps, quality, -3).tolist() == []
+    assert select_diverse_samples(embeddings[:0], timestamps[:0], quality[:0], 3).tolist() == []
+    # k >= n returns every sample, best quality first
+    assert select_diverse_samples(embeddings, timestamps, quality, 9).tolist() == [1, 3, 2, 0, 4]
+
+def test_select_diverse_samples_spreads_over_clusters():
+    rng = np.random.default_rng(3)
+    centers = rng.normal(size=(3, 128)) * 10
+    embeddings = np.repeat(centers, 4, axis=0) + rng.normal(size=(12, 128)) * 0.01
+    timestamps = np.zeros(12, dtype=np.float32)
+    quality = np.ones(12)
+    quality[5] = 2.0
+
+    selected = select_diverse_samples(embeddings, timestamps, quality, 3)
+    assert selected[0] == 5
+    assert sorted(selected // 4) == [0, 1, 2]
+    assert len(set(selected.tolist())) == 3
+
+def test_scene_sampler_first_frame_is_the_baseline():
+    sampler = SceneChangeSampler(threshold=0.3, max_gap=100, min_gap=1, settle_frames=2)
+    frame = np.full((72, 128, 3), 90, dtype=np.uint8)
+
+    # The first frame is detected, but is not a shot change and schedules no cut
+    assert sampler.should_detect(frame, 1)
+    assert not any(sampler.should_detect(frame, n) for n in range(2, 6))
+    assert sampler.shot_changes == 0
+
+    # Same after a reset (a seek to the next window)
+    sampler.reset()
+    assert sampler.should_detect(frame, 50)
+    assert not any(sampler.should_detect(frame, n) for n in range(51, 55))
+    assert sampler.shot_changes == 0
+
+    # A real cut is still detected once the settle frames have passed
+    cut = np.full((72, 128, 3), 230, dtype=np.uint8)
+    assert [sampler.should_detect(cut, n) for n in range(55, 58)] == [False, False, True]
+    assert sampler.shot_changes == 1
+
+def test_tar_shards_round_trip(tmp_path):
+    samples = [(f"face_{i:04d}", bytes([i]) * (3000 + i), {"frame": i, "score": np.float32(0.5)})
+               for i in range(6)]
+    with TarShardWriter(tmp_path, max_shard_bytes=10 * 1024) as writer:
+        for key, image_bytes, metadata in samples:
+            writer.write_sample(key, image_bytes, metadata)
+    assert len(writer.shards) > 1
+
+    with open(tmp_path / "index.jsonl") as f:
+        index = [json.loads(line) for line in f]
+    assert [entry["key"] for entry in index] == [key for key, _, _ in samples]
+    for entry, (key, image_bytes, metadata) in zip(index, samples):
+        assert read_sample(tmp_path, entry) == (image_bytes, {"frame": metadata["frame"], "score": 0.5})
+
+    # Shards stay valid WebDataset tars: each sample's jpg and json are adjacent
+    with tarfile.open(tmp_path / writer.shards[0]) as tar:
+        names = tar.getnames()
+    assert names[:2] == ["face_0000.jpg", "face_0000.json"]
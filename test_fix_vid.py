@@ -0,0 +1,51 @@
+import os
+import subprocess
+
+import pytest
+
+import mediaProbe
+from fixVid import repair_video, verify_output
+
+
+@pytest.fixture(autouse=True)
+def probe_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(mediaProbe, "CACHE_DIR", tmp_path / "probe_cache")
+
+def make_media(path, *args, seconds=4):
+    subprocess.run(['ffmpeg', '-v', 'error', '-y', '-f', 'lavfi', '-i', 'testsrc2=size=160x90:rate=25',
+                    '-f', 'lavfi', '-i', 'sine=frequency=440:sample_rate=48000', '-t', str(seconds),
+                    '-c:v', 'libx264', '-preset', 'ultrafast', '-c:a', 'aac', *args, str(path)], check=True)
+    return str(path)
+
+def test_healthy_file_with_timecode_track_stops_after_remux(tmp_path):
+    source = make_media(tmp_path / "clip.mov", '-timecode', '01:00:00:00')
+    repaired = repair_video(source)
+    assert repaired == str(tmp_path / "clip_remuxed.mp4")
+    assert verify_output(repaired, 4.0) == (True, "")
+    assert sorted(os.listdir(tmp_path)) == ["clip.mov", "clip_remuxed.mp4", "probe_cache"]
+
+def test_start_offset_does_not_count_as_lost_duration(tmp_path):
+    source = make_media(tmp_path / "offset.mp4", '-output_ts_offset', '10')
+    assert mediaProbe.probe(source).start_time == pytest.approx(10, abs=0.1)
+    assert repair_video(source) == str(tmp_path / "offset_remuxed.mp4")
+
+def test_truncated_file_fails_verification_at_every_stage(tmp_path):
+    full = make_media(tmp_path / "full.mkv", seconds=6)
+    with open(full, "rb") as f:
+        data = f.read()
+    truncated = tmp_path / "truncated.mkv"
+    truncated.write_bytes(data[:len(data) * 4 // 10])
+    assert repair_video(str(truncated)) is None
+    assert not (tmp_path / "truncated_remuxed.mp4").exists()
+    assert not (tmp_path / "truncated_video.mp4").exists()
+    assert not (tmp_path / "truncated_audio.mka").exists()
+
+def test_verify_output_reports_missing_streams_and_short_files(tmp_path):
+    source = make_media(tmp_path / "clip.mp4")
+    silent = tmp_path / "silent.mp4"
+    subprocess.run(['ffmpeg', '-v', 'error', '-y', '-i', source, '-an', '-c', 'copy', str(silent)], check=True)
+    assert verify_output(str(silent), 4.0) == (False, "no audio stream")
+    assert verify_output(str(silent), 4.0, audio=False) == (True, "")
+    ok, reason = verify_output(source, 10.0)
+    assert not ok and "short of" in reason
+    assert verify_output(str(tmp_path / "missing.mp4")) == (False, "no output")
@@ -0,0 +1,289 @@
+import csv
+import os
+import subprocess
+import sys
+import tarfile
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+import createFrames
+from createFrames import create_frames
+from extractImagesFromVid import extract_images_batch_job
+from frameBatch import claim_output_dir
+from frameDedupe import FrameDeduper, dhash, hamming_distance
+from ffmpegReader import FFmpegFrameReader
+from frameIndex import FrameIndex, INDEX_FILE_NAME
+from framePool import FramePool
+from frameStore import create_frame_store, open_frame_store
+from seekIndex import SeekIndex, build_seek_index, cached_seek_index, load_seek_index, sidecar_path
+from frameSampling import VideoInfo, frames_to_timecode, plan_frame_indices, read_frames, timecode_to_frames
+from frameWriter import write_frames
+
+def make_video(path, frames=75, fps=25.0, size=(96, 64), seed=0):
+    """Write a small MJPEG AVI whose frames are distinct (frame number in the pixel values)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), fps, size)
+    rng = np.random.default_rng(seed)
+    base = rng.integers(0, 255, (size[1], size[0], 3), dtype=np.uint8)
+    for i in range(frames):
+        frame = base.copy()
+        frame[:8, :] = (i * 3) % 256
+        writer.write(frame)
+    writer.release()
+    return str(path)
+
+def make_offset_video(path, seconds=4, start=10, timecode="10:00:00:00"):
+    """H.264 MP4 at 25 fps with one keyframe per second, a start time and a start timecode."""
+    subprocess.run(['ffmpeg', '-v', 'error', '-y', '-f', 'lavfi', '-i', 'testsrc=size=96x64:rate=25',
+                    '-t', str(seconds), '-c:v', 'libx264', '-g', '25', '-pix_fmt', 'yuv420p',
+                    '-output_ts_offset', str(start), '-timecode', timecode, str(path)], check=True)
+    return str(path)
+
+def test_batch_same_stem_videos_get_separate_folders(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    first = make_video(tmp_path / "a" / "clip.avi", seed=1)
+    second = make_video(tmp_path / "b" / "clip.avi", seed=2)
+
+    assert extract_images_batch_job(first, images_per_minute=20) == 1
+    assert extract_images_batch_job(second, images_per_minute=20) == 1
+
+    for video, other in ((first, second), (second, first)):
+        output_dir = Path(video).parent / "clip_images"
+        assert len(list(output_dir.glob("frame_*.jpg"))) == 1
+        with FrameIndex(str(output_dir / INDEX_FILE_NAME)) as index:
+            assert len(index.frames_for_source(video)) == 1
+            assert index.frames_for_source(other) == []
+
+def test_resume_refuses_a_folder_of_another_video(tmp_path):
+    first = make_video(tmp_path / "a" / "clip.avi", frames=5, seed=1)
+    second = make_video(tmp_path / "a" / "clip2.avi", frames=5, seed=2)
+    output_dir = tmp_path / "out"
+
+    assert claim_output_dir(output_dir, first, resume=True) is False  # nothing to reuse yet
+    assert claim_output_dir(output_dir, first, resume=True) is True
+    with pytest.raises(ValueError):
+        claim_output_dir(output_dir, second, resume=True)
+
+    # A rewritten source makes the frames stale
+    os.utime(first, (0, 0))
+    assert claim_output_dir(output_dir, first, resume=True) is False
+
+def test_ffmpeg_reader_pool_survives_out_of_order_release(tmp_path):
+    video = make_video(tmp_path / "clip.avi", frames=30)
+    with FFmpegFrameReader(video) as reader:
+        expected = [frame.copy() for frame in reader]
+
+    pool = FramePool(3)
+    held, seen = [], []
+    with FFmpegFrameReader(video, pool=pool) as reader:
+        for i, frame in enumerate(reader):
+            held.append((i, frame))
+            if len(held) == 3:
+                # Release the newest frame while older ones are still held
+                j, done = held.pop()
+                seen.append((j, done.copy()))
+                pool.release(done)
+    seen += [(j, frame.copy()) for j, frame in held]
+
+    assert len(seen) == len(expected)
+    for j, frame in seen:
+        assert np.array_equal(frame, expected[j])
+
+def test_writer_pool_out_of_order_frames_are_not_overwritten(tmp_path):
+    video = make_video(tmp_path / "clip.avi", frames=40)
+    indices = list(range(0, 40, 2))
+    expected = {i: frame.copy() for i, frame in read_frames(video, indices, strategy="grab")}
+
+    def output_path_for(sequence, frame_index):
+        if sequence == 0:
+            time.sleep(0.2)  # the first writer finishes long after the others
+        return tmp_path / f"frame_{frame_index:04d}.png"
+
+    pool = FramePool(4)
+    written = write_frames(read_frames(video, indices, strategy="grab", pool=pool), output_path_for,
+                           workers=3, queue_depth=2, release=pool.release)
+
+    assert [i for i, _ in written] == indices
+    for frame_index, path in written:
+        assert np.array_equal(cv2.imread(str(path)), expected[frame_index])
+
+def test_frame_pool_resize_follows_the_batch_size():
+    pool = FramePool(2)
+    assert pool.acquire() is None and pool.acquire() is None  # reader allocates both
+    held = [pool.issue(np.zeros(4, np.uint8)), pool.issue(np.ones(4, np.uint8))]
+
+    pool.resize(3)
+    assert pool.acquire() is None  # room for a third buffer
+    held.append(pool.issue(np.full(4, 2, np.uint8)))
+
+    pool.resize(1)
+    for frame in held:
+        pool.release(frame)
+    assert pool._allocated == 1
+    assert pool.acquire() is held[2]
+
+def test_segmented_extraction_indexes_the_same_dhashes(tmp_path):
+    video = make_video(tmp_path / "clip.avi", frames=60)
+    create_frames(video, 5, output_dir=tmp_path / "serial", workers=1)
+    create_frames(video, 5, output_dir=tmp_path / "segmented", segments=2)
+
+    def indexed(folder):
+        with FrameIndex(str(tmp_path / folder / INDEX_FILE_NAME)) as index:
+            return {record.frame_number: record.dhash for record in index.frames_for_source(video)}
+
+    serial = indexed("serial")
+    assert len(serial) == 12 and all(serial.values())
+    assert indexed("segmented") == serial
+
+def test_plan_modes_agree():
+    info = VideoInfo(fps=25.0, frame_count=75, width=96, height=64)
+    by_fps = plan_frame_indices(info, fps=5)
+    assert by_fps == list(range(0, 75, 5))
+    assert plan_frame_indices(info, images_per_minute=300) == by_fps
+    assert plan_frame_indices(info, timestamps=[i / 5 for i in range(15)]) == by_fps
+    assert plan_frame_indices(info, count=3) == [0, 37, 74]
+    with pytest.raises(ValueError):
+        plan_frame_indices(info, fps=5, count=3)
+    with pytest.raises(ValueError, match="fps must be positive"):
+        plan_frame_indices(info, fps=0)
+
+def test_single_file_cli_prints_plan_errors_instead_of_a_traceback(tmp_path, monkeypatch, capsys):
+    video = make_video(tmp_path / "clip.avi")
+    monkeypatch.setattr(sys, "argv", ["createFrames.py", str(video), "--fps", "0"])
+    createFrames.main()
+    assert capsys.readouterr().out.strip().endswith("Error: fps must be positive, got 0.0")
+    assert not (tmp_path / "extractedFrames").exists()
+
+@pytest.mark.parametrize("strategy", ["seek", "auto", "ffmpeg"])
+def test_strategies_read_the_same_frames_as_grab(tmp_path, strategy):
+    video = make_video(tmp_path / "clip.avi")
+    indices = [0, 3, 4, 40, 41, 74]
+    expected = [(i, frame.copy()) for i, frame in read_frames(video, indices, strategy="grab")]
+    # The frame number is drawn into the top rows (MJPEG shifts the level slightly)
+    for i, frame in expected:
+        assert abs(int(frame[0, 0, 0]) - i * 3 % 256) <= 4
+
+    got = [(i, frame.copy()) for i, frame in read_frames(video, indices, strategy=strategy)]
+    assert [i for i, _ in got] == indices
+    for (_, frame), (_, reference) in zip(got, expected):
+        assert np.array_equal(frame, reference)
+
+def test_index_pts_and_timecode_do_not_depend_on_the_mode(tmp_path):
+    video = make_offset_video(tmp_path / "offset.mp4")
+    create_frames(video, 1, output_dir=tmp_path / "keyframes", keyframes=True)
+    create_frames(video, 1, output_dir=tmp_path / "fps")
+
+    def indexed(folder):
+        with FrameIndex(str(tmp_path / folder / INDEX_FILE_NAME)) as index:
+            return [(r.frame_number, r.pts, r.timecode) for r in index.frames_for_source(video)]
+
+    expected = [(n, n / 25, f"10:00:{n // 25:02d}:00") for n in (0, 25, 50, 75)]
+    assert indexed("keyframes") == indexed("fps") == expected
+
+def test_reextraction_replaces_the_folder_rows(tmp_path):
+    video = make_video(tmp_path / "clip.avi", frames=50)
+    output_dir = tmp_path / "frames"
+    create_frames(video, 1, output_dir=output_dir)
+    create_frames(video, 5, output_dir=output_dir)
+
+    with FrameIndex(str(output_dir / INDEX_FILE_NAME)) as index:
+        records = index.frames_for_source(video)
+    assert [r.frame_number for r in records] == list(range(0, 50, 5))
+    assert len({r.output_path for r in records}) == len(records)
+
+def test_drop_frame_timecode_round_trip():
+    for frame_number in (0, 1799, 1800, 17982, 107892):
+        timecode = frames_to_timecode(frame_number, 29.97, "00:00:00;00")
+        assert timecode_to_frames(timecode, 29.97) == frame_number
+    assert frames_to_timecode(1800, 29.97, "00:00:00;00") == "00:01:00;02"
+    assert frames_to_timecode(25, 25, "10:00:00:00") == "10:00:01:00"
+
+def test_keyframes_csv_uses_the_index_time_base(tmp_path):
+    video = make_offset_video(tmp_path / "offset.mp4", seconds=2)
+    create_frames(video, 1, output_dir=tmp_path / "keyframes", keyframes=True)
+
+    with open(tmp_path / "keyframes" / "keyframes.csv", newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert [(row["frame_number"], row["pts_time"], row["packet_pts_time"]) for row in rows] == \
+        [("0", "0.000000", "10.000000"), ("25", "1.000000", "11.000000")]
+
+def test_ffmpeg_reader_reports_ffmpeg_failures(tmp_path):
+    video = make_video(tmp_path / "clip.avi", frames=5)
+    with pytest.raises(RuntimeError, match="No such filter"):
+        with FFmpegFrameReader(video, filters=["nosuchfilter"]) as reader:
+            list(reader)
+
+    # Closing early is not a failure
+    with FFmpegFrameReader(video) as reader:
+        assert reader.read() is not None
+
+@pytest.mark.parametrize("backend", ["tar", "array"])
+def test_frame_store_round_trip(tmp_path, backend):
+    rng = np.random.default_rng(4)
+    frames = {number: rng.integers(0, 255, (16, 24, 3), dtype=np.uint8) for number in (0, 10, 20, 30, 40)}
+    path = str(tmp_path / ("frames.tar" if backend == "tar" else "frames.frames"))
+    with create_frame_store(path, backend, fps=25.0, chunk_size=2) as store:
+        for number, frame in frames.items():
+            store.append(number, frame, pts=1.5 if number == 40 else None)
+
+    with open_frame_store(path) as store:
+        assert len(store) == 5
+        assert np.array_equal(store[1], frames[10])
+        for number, frame in frames.items():
+            assert np.array_equal(store.get_frame(number), frame)
+        assert [entry["pts"] for entry in store.index] == [0.0, 0.4, 0.8, 1.2, 1.5]
+        assert store.index[3]["timecode"] == "00:00:01:05"
+    if backend == "tar":
+        with tarfile.open(path) as tar:
+            assert len(tar.getnames()) == 5
+    else:
+        assert sorted(os.listdir(path)) == ["chunk_00000.npy", "chunk_00001.npy", "chunk_00002.npy", "index.json"]
+
+def test_array_store_rejects_a_frame_of_another_shape(tmp_path):
+    with create_frame_store(str(tmp_path / "frames.frames"), "array", fps=25.0) as store:
+        store.append(0, np.zeros((16, 24, 3), dtype=np.uint8))
+        with pytest.raises(ValueError):
+            store.append(1, np.zeros((8, 24, 3), dtype=np.uint8))
+    with pytest.raises(ValueError):
+        create_frame_store(str(tmp_path / "x"), "zip", fps=25.0)
+
+def test_deduper_drops_near_duplicates_of_the_last_kept_frame():
+    ramp = np.tile(np.linspace(0, 255, 320, dtype=np.uint8), (180, 1))
+    slide_a = cv2.merge([ramp] * 3)
+    slide_b = slide_a[:, ::-1].copy()
+    noisy_a = cv2.add(slide_a, np.random.default_rng(5).integers(0, 3, slide_a.shape, dtype=np.uint8))
+    assert hamming_distance(dhash(slide_a), dhash(noisy_a)) <= 5
+    assert hamming_distance(dhash(slide_a), dhash(slide_b)) == 64
+
+    deduper = FrameDeduper(max_distance=5)
+    frames = [(0, slide_a), (1, noisy_a), (2, slide_a), (3, slide_b), (4, slide_b), (5, slide_a)]
+    assert [index for index, _ in deduper.filter(frames)] == [0, 3, 5]
+    assert sorted(deduper.index) == [0, 3, 5]
+    assert deduper.stats() == {"frames_seen": 6, "frames_kept": 3, "frames_dropped": 3}
+
+def test_seek_index_keyframe_lookup():
+    index = SeekIndex(fps=25.0, frame_count=100, start_pts=0.0, keyframe_frames=[0, 25, 50, 75],
+                      keyframe_pts=[0.0, 1.0, 2.0, 3.0], keyframe_pos=[48, 900, 1800, 2700])
+    assert [index.keyframe_for(n) for n in (0, 1, 24, 25, 26, 74, 99, 500)] == [0, 0, 0, 25, 25, 50, 75, 75]
+    assert SeekIndex(25.0, 10, 0.0, [], [], []).keyframe_for(5) == 0
+
+def test_seek_index_scans_packets_and_caches_until_the_video_changes(tmp_path):
+    video = make_offset_video(tmp_path / "clip.mp4")
+    index = build_seek_index(video)
+    assert index.fps == 25.0 and index.frame_count == 100
+    assert index.keyframe_frames == [0, 25, 50, 75]
+    assert index.start_pts == pytest.approx(10.0, abs=0.1)
+    assert index.keyframe_pts == pytest.approx([index.start_pts + second for second in range(4)], abs=1e-3)
+    assert index.keyframe_pos == sorted(index.keyframe_pos) and index.keyframe_pos[0] > 0
+
+    assert cached_seek_index(video) is None
+    assert load_seek_index(video) == index
+    assert os.path.exists(sidecar_path(video))
+    assert cached_seek_index(video) == index
+    stat = os.stat(video)
+    os.utime(video, (stat.st_atime, stat.st_mtime + 5))
+    assert cached_seek_index(video) is None
@@ -0,0 +1,62 @@
+import os
+import subprocess
+
+import pytest
+
+import mediaProbe
+from mediaProbe import parse_rate, probe
+
+
+@pytest.fixture(autouse=True)
+def probe_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(mediaProbe, "CACHE_DIR", tmp_path / "probe_cache")
+    monkeypatch.setattr(mediaProbe, "_memory_cache", {})
+
+def make_clip(path):
+    subprocess.run(['ffmpeg', '-v', 'error', '-y', '-f', 'lavfi', '-i', 'testsrc=size=96x64:rate=30000/1001',
+                    '-f', 'lavfi', '-i', 'sine=frequency=440:sample_rate=48000', '-t', '2',
+                    '-c:v', 'libx264', '-c:a', 'aac', '-timecode', '01:00:00;00', str(path)], check=True)
+    return str(path)
+
+def test_parse_rate():
+    assert parse_rate("30000/1001") == pytest.approx(29.97, abs=1e-3)
+    assert parse_rate("25/1") == 25.0
+    assert parse_rate("50") == 50.0
+    assert parse_rate("0/0") == 0.0
+    assert parse_rate("N/A") == 0.0
+    assert parse_rate(None) == 0.0
+
+def test_probe_reads_streams_rate_and_timecode(tmp_path):
+    info = probe(make_clip(tmp_path / "clip.mov"))
+    assert info.frame_rate == pytest.approx(30000 / 1001)
+    assert info.duration == pytest.approx(2.0, abs=0.1)
+    assert info.frame_count == 60
+    assert info.timecode == "01:00:00;00"
+    assert info.video.codec_name == "h264"
+    assert [track.codec_name for track in info.audio_tracks] == ["aac"]
+    assert info.errors == ""
+    with pytest.raises(ValueError):
+        probe(__file__)
+
+def test_probe_cache_skips_ffprobe_until_the_file_changes(tmp_path, monkeypatch):
+    clip = make_clip(tmp_path / "clip.mov")
+    first = probe(clip)
+    calls = []
+    real_run = subprocess.run
+
+    def counting_run(cmd, **kwargs):
+        calls.append(cmd)
+        return real_run(cmd, **kwargs)
+    monkeypatch.setattr(mediaProbe.subprocess, "run", counting_run)
+
+    assert probe(clip) is first
+    mediaProbe._memory_cache.clear()
+    assert probe(clip) == first  # from the disk cache
+    assert calls == []
+
+    stat = os.stat(clip)
+    os.utime(clip, (stat.st_atime, stat.st_mtime + 5))
+    assert probe(clip).duration == first.duration
+    assert len(calls) == 1
+    probe(clip, use_cache=False)
+    assert len(calls) == 2
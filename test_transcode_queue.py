@@ -0,0 +1,63 @@
+import json
+
+from transcodeQueue import TranscodeResult, is_complete, make_job, parse_progress, unique_jobs, write_result
+
+PROGRESS = """frame=48
+fps=24.00
+out_time_us=2000000
+speed=1.5x
+progress=continue
+frame=96
+fps=31.50
+out_time_us=4000000
+speed=2.01x
+progress=end
+"""
+
+def job_for(path, output_dir):
+    return make_job(str(path), str(output_dir), crf=23, preset="ultrafast", audio_bitrate="128k", threads=1)
+
+def test_parse_progress_yields_one_block_per_update():
+    blocks = list(parse_progress(PROGRESS.splitlines(keepends=True)))
+    assert [b["progress"] for b in blocks] == ["continue", "end"]
+    assert blocks[0] == {"frame": "48", "fps": "24.00", "out_time_us": "2000000", "speed": "1.5x",
+                         "progress": "continue"}
+    assert blocks[1]["out_time_us"] == "4000000"
+
+def test_parse_progress_ignores_blank_lines_and_partial_tail():
+    lines = ["\n", "frame=1\n", "progress=continue\n", "frame=2\n"]
+    assert list(parse_progress(lines)) == [{"frame": "1", "progress": "continue"}]
+
+def test_same_stem_inputs_get_distinct_outputs(tmp_path):
+    first = job_for(tmp_path / "a" / "clip.mp4", tmp_path / "out")
+    second = job_for(tmp_path / "b" / "clip.mp4", tmp_path / "out")
+    assert first.output_path != second.output_path
+    assert first.result_path != second.result_path
+    assert job_for(tmp_path / "a" / "clip.mp4", tmp_path / "out").output_path == first.output_path
+
+def test_unique_jobs_rejects_a_second_input_for_one_output(tmp_path):
+    job = job_for(tmp_path / "a" / "clip.mp4", tmp_path / "out")
+    clash = job_for(tmp_path / "b" / "clip.mp4", tmp_path / "out")
+    clash.output_path = job.output_path
+    claimed = {}
+    assert unique_jobs([job, clash], claimed) == [job]
+    # Shared across calls, as in watch mode; resubmitting the same input is allowed
+    assert unique_jobs([clash], claimed) == []
+    assert unique_jobs([job], claimed) == [job]
+
+def test_is_complete_requires_the_result_of_this_input(tmp_path):
+    job = job_for(tmp_path / "a" / "clip.mp4", tmp_path)
+    with open(job.output_path, "wb") as f:
+        f.write(b"\0")
+    assert not is_complete(job)
+
+    write_result(job, TranscodeResult("/elsewhere/clip.mp4", job.output_path, "complete", 1))
+    assert not is_complete(job)
+
+    write_result(job, TranscodeResult(job.input_path, job.output_path, "failed", 3))
+    assert not is_complete(job)
+
+    write_result(job, TranscodeResult(job.input_path, job.output_path, "complete", 1))
+    assert is_complete(job)
+    with open(job.result_path) as f:
+        assert json.load(f)["input_path"] == job.input_path
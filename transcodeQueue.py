@@ -0,0 +1,298 @@
+"""
+Batch transcode queue.
+
+Runs many ffmpeg transcodes with a cap on concurrent processes: each job gets
+--threads encoder threads and at most cores // threads jobs run at once
+(override with --jobs). Progress comes from ffmpeg's `-progress pipe:1`
+output and is printed as live fps, speed and ETA per job. Failed jobs are
+retried (--retries). Every job writes a JSON result next to its output with
+the status, attempts, encode time and achieved bitrate; inputs whose result
+says "complete" are skipped on later runs. Output names carry a short hash
+of the input path, so same-named inputs from different folders never share
+an output.
+
+Usage: python transcodeQueue.py <videos, folders or globs...> [--output-dir transcoded] [--crf 23]
+       python transcodeQueue.py --watch incoming/ [--poll 10]
+"""
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from frameBatch import VIDEO_EXTENSIONS, expand_inputs
+from mediaProbe import probe
+
+# Seconds between progress lines per job
+PROGRESS_INTERVAL = 5.0
+
+_print_lock = threading.Lock()
+
+
+def log(message: str) -> None:
+    with _print_lock:
+        print(message, flush=True)
+
+
+@dataclass
+class TranscodeJob:
+    input_path: str
+    output_path: str
+    video_args: List[str]
+    audio_args: List[str]
+    threads: int
+
+    @property
+    def result_path(self) -> str:
+        return os.path.splitext(self.output_path)[0] + ".json"
+
+    def command(self) -> List[str]:
+        return (['ffmpeg', '-v', 'error', '-nostats', '-progress', 'pipe:1', '-y', '-i', self.input_path]
+                + self.video_args + ['-threads', str(self.threads)] + self.audio_args + [self.output_path])
+
+
+@dataclass
+class TranscodeResult:
+    input_path: str
+    output_path: str
+    status: str
+    attempts: int
+    seconds: float = 0.0
+    duration: Optional[float] = None
+    size: Optional[int] = None
+    bit_rate: Optional[int] = None
+    speed: Optional[float] = None
+    error: Optional[str] = None
+    command: List[str] = field(default_factory=list)
+
+
+def parse_progress(lines) -> Iterator[Dict[str, str]]:
+    """Yield one dict per `-progress` block (key=value lines ending in progress=continue|end)."""
+    block = {}
+    for line in lines:
+        key, _, value = line.strip().partition('=')
+        if not key:
+            continue
+        block[key] = value
+        if key == 'progress':
+            yield block
+            block = {}
+
+
+def format_eta(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return "--:--:--"
+    seconds = int(seconds)
+    return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+def _progress_line(name: str, block: Dict[str, str], duration: Optional[float]) -> str:
+    out_us = block.get('out_time_us', block.get('out_time_ms', 'N/A'))
+    done = int(out_us) / 1e6 if out_us.lstrip('-').isdigit() else 0.0
+    speed_text = block.get('speed', 'N/A').rstrip('x').strip()
+    try:
+        speed = float(speed_text)
+    except ValueError:
+        speed = 0.0
+    percent = f"{100 * done / duration:5.1f}%" if duration else "  ?  "
+    eta = (duration - done) / speed if duration and speed > 0 else None
+    return f"[{name}] {percent} fps={block.get('fps', '?')} speed={speed:.2f}x eta={format_eta(eta)}"
+
+
+def run_job(job: TranscodeJob, retries: int = 2) -> TranscodeResult:
+    """Run one transcode, retrying on failure, and write its JSON result."""
+    name = os.path.basename(job.input_path)
+    try:
+        duration = probe(job.input_path).duration
+    except (OSError, ValueError) as e:
+        result = TranscodeResult(job.input_path, job.output_path, "failed", 0, error=str(e))
+        write_result(job, result)
+        log(f"[{name}] failed: {e}")
+        return result
+
+    result = None
+    for attempt in range(1, retries + 2):
+        start = time.perf_counter()
+        with tempfile.TemporaryFile(mode="w+") as stderr:
+            process = subprocess.Popen(job.command(), stdout=subprocess.PIPE, stderr=stderr, text=True)
+            last_print = 0.0
+            for block in parse_progress(process.stdout):
+                now = time.perf_counter()
+                if now - last_print >= PROGRESS_INTERVAL or block.get('progress') == 'end':
+                    log(_progress_line(name, block, duration))
+                    last_print = now
+            returncode = process.wait()
+            stderr.seek(0)
+            error = stderr.read().strip()
+        seconds = time.perf_counter() - start
+
+        if returncode == 0 and os.path.isfile(job.output_path):
+            try:
+                output = probe(job.output_path, use_cache=False)
+            except ValueError as e:
+                error = str(e)
+            else:
+                size = os.path.getsize(job.output_path)
+                out_duration = output.duration or duration
+                result = TranscodeResult(
+                    job.input_path, job.output_path, "complete", attempt, seconds=round(seconds, 2),
+                    duration=out_duration, size=size,
+                    bit_rate=int(size * 8 / out_duration) if out_duration else None,
+                    speed=round(duration / seconds, 2) if duration and seconds else None,
+                    command=job.command()
+                )
+                break
+
+        error = error or f"ffmpeg exited with code {returncode}"
+        result = TranscodeResult(job.input_path, job.output_path, "failed", attempt,
+                                 seconds=round(seconds, 2), error=error[-2000:], command=job.command())
+        if os.path.exists(job.output_path):
+            os.remove(job.output_path)
+        if attempt <= retries:
+            log(f"[{name}] attempt {attempt} failed, retrying: {error.splitlines()[-1] if error else ''}")
+            time.sleep(min(30, 2 ** attempt))
+
+    write_result(job, result)
+    if result.status == "complete":
+        bit_rate = f"{result.bit_rate / 1000:.0f} kb/s" if result.bit_rate else "unknown bitrate"
+        log(f"[{name}] done in {result.seconds:.1f} s, {bit_rate} -> {job.output_path}")
+    else:
+        log(f"[{name}] failed after {result.attempts} attempts: {result.error.splitlines()[-1]}")
+    return result
+
+
+def write_result(job: TranscodeJob, result: TranscodeResult) -> None:
+    tmp_path = job.result_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(asdict(result), f, indent=2)
+    os.replace(tmp_path, job.result_path)
+
+
+def is_complete(job: TranscodeJob) -> bool:
+    """Whether this input was already transcoded: the result must be complete and belong to this input."""
+    try:
+        with open(job.result_path) as f:
+            result = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return (result.get("status") == "complete" and result.get("input_path") == job.input_path
+            and os.path.isfile(job.output_path))
+
+
+def output_name(input_path: str) -> str:
+    """`<stem>_<path hash>_transcoded.mp4`: inputs with the same name in different folders get different outputs."""
+    path_hash = hashlib.blake2b(os.path.abspath(input_path).encode("utf-8"), digest_size=4).hexdigest()
+    return f"{Path(input_path).stem}_{path_hash}_transcoded.mp4"
+
+
+def make_job(input_path: str, output_dir: str, crf: float, preset: str, audio_bitrate: str,
+             threads: int) -> TranscodeJob:
+    output_path = os.path.abspath(os.path.join(output_dir, output_name(input_path)))
+    return TranscodeJob(
+        input_path=os.path.abspath(input_path),
+        output_path=output_path,
+        video_args=['-c:v', 'libx264', '-preset', preset, '-crf', str(crf)],
+        audio_args=['-c:a', 'aac', '-b:a', audio_bitrate],
+        threads=threads
+    )
+
+
+def unique_jobs(jobs: List[TranscodeJob], claimed: Dict[str, str]) -> List[TranscodeJob]:
+    """
+    Drop jobs whose output path is already claimed by a different input.
+
+    `claimed` maps output paths to input paths and is updated, so it can be
+    shared across calls (watch mode submits jobs one at a time).
+    """
+    unique = []
+    for job in jobs:
+        owner = claimed.setdefault(job.output_path, job.input_path)
+        if owner != job.input_path:
+            log(f"[{os.path.basename(job.input_path)}] rejected: {job.output_path} is already the output of {owner}")
+            continue
+        unique.append(job)
+    return unique
+
+
+def default_jobs(threads: int) -> int:
+    return max(1, (os.cpu_count() or 1) // threads)
+
+
+def watch_folder(folder: str, poll: float, exclude_dir: Optional[str] = None) -> Iterator[str]:
+    """Yield video files that appear in `folder`, once their size has stopped changing."""
+    seen = set()
+    sizes: Dict[str, int] = {}
+    exclude_dir = os.path.join(os.path.abspath(exclude_dir), '') if exclude_dir else None
+    while True:
+        for path in expand_inputs([folder]):
+            if path in seen or (exclude_dir and path.startswith(exclude_dir)):
+                continue
+            size = os.path.getsize(path)
+            if sizes.get(path) == size:
+                seen.add(path)
+                yield path
+            else:
+                sizes[path] = size
+        time.sleep(poll)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transcode many videos with a concurrency cap, progress and retries.")
+    parser.add_argument("inputs", nargs="*", help="Video files, folders or glob patterns")
+    parser.add_argument("--watch", help="Keep watching this folder and transcode new videos as they finish copying")
+    parser.add_argument("--poll", type=float, default=10.0, help="Watch folder poll interval in seconds")
+    parser.add_argument("--output-dir", default="transcoded", help="Where outputs and JSON results are written")
+    parser.add_argument("--crf", type=float, default=23, help="x264 CRF")
+    parser.add_argument("--preset", default="medium", help="x264 preset")
+    parser.add_argument("--audio-bitrate", default="128k", help="AAC audio bitrate")
+    parser.add_argument("--threads", type=int, default=4, help="Encoder threads per job")
+    parser.add_argument("--jobs", type=int, help="Concurrent ffmpeg processes (default: cores // threads)")
+    parser.add_argument("--retries", type=int, default=2, help="Retries per failed job")
+    args = parser.parse_args()
+
+    if not args.inputs and not args.watch:
+        parser.error("pass input videos or --watch FOLDER")
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    jobs = args.jobs or default_jobs(args.threads)
+    print(f"Running up to {jobs} jobs with {args.threads} threads each "
+          f"(extensions: {', '.join(sorted(VIDEO_EXTENSIONS))})")
+
+    claimed: Dict[str, str] = {}
+
+    def submit_all(pool, paths):
+        futures = []
+        queued = [make_job(path, args.output_dir, args.crf, args.preset, args.audio_bitrate, args.threads)
+                  for path in paths]
+        for job in unique_jobs(queued, claimed):
+            path = job.input_path
+            if is_complete(job):
+                log(f"[{os.path.basename(path)}] already complete, skipping")
+                continue
+            futures.append(pool.submit(run_job, job, args.retries))
+        return futures
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = submit_all(pool, expand_inputs(args.inputs))
+        if args.watch:
+            print(f"Watching {args.watch} (Ctrl+C to stop)")
+            try:
+                for path in watch_folder(args.watch, args.poll, exclude_dir=args.output_dir):
+                    futures += submit_all(pool, [path])
+            except KeyboardInterrupt:
+                print("Stopped watching; waiting for running jobs")
+        results = [future.result() for future in futures]
+
+    failed = sum(1 for result in results if result.status != "complete")
+    print(f"Queue finished: {len(results) - failed} completed, {failed} failed")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,21 @@
 import subprocess
 import os
 
+from mediaProbe import probe
+
 def get_frame_rate(video_path):
-    """ Get the frame rate of the video using ffmpeg """
-    cmd = [
-        'ffmpeg', '-i', video_path, '-v', '0', '-select_streams', 'v:0', '-show_entries',
-        'stream=r_frame_rate', '-of', 'default=noprint_wrappers=1:nokey=1'
-    ]
-    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-    frame_rate = result.stdout.strip()
-    
-    # Debugging step to see what is returned
-    print(f"Frame rate output: {frame_rate}")
-    
-    if '/' in frame_rate:
-        num, denom = frame_rate.split('/')
-        return float(num) / float(denom)
-    elif frame_rate.isdigit():
-        return float(frame_rate)
-    else:
-        raise ValueError(f"Unexpected frame rate format: {frame_rate}")
+    """ Get the frame rate of the video from the cached ffprobe result """
+    frame_rate = probe(video_path).frame_rate
+    if frame_rate <= 0:
+        raise ValueError(f"No video frame rate found in {video_path}")
+    return frame_rate
 
 def get_duration(video_path):
-    """ Get the duration of the video in seconds using ffmpeg """
-    cmd = [
-        'ffmpeg', '-i', video_path, '-v', '0', '-show_entries', 'format=duration',
-        '-of', 'default=noprint_wrappers=1:nokey=1'
-    ]
-    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-    return float(result.stdout.strip())
+    """ Get the duration of the video in seconds from the cached ffprobe result """
+    duration = probe(video_path).duration
+    if duration is None:
+        raise ValueError(f"No duration found in {video_path}")
+    return duration
 
 def trim_video(video_path, output_path, frames_to_trim=50):
     """ Trim last 50 frames from the video """